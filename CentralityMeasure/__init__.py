@@ -1,4 +1,11 @@
-from .centrality import calculate_centrality_and_statistics
-from .diameter import calculate_community_diameters
+from utils.lazy import lazy_exports
 
 __all__ = ["calculate_centrality_and_statistics", "calculate_community_diameters"]
+
+__getattr__, __dir__ = lazy_exports(
+    __name__,
+    {
+        "calculate_centrality_and_statistics": ".centrality",
+        "calculate_community_diameters": ".diameter",
+    },
+)
@@ -1,13 +1,13 @@
 import pandas as pd
 from pathlib import Path
-import igraph as ig
-from tqdm import tqdm
+from typing import Union
+from utils.artifacts import registry
+from utils.graph import CSRGraph, as_graph, get_igraph
 from utils.logger import logger
 
 
 def calculate_centrality_and_statistics(
-    node_data: pd.DataFrame,
-    edge_data: pd.DataFrame,
+    graph: Union[CSRGraph, Path],
     output_path: Path,
 ):
     """
@@ -15,24 +15,17 @@ def calculate_centrality_and_statistics(
     shortest path, radius, etc.
 
     Parameters:
-        - node_data (pd.DataFrame): Node data (including 'id' column)
-        - edge_data (pd.DataFrame): Edge data (including 'src', 'dst' columns)
+        - graph (CSRGraph | Path): Graph artifact of the papers saved by `utils.graph.save_graph`, or its path
         - output_path (Path): Path to save the results
     """
-    # Step 1: Build the graph
-    edges = list(zip(edge_data["src"], edge_data["dst"]))
-    G = ig.Graph()
-    G.add_vertices(node_data["id"].unique())
-    G.add_edges(edges)
+    # Step 1: Build the graph once per stage, vertex `i` is the node `graph.node_ids[i]`
+    G = get_igraph(graph)
 
     # Step 2: Calculate centrality measures
     centrality_dict = {}
 
-    # Calculate degree centrality with progress bar
-    degree_centrality = []
-    for node in tqdm(node_data["id"], desc="Calculating Degree Centrality..."):
-        degree_centrality.append(G.degree(node))
-    centrality_dict["degree_centrality"] = degree_centrality
+    # Calculate degree centrality
+    centrality_dict["degree_centrality"] = G.degree()
 
     # Calculate pagerank centrality
     pagerank_centrality = G.pagerank()
@@ -44,23 +37,25 @@ def calculate_centrality_and_statistics(
     # Save centrality measures to CSV
     centrality_df = pd.DataFrame(
         {
-            "id": node_data["id"],
+            "id": as_graph(graph).node_ids,
             "degree_centrality": centrality_dict["degree_centrality"],
             "pagerank_centrality": centrality_dict["pagerank_centrality"],
         }
     )
     centrality_df.to_csv(output_path / "centrality_measures.csv", index=False)
+    registry.register(
+        output_path / "centrality_measures.csv",
+        centrality_df["id"],
+        **centrality_dict,
+    )
 
     logger.info(f"Results saved to: {output_path}")
 
 
 if __name__ == "__main__":
     # Define file paths
-    from utils import load_paper_node, load_paper_edge
-
-    node_data = load_paper_node("./data/paper/node.csv", skip_isolate=True)
-    edge_data = load_paper_edge("./data/paper/edge.csv")
+    graph = Path("./data/paper/graph")
 
     output_path = Path("./CentralityMeasure/results")
     # Calculate centrality measures and statistics
-    calculate_centrality_and_statistics(node_data, edge_data, output_path)
+    calculate_centrality_and_statistics(graph, output_path)
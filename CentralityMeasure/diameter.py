@@ -1,28 +1,25 @@
 import json
 from tqdm import tqdm
+import numpy as np
 import pandas as pd
 import igraph as ig
+from utils.graph import as_graph, get_igraph
 
 
-def calculate_community_diameters(node, edge, community_file, output_file):
-    # Load the community and graph data
+def calculate_community_diameters(graph, community_file, output_file):
+    # Load the community data
     community_df = pd.read_csv(community_file)
 
-    # Merge the community information with the node data
-    node = node.merge(community_df[["id", "community"]], on="id", how="left")
-
-    # Create a graph using igraph
-    g = ig.Graph()
-
-    # Add vertices (nodes) to the graph
-    g.add_vertices(node["id"].tolist())
+    # Community of every vertex, vertex `i` being the node `graph.node_ids[i]`
+    community = pd.Series(as_graph(graph).node_ids).map(
+        community_df.set_index("id")["community"]
+    )
 
-    # Add edges to the graph (assuming edge contains 'source' and 'target')
-    edges = list(zip(edge["src"], edge["dst"]))
-    g.add_edges(edges)
+    # Get the igraph graph, built once per stage
+    g = get_igraph(graph)
 
     # Get the top-10 communities
-    top_10_communities = node["community"].value_counts().head(10).index.tolist()
+    top_10_communities = community.value_counts().head(10).index.tolist()
 
     # Function to calculate the diameter of a community using igraph
     def calculate_diameter(community_nodes):
@@ -38,14 +35,14 @@ def calculate_community_diameters(node, edge, community_file, output_file):
 
     # Calculate the diameters for the top-10 communities
     community_diameters = {}
-    for community in tqdm(
+    for community_id in tqdm(
         top_10_communities,
         total=len(top_10_communities),
         desc="Calculating diameters...",
     ):
-        community_nodes = node[node["community"] == community]["id"].tolist()
+        community_nodes = np.flatnonzero(community == community_id).tolist()
         diameter = calculate_diameter(community_nodes)
-        community_diameters[community] = diameter
+        community_diameters[community_id] = diameter
 
     # Save the diameters to a JSON file
     with open(output_file, "w") as json_file:
@@ -53,16 +50,10 @@ def calculate_community_diameters(node, edge, community_file, output_file):
 
 
 if __name__ == "__main__":
-    from utils import load_paper_node, load_paper_edge
-
-    node_file = "./data/paper/node.csv"
-    edge_file = "./data/paper/edge.csv"
-    node = load_paper_node(node_file, skip_isolate=True)
-    edge = load_paper_edge(edge_file)
+    from pathlib import Path
 
     calculate_community_diameters(
-        node,
-        edge,
+        Path("./data/paper/graph"),
         community_file="./CommunityMining/results/paper/louvain.csv",
         output_file="./CentralityMeasure/results/diameter.json",
     )
@@ -1,10 +1,22 @@
-from .louvain import louvain_ig
-from .author_community import community_detection_with_filter
-from .paper_community import community_detection_no_filter, Algorithm
+from utils.lazy import lazy_exports
 
 __all__ = [
     "louvain_ig",
     "community_detection_with_filter",
+    "save_author_graph",
+    "AUTHOR_FILTERS",
     "community_detection_no_filter",
     "Algorithm",
 ]
+
+__getattr__, __dir__ = lazy_exports(
+    __name__,
+    {
+        "louvain_ig": ".louvain",
+        "community_detection_with_filter": ".author_community",
+        "save_author_graph": ".author_community",
+        "AUTHOR_FILTERS": ".author_community",
+        "community_detection_no_filter": ".paper_community",
+        "Algorithm": ".paper_community",
+    },
+)
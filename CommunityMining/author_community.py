@@ -1,39 +1,34 @@
 import igraph as ig
 import pandas as pd
-from typing import Dict
+from typing import Dict, Final, Union
 from pathlib import Path
+from utils.artifacts import registry
+from utils.graph import CSRGraph, as_graph, get_igraph, save_graph
+from utils.loader import apply_filters
 from utils.logger import logger
 from utils.wrapper import timer
 
+# Authors with a single paper, without co-authors or with more than 50 co-authors are left out,
+# pass them to `load_author_node(filters=...)` to skip these rows while reading
+AUTHOR_FILTERS: Final = [
+    ("num_papers", ">", 1),
+    ("num_co_authors", ">", 0),
+    ("num_co_authors", "<=", 50),
+]
 
-@timer
-def community_detection_with_filter(
-    node: pd.DataFrame, edge: pd.DataFrame, path: Path, algorithm: str, **kwargs: Dict
-) -> None:
-    """
-    Perform community detection on the given node and edge data using the specified algorithm.
 
-    The nodes and edges are expected to be provided as DataFrames, which are generated after pre-processing.
-    `kwargs` can include additional parameters for fine-tuning the algorithm, such as weights for edges if applicable.
-
-    This function assigns a community label to each node and saves these labels in a file for future use.
+def save_author_graph(node: pd.DataFrame, edge: pd.DataFrame, path: Path) -> CSRGraph:
+    """
+    Filter the authors and their weighted co-author edges, then save them as the graph artifact
+    read by `community_detection_with_filter`, see `utils.graph.save_graph`.
 
     Parameters:
-        - node (pd.DataFrame): DataFrame containing node information, including an "id" column.
-        - edge (pd.DataFrame): DataFrame containing edge information, including "src" and "dst" columns.
-        - path (Path): Output path to save the results.
-        - algorithm (str): Name of the community detection algorithm to use.
-        - kwargs (Dict): Additional parameters for fine-tuning.
+        - node (pd.DataFrame): DataFrame containing node information, including "id", "num_co_authors" and "num_papers" columns.
+        - edge (pd.DataFrame): DataFrame containing edge information, including "src", "dst" and "w" columns.
+        - path (Path): Directory of the graph artifact.
     """
     # Check for required columns in the DataFrames
-    required_node_columns = [
-        "id",
-        "name",
-        "co_authors",
-        "papers",
-        "num_co_authors",
-        "num_papers",
-    ]
+    required_node_columns = ["id", "num_co_authors", "num_papers"]
     required_edge_columns = ["src", "dst", "w"]
 
     for col in required_node_columns:
@@ -44,38 +39,44 @@ def community_detection_with_filter(
         if col not in edge.columns:
             raise ValueError(f"Edge DataFrame must contain '{col}' column.")
 
-    # Filter out isolated nodes (assuming authors with no co-authors) and authors with more than 50 co-authors
-    node = node[
-        (node["num_papers"] > 1)
-        & (node["num_co_authors"] > 0)
-        & (node["num_co_authors"] <= 50)
-    ]
+    # Filter out isolated nodes (assuming authors with no co-authors) and authors with more than 50 co-authors,
+    # a no-op if the nodes are already loaded with `AUTHOR_FILTERS`
+    node = apply_filters(node, AUTHOR_FILTERS)
 
-    # Ensure that all edges refer to nodes that exist in the node_data
-    valid_edges = edge[edge["src"].isin(node["id"]) & edge["dst"].isin(node["id"])]
+    # Filter out edges with missing weights (if applicable), the edges touching a filtered out
+    # node are dropped by `save_graph`
+    valid_edges = edge[edge["w"].notna()]
 
-    # Filter out edges with missing weights (if applicable)
-    valid_edges = valid_edges[valid_edges["w"].notna()]
+    return save_graph(
+        path,
+        node["id"],
+        valid_edges["src"],
+        valid_edges["dst"],
+        weights=valid_edges["w"],
+    )
 
-    # Extract the weights from the valid edges
-    weights = valid_edges["w"].tolist()
 
-    # Check that the number of weights matches the number of edges
-    if len(weights) != len(valid_edges):
-        raise ValueError(
-            "The number of weights does not match the number of valid edges."
-        )
+@timer
+def community_detection_with_filter(
+    graph: Union[CSRGraph, Path], path: Path, algorithm: str, **kwargs: Dict
+) -> pd.DataFrame:
+    """
+    Perform community detection on the given graph using the specified algorithm.
 
-    # Convert valid edge data to igraph-compatible format
-    edges = list(zip(valid_edges["src"], valid_edges["dst"]))
+    The graph is expected to be the filtered author graph artifact saved by `save_author_graph` after pre-processing,
+    or its path, which is memory-mapped.
+    `kwargs` can include additional parameters for fine-tuning the algorithm, such as weights for edges if applicable.
 
-    # Create igraph Graph
-    G = ig.Graph()
-    # Add all unique node ids from the node DataFrame
-    G.add_vertices(node["id"].unique())
-    G.add_edges(edges)
+    This function assigns a community label to each node and saves these labels in a file for future use.
 
-    G.vs["name"] = node["id"].tolist()
+    Parameters:
+        - graph (CSRGraph | Path): Weighted graph artifact of the filtered authors, or its path.
+        - path (Path): Output path to save the results.
+        - algorithm (str): Name of the community detection algorithm to use.
+        - kwargs (Dict): Additional parameters for fine-tuning.
+    """
+    # Create igraph Graph, vertex `i` is the node `graph.node_ids[i]`, built once per stage
+    G = get_igraph(graph)
 
     # Perform community detection using the specified algorithm
     try:
@@ -87,7 +88,7 @@ def community_detection_with_filter(
         elif algorithm == "community_leading_eigenvector":
             partition = G.community_leading_eigenvector()
         elif algorithm == "community_label_propagation":
-            partition = G.community_label_propagation(weights=weights)
+            partition = G.community_label_propagation(weights="weight")
         elif algorithm == "community_multilevel":
             partition = G.community_multilevel()
         elif algorithm == "community_optimal_modularity":
@@ -108,10 +109,10 @@ def community_detection_with_filter(
         logger.error(f"Error during community detection: {e}")
         return
 
-    # Map the community membership to the node DataFrame
-    membership = partition.membership
-    vertex_to_community = dict(zip(G.vs["name"], membership))
-    node["community"] = node["id"].map(vertex_to_community)
+    # Map the community membership to the node IDs
+    result_df = pd.DataFrame(
+        {"id": as_graph(graph).node_ids, "community": partition.membership}
+    )
     logger.info(
         f"Type: author, algorithm: {algorithm}, modularity: {partition.modularity}"
     )
@@ -120,15 +121,15 @@ def community_detection_with_filter(
     try:
         path = path / f"{algorithm}.csv"
         path.parent.mkdir(parents=True, exist_ok=True)
-        result_df = node[["id", "community"]]
         result_df.to_csv(path, index=False)
+        registry.register(path, result_df["id"], community=result_df["community"])
         logger.info(f"Community detection results saved to: {path}")
         logger.info("-" * 85)
     except Exception as e:
         logger.error(f"Error saving the results: {e}")
 
     # Optionally return the community labels for further use
-    return node[["id", "community"]]
+    return result_df
 
 
 if __name__ == "__main__":
@@ -136,8 +137,13 @@ if __name__ == "__main__":
     from pathlib import Path
 
     # Load the node and edge data for authors
-    node_data = load_author_node("./data/author/node.csv")
+    node_data = load_author_node(
+        "./data/author/node.csv",
+        columns=["id", "num_co_authors", "num_papers"],
+        filters=AUTHOR_FILTERS,
+    )
     edge_data = load_author_edge("./data/author/edge.csv")
+    graph = save_author_graph(node_data, edge_data, Path("./data/author/graph"))
 
     algorithm = "community_label_propagation"
 
@@ -146,8 +152,7 @@ if __name__ == "__main__":
 
     # Run community detection with the 'community_walktrap' algorithm
     community_detection_with_filter(
-        node_data,
-        edge_data,
+        graph,
         output_path,
         algorithm,
     )
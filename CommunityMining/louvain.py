@@ -1,61 +1,55 @@
 import pandas as pd
 import igraph as ig
 import leidenalg as la
-from typing import Dict
+from typing import Dict, Union
 from tqdm import tqdm
 from pathlib import Path
 
+from utils.artifacts import registry
+from utils.graph import CSRGraph, as_graph, get_igraph
 from utils.logger import logger
 from utils.wrapper import timer
 
 
 @timer
-def louvain_ig(
-    node: pd.DataFrame, edge: pd.DataFrame, path: Path, **kwargs: Dict
-) -> None:
+def louvain_ig(graph: Union[CSRGraph, Path], path: Path, **kwargs: Dict) -> None:
     """
-    Perform community detection on the given node and edge data using the Leiden algorithm for improved performance.
-    The nodes and edges are expected to be provided as DataFrames, which are generated after pre-processing.
+    Perform community detection on the given graph using the Leiden algorithm for improved performance.
+    The graph is expected to be the paper graph artifact saved by `utils.graph.save_graph` after pre-processing,
+    or its path, which is memory-mapped.
     `kwargs` can include additional hyperparameters to fine-tune the algorithm.
 
     This function assigns a community label to each node and saves these labels in a static file for future use.
 
     Parameters:
-        - node (pd.DataFrame): DataFrame containing node information, including an "id" column.
-        - edge (pd.DataFrame): DataFrame containing edge information, including "src" and "dst" columns.
+        - graph (CSRGraph | Path): Graph artifact of the papers, or its path.
         - path (Path): Output path to save the results.
         - kwargs (Dict): Additional parameters for fine-tuning.
 
     NOTE: The Leiden algorithm is used here for its efficiency on large graphs.
 
     Example usage:
-    >>> louvain_ig(paper_node, paper_edge, output_path)
+    >>> louvain_ig(paper_graph, output_path)
     """
-    # Convert edge data to igraph-compatible format
-    edges = [(src, dst) for src, dst in zip(edge["src"], edge["dst"]) if src != dst]
-
-    # Create igraph Graph
-    G = ig.Graph()
-    G.add_vertices(node["id"].unique())
-    G.add_edges(edges)
-
-    G.vs["name"] = node["id"].tolist()
-    G = G.simplify(loops=True, combine_edges=None)
+    # Create igraph Graph, vertex `i` is the node `graph.node_ids[i]`, without self loops and duplicate
+    # edges: the simplified variant is saved along with the artifact and built once per stage
+    G = get_igraph(graph, simple=True)
     logger.info("The graph is successfully simplified!")
 
     # Perform community detection using Leiden algorithm
     partition = la.find_partition(G, la.ModularityVertexPartition)
 
-    # Map the community membership to the node DataFrame
-    membership = partition.membership
-    vertex_to_community = dict(zip(G.vs["name"], membership))
-    node["community"] = node["id"].map(vertex_to_community)
+    # Map the community membership to the node IDs
+    result_df = pd.DataFrame(
+        {"id": as_graph(graph).node_ids, "community": partition.membership}
+    )
 
     # Save results
     path = path / "louvain.csv"
     path.parent.mkdir(parents=True, exist_ok=True)
-    result_df = node[["id", "community"]]
     result_df.to_csv(path, index=False)
+    # Keep the labels in memory for the following stages of this process
+    registry.register(path, result_df["id"], community=result_df["community"])
 
     logger.info(f"Community detection completed and results saved to {path}")
     logger.info(
@@ -65,8 +59,16 @@ def louvain_ig(
 
 if __name__ == "__main__":
     from utils import load_paper_node, load_paper_edge
+    from utils.graph import save_graph
 
     node_data = load_paper_node("./data/paper/node.csv", skip_isolate=True)
     edge_data = load_paper_edge("./data/paper/edge.csv")
+    graph = save_graph(
+        "./data/paper/graph",
+        node_data["id"],
+        edge_data["src"],
+        edge_data["dst"],
+        simple=True,
+    )
     output_dir = Path("./CommunityMining/results/paper")
-    louvain_ig(node_data, edge_data, output_dir)
+    louvain_ig(graph, output_dir)
@@ -2,7 +2,10 @@ import igraph as ig
 import pandas as pd
 from enum import Enum
 from pathlib import Path
+from typing import Union
 
+from utils.artifacts import registry
+from utils.graph import CSRGraph, as_graph, get_igraph
 from utils.logger import logger
 from utils.wrapper import timer
 
@@ -22,34 +25,25 @@ class Algorithm(Enum):
 
 @timer
 def community_detection_no_filter(
-    node: pd.DataFrame,
-    edge: pd.DataFrame,
+    graph: Union[CSRGraph, Path],
     path: Path,
     algorithm: Algorithm,
 ) -> None:
     """
-    Perform community detection on the given node and edge data using the specified algorithm.
-    The nodes and edges are expected to be provided as DataFrames, which are generated after pre - processing.
-    `kwargs` can include additional parameters if needed.
+    Perform community detection on the given graph using the specified algorithm.
+    The graph is expected to be the paper graph artifact saved by `utils.graph.save_graph` after pre - processing,
+    or its path, which is memory-mapped.
 
     This function assigns a community label to each node and saves these labels in a file for future use.
 
     Parameters:
-        - node (pd.DataFrame): DataFrame containing node information, including an "id" column.
-        - edge (pd.DataFrame): DataFrame containing edge information, including "src" and "dst" columns.
+        - graph (CSRGraph | Path): Graph artifact of the papers, or its path.
         - path (Path): Output path to save the results.
         - algorithm (str): Name of the community detection algorithm to use.
     """
-    # Convert edge data to igraph-compatible format, remove self-loop
-    edges = [(src, dst) for src, dst in zip(edge["src"], edge["dst"]) if src != dst]
-
-    # Create igraph Graph
-    G = ig.Graph()
-    G.add_vertices(node["id"].unique())
-    G.add_edges(edges)
-
-    G.vs["name"] = node["id"].tolist()
-    G = G.simplify(loops=True, combine_edges=None)
+    # Create igraph Graph, vertex `i` is the node `graph.node_ids[i]`, without self loops and duplicate
+    # edges: the simplified variant is saved along with the artifact and built once per stage
+    G = get_igraph(graph, simple=True)
     logger.info("The graph is successfully simplified!")
 
     # Perform community detection using the specified algorithm
@@ -83,16 +77,16 @@ def community_detection_no_filter(
         logger.error(f"Error during community detection: {e}")
         return
 
-    # Map the community membership to the node DataFrame
-    membership = partition.membership
-    vertex_to_community = dict(zip(G.vs["name"], membership))
-    node["community"] = node["id"].map(vertex_to_community)
+    # Map the community membership to the node IDs
+    result_df = pd.DataFrame(
+        {"id": as_graph(graph).node_ids, "community": partition.membership}
+    )
 
     # Save results
     path = path / f"{algorithm.value}.csv"
     path.parent.mkdir(parents=True, exist_ok=True)
-    result_df = node[["id", "community"]]
     result_df.to_csv(path, index=False)
+    registry.register(path, result_df["id"], community=result_df["community"])
     logger.info(f"Community detection results saved to: {path}")
 
     logger.info(f"Community detection completed and results saved to {path}")
@@ -105,6 +99,7 @@ if __name__ == "__main__":
     import pandas as pd
     from pathlib import Path
     from utils import load_paper_node, load_paper_edge
+    from utils.graph import save_graph
 
     # algorithm = Algorithm.LABEL_PROPAGATION
     # algorithm = Algorithm.MULTILEVEL
@@ -112,11 +107,17 @@ if __name__ == "__main__":
 
     node_data = load_paper_node("./data/paper/node.csv", skip_isolate=True)
     edge_data = load_paper_edge("./data/paper/edge.csv")
+    graph = save_graph(
+        "./data/paper/graph",
+        node_data["id"],
+        edge_data["src"],
+        edge_data["dst"],
+        simple=True,
+    )
     output_dir = Path(f"./CommunityMining/results/author")
 
     community_detection_no_filter(
-        node_data,
-        edge_data,
+        graph,
         output_dir,
         algorithm,
     )
@@ -0,0 +1,249 @@
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import zipfile
+import numpy as np
+import pandas as pd
+import yaml
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Final, Tuple
+from sklearn.feature_extraction import FeatureHasher
+from sklearn.feature_extraction.text import HashingVectorizer
+from tqdm import tqdm
+from utils.columnar import is_columnar, load_columnar
+from utils.csr import load_csr
+from utils.logger import logger
+from utils.titles import TitleStore
+from utils.wrapper import timer
+
+N_FEATURES: Final = 2**18
+CHUNK_SIZE: Final = 50_000
+
+
+def _hash_chunk(
+    title_path: Path,
+    start_id: int,
+    years: np.ndarray,
+    venues: np.ndarray,
+    n_features: int = N_FEATURES,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Hash the papers `start_id..start_id + len(years) - 1` into bag-of-words rows, executed in a worker
+    process. The title words and the `venue:`/`year:` tokens share the same `n_features` columns.
+
+    Return the CSR `(data, indices, row lengths)` of the chunk.
+    """
+    titles = TitleStore(title_path)
+    docs = [titles.get(i, "") for i in range(start_id, start_id + len(years))]
+
+    # Both hashers are stateless, so every worker hashes the same token to the same column
+    words = HashingVectorizer(
+        n_features=n_features, alternate_sign=False, norm=None, dtype=np.float32
+    ).transform(docs)
+    meta = FeatureHasher(
+        n_features=n_features,
+        input_type="string",
+        alternate_sign=False,
+        dtype=np.float32,
+    ).transform(
+        ([] if venue < 0 else [f"venue:{venue}"])
+        + ([] if year < 0 else [f"year:{year}"])
+        for venue, year in zip(venues, years)
+    )
+
+    X = (words + meta).tocsr()
+    X.sort_indices()
+
+    return X.data, X.indices.astype(np.int32), np.diff(X.indptr)
+
+
+def _read_columns(path: Path, columns: list) -> pd.DataFrame:
+    """
+    Read only `columns` of the paper node table, either a csv file or a columnar directory.
+    """
+    if is_columnar(path):
+        return load_columnar(path, columns=columns)
+    return pd.read_csv(path, usecols=columns)
+
+
+def _write_npz(path: Path, arrays: Dict[str, object]) -> None:
+    """
+    Write an uncompressed `.npz` archive readable by `np.load`, without holding the arrays in memory.
+
+    Each value is either an array, or a `(raw file, dtype, length)` tuple of a 1-D array spilled to
+    disk, whose bytes are copied into the archive after the `.npy` header.
+    """
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_STORED) as archive:
+        for name, value in arrays.items():
+            with archive.open(f"{name}.npy", "w", force_zip64=True) as f:
+                if isinstance(value, tuple):
+                    raw, dtype, length = value
+                    header = {
+                        "descr": np.lib.format.dtype_to_descr(np.dtype(dtype)),
+                        "fortran_order": False,
+                        "shape": (length,),
+                    }
+                    np.lib.format.write_array_header_2_0(f, header)
+                    with open(raw, "rb") as src:
+                        shutil.copyfileobj(src, f)
+                else:
+                    np.lib.format.write_array(f, np.asanyarray(value))
+
+
+@timer
+def build_paper_features(
+    paper_map: Path,
+    paper_node: Path,
+    venue_map: Path,
+    paper_refs: Path,
+    output: Path,
+    n_features: int = N_FEATURES,
+    chunk_size: int = CHUNK_SIZE,
+    num_workers: int = None,
+    with_adjacency: bool = True,
+) -> None:
+    """
+    Build the hashed bag-of-words attribute matrix `X` of the papers and save it to `output` in the
+    `.npz` layout read by `pipeline.DataUtils` (`attr_data`, `attr_indices`, `attr_indptr`, `attr_shape`).
+
+    Row `i` is the paper of ID `i + 1`: the words of its title from `paper_map`, plus one `venue:` and
+    one `year:` token from `paper_node`, all hashed into `n_features` columns. The papers are hashed
+    `chunk_size` at a time by `num_workers` processes, with at most `2 * num_workers` chunks submitted
+    ahead of the one being written, and the rows of every finished chunk are spilled to disk in order,
+    so the peak memory is bounded by those chunks whatever the number of papers. A paper without
+    a year or a venue, i.e. whose venue is the empty name in `venue_map`, has no such token.
+
+    If `with_adjacency`, the citation graph from `paper_refs` is saved as `adj_*` too, so the archive
+    can be fed to `train.py` directly.
+    """
+    logger.info("Start building the hashed features of papers...")
+    output.parent.mkdir(parents=True, exist_ok=True)
+
+    node = _read_columns(paper_node, ["id", "year", "venue"]).sort_values("id")
+    num_papers = len(node)
+    years = node["year"].fillna(-1).to_numpy(dtype=np.int64)
+    venues = pd.to_numeric(node["venue"]).fillna(-1).to_numpy(dtype=np.int64)
+    del node
+
+    # The papers without a venue share the ID of the empty venue name, which is no venue
+    with open(venue_map, "r", encoding="utf-8") as f:
+        no_venue = [int(idx) for idx, venue in json.load(f).items() if venue == ""]
+    venues[np.isin(venues, no_venue)] = -1
+
+    with tempfile.TemporaryDirectory(dir=output.parent) as tmp:
+        tmp = Path(tmp)
+        indptr = np.zeros(num_papers + 1, dtype=np.int64)
+        nnz = 0
+
+        with open(tmp / "data", "wb") as data_file, open(
+            tmp / "indices", "wb"
+        ) as indices_file, ProcessPoolExecutor(
+            max_workers=num_workers or os.cpu_count() or 1
+        ) as executor:
+            workers = num_workers or os.cpu_count() or 1
+            starts = iter(range(0, num_papers, chunk_size))
+            pending = deque()
+
+            def submit_next() -> None:
+                start = next(starts, None)
+                if start is not None:
+                    pending.append(
+                        (
+                            start,
+                            executor.submit(
+                                _hash_chunk,
+                                paper_map,
+                                start + 1,
+                                years[start : start + chunk_size],
+                                venues[start : start + chunk_size],
+                                n_features,
+                            ),
+                        )
+                    )
+
+            # At most `2 * workers` chunks are in flight, so the finished ones waiting to be written
+            # do not pile up when the writer is slower than the workers
+            for _ in range(2 * workers):
+                submit_next()
+
+            # Collect the chunks in order, each one is written and dropped as soon as it is done
+            with tqdm(
+                desc="Hashing papers...", total=-(-num_papers // chunk_size)
+            ) as progress:
+                while pending:
+                    start, future = pending.popleft()
+                    data, indices, lengths = future.result()
+                    submit_next()
+                    data_file.write(data.tobytes())
+                    indices_file.write(indices.tobytes())
+                    np.cumsum(lengths, out=indptr[start + 1 : start + 1 + len(lengths)])
+                    indptr[start + 1 : start + 1 + len(lengths)] += nnz
+                    nnz += len(data)
+                    progress.update()
+
+        arrays = {
+            "attr_data": (tmp / "data", np.float32, nnz),
+            "attr_indices": (tmp / "indices", np.int32, nnz),
+            "attr_indptr": indptr,
+            "attr_shape": np.array([num_papers, n_features]),
+        }
+
+        if with_adjacency:
+            # The references of paper `i + 1` are row `i`, the IDs are shifted to 0-based columns
+            refs = load_csr(paper_refs)
+            arrays.update(
+                {
+                    "adj_data": np.ones(len(refs.indices), dtype=np.float32),
+                    "adj_indices": np.asarray(refs.indices) - 1,
+                    "adj_indptr": np.asarray(refs.indptr),
+                    "adj_shape": np.array([num_papers, num_papers]),
+                }
+            )
+
+        _write_npz(output, arrays)
+
+    logger.info(
+        f"Successfully save the {num_papers} x {n_features} feature matrix with {nnz} non-zeros to {output}!"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--name", default="dblp", help="Dataset name")
+    parser.add_argument(
+        "--test", action="store_true", help="Build the features of the test data"
+    )
+    parser.add_argument(
+        "--n_features", type=int, default=N_FEATURES, help="Number of hashed columns"
+    )
+    parser.add_argument(
+        "--chunk_size", type=int, default=CHUNK_SIZE, help="Papers per chunk"
+    )
+    parser.add_argument(
+        "--num_workers", type=int, default=None, help="Number of worker processes"
+    )
+    parser.add_argument(
+        "--no_adj", action="store_true", help="Do not save the citation graph"
+    )
+    args = parser.parse_args()
+
+    with open("config.yaml", "r") as file:
+        config = yaml.safe_load(file)
+    base_path = Path("./test" if args.test else "./data")
+    suffix = ".csv" if config["data"]["format"] == "csv" else ""
+
+    build_paper_features(
+        base_path / config["data"]["paper"]["map"],
+        (base_path / config["data"]["paper"]["node"]).with_suffix(suffix),
+        base_path / config["data"]["venue"]["map"],
+        base_path / config["data"]["paper"]["refs"],
+        Path(f"./LinkPrediction/data/{args.name}/{args.name}.npz"),
+        n_features=args.n_features,
+        chunk_size=args.chunk_size,
+        num_workers=args.num_workers,
+        with_adjacency=not args.no_adj,
+    )
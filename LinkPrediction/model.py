@@ -5,12 +5,15 @@ import torch.optim as optim
 import scipy.sparse as sp
 import numpy as np
 
-# 设置随机种子
-seed = 42
-torch.manual_seed(seed)
-np.random.seed(seed)
-if torch.cuda.is_available():
-    torch.cuda.manual_seed(seed)
+
+def set_seed(seed=42):
+    """
+    设置随机种子，在训练开始前调用，而不是在导入模块时。
+    """
+    torch.manual_seed(seed)
+    np.random.seed(seed)
+    if torch.cuda.is_available():
+        torch.cuda.manual_seed(seed)
 
 
 def sparse_feeder(M):
@@ -2,13 +2,19 @@ import argparse
 import torch
 import torch.nn as nn
 import torch.optim as optim
-from model import LACE, GLACE
-from pipeline import DataUtils, score_link_prediction
 import pickle
 import time
 import scipy.sparse as sp
 import numpy as np
 import os
+from pathlib import Path
+from LinkPrediction.model import LACE, GLACE, set_seed
+from LinkPrediction.pipeline import DataUtils, score_link_prediction
+from utils.logger import LOG_DIR
+from utils.wrapper import PROFILE_ENV, profile, profile_dir, start_report
+
+# Root of the repository, the profiles are saved under its `logs/` wherever the script runs from
+ROOT_DIR = Path(__file__).resolve().parents[1]
 
 
 def main():
@@ -37,9 +43,26 @@ def main():
         action="store_true",
         help="Train with all edges; no validation or test set",
     )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="sampling",
+        choices=("sampling", "cprofile"),
+        help="Profile the training with a sampling profiler by default, or cProfile, "
+        "and save the profile in a directory next to the log under logs/",
+    )
     args = parser.parse_args()
 
-    train(args)
+    set_seed(42)
+    if not args.profile:
+        train(args)
+        return
+
+    start_report(ROOT_DIR / LOG_DIR)
+    os.environ[PROFILE_ENV] = args.profile
+    with profile("LinkPrediction.train", kind="stage"):
+        train(args)
+    print(f"The profile of the training is saved in {profile_dir()}.")
 
 
 def train(args):
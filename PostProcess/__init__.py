@@ -1,8 +1,4 @@
-from .filter_author import extract_top_authors_by_community
-from .filter_paper import extract_top_nodes_by_pagerank
-from .combine_author import process_author_data
-from .combine_paper import process_paper_data
-
+from utils.lazy import lazy_exports
 
 __all__ = [
     "extract_top_authors_by_community",
@@ -10,3 +6,13 @@ __all__ = [
     "process_author_data",
     "process_paper_data",
 ]
+
+__getattr__, __dir__ = lazy_exports(
+    __name__,
+    {
+        "extract_top_authors_by_community": ".filter_author",
+        "extract_top_nodes_by_pagerank": ".filter_paper",
+        "process_author_data": ".combine_author",
+        "process_paper_data": ".combine_paper",
+    },
+)
@@ -1,21 +1,24 @@
 import pandas as pd
 from pathlib import Path
+from typing import Union
+from utils.artifacts import NodeTable, as_table
 
 
 def process_author_data(
     author_node_df,
     author_edge_df,
     filtered_ids,
-    community_path="./CommunityMining/results/author/community_label_propagation.csv",
+    community_path: Union[NodeTable, Path] = Path(
+        "./CommunityMining/results/author/community_label_propagation.csv"
+    ),
     output_dir="visualize",
 ):
-    # Load community data
-    community_df = pd.read_csv(community_path)
-    community_df["id"] = community_df["id"].astype(str)
+    # Load community data, shared with `extract_top_authors_by_community`
+    community = as_table(community_path)
 
-    # Merge and filter top-10 communities
-    author_node_df = author_node_df.merge(
-        community_df[["id", "community"]], on="id", how="left"
+    # Attach the community labels by position and filter top-10 communities
+    author_node_df = author_node_df.assign(
+        community=community.lookup("community", author_node_df["id"])
     )
     top_communities = author_node_df["community"].value_counts().head(10).index.tolist()
     author_node_df = author_node_df[author_node_df["community"].isin(top_communities)]
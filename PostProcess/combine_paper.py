@@ -2,6 +2,9 @@ import json
 import shutil
 import pandas as pd
 from pathlib import Path
+from typing import Union
+from utils.artifacts import NodeTable, as_table
+from utils.reducers import GroupBySum, iter_batches
 import warnings
 
 warnings.filterwarnings("ignore")
@@ -13,23 +16,30 @@ def process_paper_data(
     title_map,
     venue_map,
     filtered_ids,
-    community_path="./CommunityMining/results/paper/louvain.csv",
-    centrality_path="./CentralityMeasure/results/centrality_measures.csv",
+    community_path: Union[NodeTable, Path] = Path(
+        "./CommunityMining/results/paper/louvain.csv"
+    ),
+    centrality_path: Union[NodeTable, Path] = Path(
+        "./CentralityMeasure/results/centrality_measures.csv"
+    ),
     diameter_path="./CentralityMeasure/results/diameter.json",
     output_dir="visualize",
+    paper_index=None,
 ):
     """
     Processes paper data to generate various metrics and filter nodes and edges.
 
     Args:
-        paper_node_df
-        paper_edge_df
-        community_path (str): Path to the community data CSV file.
-        centrality_path (str): Path to the centrality measures CSV file.
+        paper_node_df: Paper nodes, either a DataFrame or an iterable of DataFrame batches.
+        paper_edge_df: Paper edges, either a DataFrame or an iterable of DataFrame batches.
+        community_path (NodeTable | Path): Community labels, or the path of the community CSV file.
+        centrality_path (NodeTable | Path): Centrality measures, or the path of the centrality CSV file.
         diameter_path (str): Path to the diameter JSON file.
-        venue_map_path (str): Path to the venue mapping JSON file.
-        title_map_path (str): Path to the title mapping JSON file.
+        title_map (TitleStore): Lazy 'id: title' store, only the filtered titles are read.
+        venue_map (dict): Mapping of 'id: venue'.
         output_dir (str): Directory to save the processed data.
+        paper_index (DataFrame): 'id: index' of at least the filtered papers, see `load_paper_index`.
+            The saved nodes and edges show the original `#index` instead of the interned IDs.
 
     Returns:
         dict: Paths to the output files.
@@ -38,34 +48,45 @@ def process_paper_data(
     vis_dir = Path(output_dir)
     vis_dir.mkdir(parents=True, exist_ok=True)
 
-    # Load and process community data
-    community_df = pd.read_csv(community_path)
-    paper_node_df = paper_node_df.merge(
-        community_df[["id", "community"]], on="id", how="left"
+    # Load community data, shared with `extract_top_nodes_by_pagerank`
+    community = as_table(community_path)
+    top_communities = (
+        pd.Series(community.columns["community"]).value_counts().head(10).index.tolist()
     )
-    top_communities = paper_node_df["community"].value_counts().head(10).index.tolist()
-    paper_node_df = paper_node_df[paper_node_df["community"].isin(top_communities)]
 
-    # Move diameter file
-    shutil.move(diameter_path, vis_dir / "diameter.json")
+    # Copy diameter file, the original one stays the output of the diameter stage
+    shutil.copyfile(diameter_path, vis_dir / "diameter.json")
 
-    # Add centrality column
-    centrality_df = pd.read_csv(centrality_path)
-    paper_node_df = paper_node_df.merge(
-        centrality_df[["id", "pagerank_centrality"]], on="id", how="left"
-    )
+    # Load centrality data, aligned with the community labels if computed on the same graph
+    centrality = as_table(centrality_path)
+
+    # Aggregate the nodes of the top communities batch by batch, so that `paper_node_df`
+    # can also be an iterator of batches, e.g. `utils.loader.iter_paper_node`
+    filtered_ids_set = set(filtered_ids)
+    averages = GroupBySum("community", ["in_d", "pagerank_centrality"])
+    degrees = GroupBySum(["community", "out_d"])
+    filtered_batches = []
+    for batch in iter_batches(paper_node_df):
+        batch = batch.assign(community=community.lookup("community", batch["id"]))
+        batch = batch[batch["community"].isin(top_communities)]
+        batch = batch.assign(
+            pagerank_centrality=centrality.lookup("pagerank_centrality", batch["id"])
+        )
+
+        averages.update(batch)
+        degrees.update(batch)
+        filtered_batches.append(batch[batch["id"].isin(filtered_ids_set)])
 
     # Calculate average in-degree
-    average_in_d = paper_node_df.groupby("community")["in_d"].mean().reset_index()
+    average_df = averages.mean().rename_axis("community")
+    average_in_d = average_df["in_d"].reset_index()
     sorted_average_in_d = average_in_d.sort_values(by="in_d", ascending=False)
     average_in_d_dict = sorted_average_in_d.to_dict(orient="records")
     with open(vis_dir / "citation.json", "w") as f:
         json.dump(average_in_d_dict, f, indent=4)
 
     # Calculate average centrality
-    average_centrality = (
-        paper_node_df.groupby("community")["pagerank_centrality"].mean().reset_index()
-    )
+    average_centrality = average_df["pagerank_centrality"].reset_index()
     sorted_average_centrality = average_centrality.sort_values(
         by="pagerank_centrality", ascending=False
     )
@@ -74,39 +95,38 @@ def process_paper_data(
         json.dump(average_centrality_dict, f, indent=4)
 
     # Calculate degree distribution
-    degree_counts_by_community = (
-        paper_node_df.groupby("community")["out_d"].value_counts().unstack(fill_value=0)
-    )
+    degree_counts_by_community = degrees.result()["count"]
     degree_counts = {}
-    for community, row in degree_counts_by_community.iterrows():
-        non_zero_degrees = row[row > 0]
-        if not non_zero_degrees.empty:
-            min_degree = non_zero_degrees.index.min()
-            max_degree = non_zero_degrees.index.max()
-            degree_counts[community] = {
-                degree: row[degree] if degree in non_zero_degrees.index else 0
-                for degree in range(min_degree, max_degree + 1)
+    community_counts = {}
+    if len(degree_counts_by_community):
+        for community_id in degree_counts_by_community.index.unique(
+            level="community"
+        ).tolist():
+            row = degree_counts_by_community.xs(community_id, level="community")
+            degree_counts[community_id] = {
+                degree: int(row.get(degree, 0))
+                for degree in range(int(row.index.min()), int(row.index.max()) + 1)
             }
+            community_counts[community_id] = int(row.sum())
     with open(vis_dir / "degree.json", "w") as f:
         json.dump(degree_counts, f, indent=4)
 
     # Save community proportions
-    community_counts = paper_node_df["community"].value_counts()
-    community_proportions_dict = community_counts.to_dict()
+    community_proportions_dict = dict(
+        sorted(community_counts.items(), key=lambda item: item[1], reverse=True)
+    )
     with open(vis_dir / "counts.json", "w") as f:
         json.dump(community_proportions_dict, f, indent=4)
 
     # Filter nodes and edges
-    filtered_ids_set = set(filtered_ids)
-
-    paper_node_df_filtered = paper_node_df[paper_node_df["id"].isin(filtered_ids_set)]
-    paper_edge_df_filtered = paper_edge_df[
-        paper_edge_df["src"].isin(filtered_ids_set)
-        & paper_edge_df["dst"].isin(filtered_ids_set)
-    ]
+    paper_node_df_filtered = pd.concat(filtered_batches)
+    paper_edge_df_filtered = pd.concat(
+        batch[batch["src"].isin(filtered_ids_set) & batch["dst"].isin(filtered_ids_set)]
+        for batch in iter_batches(paper_edge_df)
+    )
 
     # Map title and venue
-    paper_node_df_filtered["title"] = paper_node_df_filtered["id"].map(title_map)
+    paper_node_df_filtered["title"] = title_map.lookup(paper_node_df_filtered["id"])
     paper_node_df_filtered["venue"] = paper_node_df_filtered["venue"].map(venue_map)
 
     # Select and save columns
@@ -123,6 +143,15 @@ def process_paper_data(
     ]
     paper_node_df_filtered = paper_node_df_filtered[columns_to_save]
 
+    # The page shows and links the papers by their original `#index`
+    if paper_index is not None:
+        original = pd.Series(
+            paper_index["index"].to_numpy(), index=paper_index["id"].to_numpy()
+        )
+        paper_node_df_filtered["id"] = paper_node_df_filtered["id"].map(original)
+        paper_edge_df_filtered["src"] = paper_edge_df_filtered["src"].map(original)
+        paper_edge_df_filtered["dst"] = paper_edge_df_filtered["dst"].map(original)
+
     paper_node_path = vis_dir / "paper_node.csv"
     paper_edge_path = vis_dir / "paper_edge.csv"
 
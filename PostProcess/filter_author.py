@@ -1,51 +1,60 @@
-import json
+import numpy as np
 import pandas as pd
+from pathlib import Path
+from typing import Union
+from utils.artifacts import NodeTable, as_table
 
 
 def extract_top_authors_by_community(
     author_node_df,
-    community_file="./CommunityMining/results/author/community_label_propagation.csv",
+    community_file: Union[NodeTable, Path] = Path(
+        "./CommunityMining/results/author/community_label_propagation.csv"
+    ),
     top_n_communities=10,
     top_authors_per_community=50,
-) -> list[str]:
+) -> list[int]:
     """
     Extracts the top authors by number of co-authors from the top N communities.
 
     Args:
-        community_file (str): Path to the community CSV file.
-        author_node_file (str): Path to the author node CSV file.
-        output_file (str): Path to save the resulting JSON file.
+        author_node_df (pd.DataFrame): Author nodes with the 'num_co_authors' column.
+        community_file (NodeTable | Path): Community labels, or the path of the community CSV file.
         top_n_communities (int): Number of top communities to consider.
         top_authors_per_community (int): Number of top authors to extract per community.
 
     Returns:
-        str: Path to the output JSON file.
+        list[int]: IDs of the selected authors.
     """
-    # Load the data
-    community_df = pd.read_csv(community_file, dtype={"id": str})
+    # Load the data, parsed once per process and shared with `process_author_data`
+    community = as_table(community_file)
+    labels = community.columns["community"]
 
     # Get the top N communities with the most nodes
     top_communities = (
-        community_df["community"].value_counts().head(top_n_communities).index.tolist()
+        pd.Series(labels).value_counts().head(top_n_communities).index.tolist()
     )
 
-    ids = []
+    # Align 'num_co_authors' with the community labels by position instead of merging on the IDs,
+    # the authors missing from `author_node_df` are dropped like in an inner merge
+    authors = NodeTable(
+        author_node_df["id"].to_numpy(),
+        {"num_co_authors": author_node_df["num_co_authors"].to_numpy()},
+    )
+    num_co_authors = authors.lookup("num_co_authors", community.ids)
+    found = ~np.isnan(num_co_authors)
 
-    for community in top_communities:
-        # Filter the authors in the specific community
-        community_authors = community_df[community_df["community"] == community]
+    ids = []
 
-        # Merge with the author_node_df to get 'num_co_authors'
-        merged_df = pd.merge(
-            community_authors, author_node_df, left_on="id", right_on="id", how="inner"
-        )
+    for community_id in top_communities:
+        # Positions of the authors in the specific community
+        members = np.flatnonzero((labels == community_id) & found)
 
-        # Sort the authors by 'num_co_authors' and get the top authors
-        top_authors = merged_df.nlargest(top_authors_per_community, "num_co_authors")
-        top_authors["id"] = top_authors["id"].astype(str)
+        # Sort the authors by 'num_co_authors' and get the top authors, the ties in order like `nlargest`
+        order = np.argsort(-num_co_authors[members], kind="stable")
+        top_authors = members[order[:top_authors_per_community]]
 
         # Add to the list of IDs
-        ids.extend(top_authors["id"].tolist())
+        ids.extend(community.ids[top_authors].tolist())
 
     return ids
 
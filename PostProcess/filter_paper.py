@@ -1,51 +1,60 @@
-import json
+import numpy as np
 import pandas as pd
+from pathlib import Path
+from typing import Union
+from utils.artifacts import NodeTable, as_table
 
 
 def extract_top_nodes_by_pagerank(
-    community_file="./CommunityMining/results/paper/louvain.csv",
-    pagerank_file="./CentralityMeasure/results/centrality_measures.csv",
+    community_file: Union[NodeTable, Path] = Path(
+        "./CommunityMining/results/paper/louvain.csv"
+    ),
+    pagerank_file: Union[NodeTable, Path] = Path(
+        "./CentralityMeasure/results/centrality_measures.csv"
+    ),
     top_n_communities=10,
     top_nodes_per_community=50,
-) -> list[str]:
+) -> list[int]:
     """
     Extracts the top nodes by PageRank centrality from the largest communities.
 
     Args:
-        community_file (str): Path to the community CSV file.
-        pagerank_file (str): Path to the PageRank centrality CSV file.
+        community_file (NodeTable | Path): Community labels, or the path of the community CSV file.
+        pagerank_file (NodeTable | Path): PageRank centrality, or the path of the centrality CSV file.
         top_n_communities (int): Number of top communities to consider.
         top_nodes_per_community (int): Number of top nodes to extract per community.
 
     Returns:
-        tuple: Path to the output JSON file and the total number of selected IDs.
+        list[int]: IDs of the selected nodes.
     """
-    # Load the data
-    community_data = pd.read_csv(community_file)
-    pagerank_data = pd.read_csv(pagerank_file)
+    # Load the data, parsed once per process and shared with `process_paper_data`
+    community = as_table(community_file)
+    pagerank = as_table(pagerank_file)
 
-    # Merge community data with pagerank centrality
-    merged_data = pd.merge(community_data, pagerank_data, on="id")
+    # Align the pagerank centrality with the community labels by position instead of merging
+    # on the IDs, the nodes without a centrality are dropped like in an inner merge
+    index, found = pagerank.positions(community.ids)
+    ids = community.ids[found]
+    labels = community.columns["community"][found]
+    centrality = pagerank.columns["pagerank_centrality"][index[found]]
 
     # Count nodes in each community and get the largest communities
-    community_counts = merged_data["community"].value_counts().head(top_n_communities)
-    largest_communities = community_counts.index
+    largest_communities = pd.Series(labels).value_counts().head(top_n_communities).index
 
     # List to store selected node IDs
     selected_ids = []
 
     # Iterate over each of the largest communities
-    for community in largest_communities:
-        # Filter nodes for the community
-        community_nodes = merged_data[merged_data["community"] == community]
+    for community_id in largest_communities:
+        # Positions of the nodes of the community
+        members = np.flatnonzero(labels == community_id)
 
-        # Sort by pagerank_centrality and select top nodes
-        top_nodes = community_nodes.nlargest(
-            top_nodes_per_community, "pagerank_centrality"
-        )
+        # Sort by pagerank_centrality and select top nodes, the ties in order like `nlargest`
+        order = np.argsort(-centrality[members], kind="stable")
+        top_nodes = members[order[:top_nodes_per_community]]
 
         # Append the selected node IDs to the list
-        selected_ids.extend(top_nodes["id"].tolist())
+        selected_ids.extend(ids[top_nodes].tolist())
 
     return selected_ids
 
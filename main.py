@@ -1,56 +1,670 @@
-import yaml
 import argparse
+import os
+import sys
 import warnings
 from pathlib import Path
-from typing import Final
-import concurrent.futures
-
-from utils import (
-    save_records_to_csv,
-    load_paper_node,
-    load_paper_edge,
-    load_author_node,
-    load_author_edge,
-    load_map_dict,
-    set_global_seed,
-)
-from utils.logger import logger
-from CommunityMining import (
-    louvain_ig,
-    community_detection_with_filter,
-    community_detection_no_filter,
-    Algorithm,
-)
-from CentralityMeasure import (
-    calculate_centrality_and_statistics,
-    calculate_community_diameters,
-)
-from PostProcess import (
-    extract_top_authors_by_community,
-    extract_top_nodes_by_pagerank,
-    process_author_data,
-    process_paper_data,
-)
-
-
-PREPROCESS: Final = True
+from typing import TYPE_CHECKING, Final, List, NamedTuple, Optional
+
+# Only the standard library is imported here, the subsystems are imported by the stages that use
+# them so that `--help` and the light subcommands start fast
+if TYPE_CHECKING:
+    from utils.cache import StageCache
+    from utils.scheduler import Stage
+
 SEPERATOR: Final = "=" * 85
+# Groups of stages run by each subcommand, the name of a stage starts with its group
+STAGES: Final = {
+    "preprocess": ("preprocess",),
+    "community": ("graph", "community"),
+    "centrality": ("graph", "centrality", "diameter"),
+    "postprocess": ("postprocess",),
+}
+VISUALIZE_DIR: Final = Path("visualize")
 warnings.filterwarnings("ignore")
-set_global_seed(42)
 
 
-if __name__ == "__main__":
-    ############################################################
-    #   Add an argument parser to specify the mode of main.py  #
-    ############################################################
-    parser = argparse.ArgumentParser()
+class Paths(NamedTuple):
+    """
+    Paths of the artifacts parsed from the configuration file.
+    """
+
+    data: Path
+    data_format: str
+    ingested: Path
+    author_node: Path
+    author_edge: Path
+    author_alias: Path
+    venue_map: Path
+    paper_map: Path
+    citation: Path
+    paper_node: Path
+    paper_edge: Path
+    paper_index: Path
+    paper_refs: Path
+    paper_graph: Path
+    author_graph: Path
+    author_comm: Path
+    paper_comm: Path
+    centrality_dir: Path
+
+
+def parse_config(config: dict, base_path: Path) -> Paths:
+    # Node and edge tables in `npy` format are saved as columnar directories without suffix
+    table_suffix = ".csv" if config["data"]["format"] == "csv" else ""
+    data = config["data"]
+
+    return Paths(
+        data=base_path / data["dblp"],
+        data_format=data["reader"],
+        ingested=base_path / data["ingested"],
+        author_node=(base_path / data["author"]["node"]).with_suffix(table_suffix),
+        author_edge=(base_path / data["author"]["edge"]).with_suffix(table_suffix),
+        author_alias=base_path / data["author"]["alias"],
+        venue_map=base_path / data["venue"]["map"],
+        paper_map=base_path / data["paper"]["map"],
+        citation=base_path / data["citation"],
+        paper_node=(base_path / data["paper"]["node"]).with_suffix(table_suffix),
+        paper_edge=(base_path / data["paper"]["edge"]).with_suffix(table_suffix),
+        paper_index=(base_path / data["paper"]["index"]).with_suffix(table_suffix),
+        paper_refs=base_path / data["paper"]["refs"],
+        paper_graph=base_path / data["paper"]["graph"],
+        author_graph=base_path / data["author"]["graph"],
+        author_comm=Path("CommunityMining") / config["community"]["author"],
+        paper_comm=Path("CommunityMining") / config["community"]["paper"],
+        centrality_dir=Path("CentralityMeasure") / config["centrality"]["results"],
+    )
+
+
+def table_paths(config: dict, paths: Paths) -> List[Path]:
+    """
+    Paths of the tables and mappings written by `preprocess`, the author aliases are only written
+    when the authors are disambiguated.
+    """
+    aliases = (
+        [paths.author_alias] if config["preprocess"]["disambiguate_authors"] else []
+    )
+    return [
+        paths.author_node,
+        paths.author_edge,
+        *aliases,
+        paths.venue_map,
+        paths.paper_map,
+        paths.citation,
+        paths.paper_node,
+        paths.paper_edge,
+        paths.paper_index,
+        paths.paper_refs,
+    ]
+
+
+############################################################
+#                          Stages                          #
+############################################################
+# Every stage runs in a worker process of the scheduler and loads the tables it needs
+
+
+def preprocess_stage(
+    config: dict,
+    paths: Paths,
+    chunk_size: Optional[int] = None,
+    num_workers: Optional[int] = None,
+) -> None:
+    from utils import save_records_to_csv
+    from utils.incremental import ingested_snapshots, recover_ingest, staging_dir
+    from utils.logger import logger
+
+    # An interrupted ingestion keeps its snapshot, the tables are built again anyway
+    recover_ingest(staging_dir(paths.paper_index))
+    logger.info("Start preprocessing the original dataset...")
+    save_records_to_csv(
+        paths.data,
+        paths.author_node,
+        paths.author_edge,
+        paths.venue_map,
+        paths.paper_map,
+        paths.citation,
+        paths.paper_node,
+        paths.paper_edge,
+        paths.paper_index,
+        paths.paper_refs,
+        max_authors_per_paper=config["preprocess"]["max_authors_per_paper"],
+        data_format=paths.data_format,
+        author_alias=paths.author_alias,
+        disambiguate=config["preprocess"]["disambiguate_authors"],
+        chunk_size=chunk_size,
+        num_workers=num_workers,
+    )
+    # The snapshots ingested since are part of the dataset, they get the same IDs again
+    for snapshot in ingested_snapshots(paths.ingested):
+        logger.info(f"Start replaying the ingested snapshot {snapshot}...")
+        _ingest(config, paths, snapshot)
+    logger.info("Successfully preprocess the dblp-v9 dataset!")
+
+
+def _ingest(
+    config: dict, paths: Paths, data_path: Path, snapshot: Optional[Path] = None
+) -> int:
+    from utils import ingest_records
+
+    return ingest_records(
+        data_path,
+        paths.author_node,
+        paths.author_edge,
+        paths.venue_map,
+        paths.paper_map,
+        paths.citation,
+        paths.paper_node,
+        paths.paper_edge,
+        paths.paper_index,
+        paths.paper_refs,
+        max_authors_per_paper=config["preprocess"]["max_authors_per_paper"],
+        data_format=paths.data_format,
+        author_alias=paths.author_alias,
+        snapshot=snapshot,
+    )
+
+
+def _load_paper_tables(paths: Paths):
+    from utils import load_paper_node, load_paper_edge
+
+    return (
+        load_paper_node(paths.paper_node, fillna=True, skip_isolate=True),
+        load_paper_edge(paths.paper_edge),
+    )
+
+
+def paper_graph_stage(paths: Paths) -> None:
+    from utils import load_paper_node, load_paper_edge
+    from utils.graph import save_graph
+
+    node = load_paper_node(paths.paper_node, columns=["id"], skip_isolate=True)
+    edge = load_paper_edge(paths.paper_edge)
+    save_graph(paths.paper_graph, node["id"], edge["src"], edge["dst"], simple=True)
+
+
+def author_graph_stage(paths: Paths) -> None:
+    from utils import load_author_node, load_author_edge
+    from CommunityMining import save_author_graph, AUTHOR_FILTERS
+
+    save_author_graph(
+        load_author_node(
+            paths.author_node,
+            columns=["id", "num_co_authors", "num_papers"],
+            filters=AUTHOR_FILTERS,
+        ),
+        load_author_edge(paths.author_edge),
+        paths.author_graph,
+    )
+
+
+# The community stages attach to the memory-mapped graph artifacts instead of loading the tables
+def author_community_stage(paths: Paths) -> None:
+    from CommunityMining import community_detection_with_filter, Algorithm
+
+    community_detection_with_filter(
+        paths.author_graph, paths.author_comm, Algorithm.LABEL_PROPAGATION.value
+    )
+
+
+def louvain_stage(paths: Paths) -> None:
+    from CommunityMining import louvain_ig
+
+    louvain_ig(paths.paper_graph, paths.paper_comm)
+
+
+def paper_community_stage(paths: Paths, algorithm: str) -> None:
+    from CommunityMining import community_detection_no_filter, Algorithm
+
+    community_detection_no_filter(
+        paths.paper_graph, paths.paper_comm, Algorithm[algorithm]
+    )
+
+
+def centrality_stage(paths: Paths) -> None:
+    from CentralityMeasure import calculate_centrality_and_statistics
+
+    calculate_centrality_and_statistics(paths.paper_graph, paths.centrality_dir)
+
+
+def diameter_stage(paths: Paths) -> None:
+    from CentralityMeasure import calculate_community_diameters
+
+    calculate_community_diameters(
+        paths.paper_graph,
+        paths.paper_comm / "louvain.csv",
+        paths.centrality_dir / "diameter.json",
+    )
+
+
+def author_postprocess_stage(paths: Paths) -> None:
+    from utils import load_author_node, load_author_edge
+    from utils.logger import logger
+    from PostProcess import extract_top_authors_by_community, process_author_data
+
+    logger.info("Start generating author data for visualization...")
+    author_node = load_author_node(paths.author_node)
+    community = paths.author_comm / "community_label_propagation.csv"
+    author_id = extract_top_authors_by_community(author_node, community)
+    process_author_data(
+        author_node, load_author_edge(paths.author_edge), author_id, community
+    )
+    logger.info("Successfully generate author data for visualization!")
+
+
+def paper_postprocess_stage(paths: Paths) -> None:
+    from utils import load_map_dict, load_paper_index, load_titles
+    from utils.logger import logger
+    from PostProcess import extract_top_nodes_by_pagerank, process_paper_data
+
+    logger.info("Start generating paper data for visualization...")
+    # The outputs are memory-mapped once into the artifact registry of the process, then shared
+    community = paths.paper_comm / "louvain.csv"
+    centrality = paths.centrality_dir / "centrality_measures.csv"
+    paper_id = extract_top_nodes_by_pagerank(community, centrality)
+    process_paper_data(
+        *_load_paper_tables(paths),
+        load_titles(paths.paper_map),
+        load_map_dict(paths.venue_map),
+        paper_id,
+        community,
+        centrality,
+        paths.centrality_dir / "diameter.json",
+        paper_index=load_paper_index(paths.paper_index, [("id", "in", paper_id)]),
+    )
+    logger.info("Successfully generate paper data for visualization!")
+
+
+def build_stages(
+    config: dict, paths: Paths, memory_budget: Optional[float] = None
+) -> List["Stage"]:
+    """
+    Declare the pipeline as a DAG of stages, with the inputs, parameters and outputs of each stage
+    for the cache. The memory of a stage is estimated from the size of its inputs, the factors
+    being rough peaks in GiB per GiB of inputs on the full dblp-v9 dataset.
+
+    With a `memory_budget` in GiB, every stage with its own process pool, i.e. the preprocess
+    parsing the dataset with processes of `PARSE_WORKER_MEMORY` each, gets as many processes as
+    the budget leaves room for on top of its estimated peak, see `fit_workers`. If the peak of the
+    preprocess exceeds the budget, it builds the rows of the author table in chunks as well.
+    """
+    from utils.logger import logger
+    from utils.incremental import ingested_snapshots
+    from utils.preprocess import AUTHOR_CHUNK_SIZE, PARSE_WORKER_MEMORY
+    from utils.scheduler import Stage, estimate_memory, fit_workers
+    from CommunityMining import AUTHOR_FILTERS
+
+    author_tables = (paths.author_node, paths.author_edge)
+    paper_tables = (paths.paper_node, paths.paper_edge)
+    author_comm = paths.author_comm / "community_label_propagation.csv"
+    louvain = paths.paper_comm / "louvain.csv"
+    centrality = paths.centrality_dir / "centrality_measures.csv"
+    diameter = paths.centrality_dir / "diameter.json"
+    author_visualize = ("author_node.csv", "author_edge.csv")
+    paper_visualize = (
+        "paper_node.csv",
+        "paper_edge.csv",
+        "citation.json",
+        "centrality.json",
+        "degree.json",
+        "counts.json",
+        "diameter.json",
+    )
+
+    stages = [
+        Stage(
+            "preprocess",
+            preprocess_stage,
+            (config, paths),
+            # Parses the shards of the dataset with its own process pool
+            cores=os.cpu_count() or 1,
+            memory_per_input=3.0,
+            worker_memory=PARSE_WORKER_MEMORY,
+            # The ingested snapshots are replayed after the dataset
+            inputs=(paths.data, *ingested_snapshots(paths.ingested)),
+            params={
+                "preprocess": config["preprocess"],
+                "format": config["data"]["format"],
+                "reader": paths.data_format,
+                "outputs": table_paths(config, paths),
+            },
+            outputs=tuple(table_paths(config, paths)),
+        ),
+        Stage(
+            "graph/paper",
+            paper_graph_stage,
+            (paths,),
+            deps=("preprocess",),
+            memory_per_input=4.0,
+            inputs=paper_tables,
+            params={"simple": True},
+            outputs=(paths.paper_graph,),
+        ),
+        Stage(
+            "graph/author",
+            author_graph_stage,
+            (paths,),
+            deps=("preprocess",),
+            memory_per_input=2.0,
+            inputs=author_tables,
+            params={"filters": AUTHOR_FILTERS},
+            outputs=(paths.author_graph,),
+        ),
+        Stage(
+            "community/author",
+            author_community_stage,
+            (paths,),
+            deps=("graph/author",),
+            memory_per_input=3.0,
+            inputs=(paths.author_graph,),
+            params={"algorithm": "label_propagation"},
+            outputs=(author_comm,),
+        ),
+        Stage(
+            "community/louvain",
+            louvain_stage,
+            (paths,),
+            deps=("graph/paper",),
+            memory_per_input=3.0,
+            inputs=(paths.paper_graph,),
+            params={"algorithm": "louvain"},
+            outputs=(louvain,),
+        ),
+    ]
+    for algorithm in ("LABEL_PROPAGATION", "MULTILEVEL"):
+        stages.append(
+            Stage(
+                f"community/{algorithm.lower()}",
+                paper_community_stage,
+                (paths, algorithm),
+                deps=("graph/paper",),
+                memory_per_input=3.0,
+                inputs=(paths.paper_graph,),
+                params={"algorithm": algorithm},
+                outputs=(paths.paper_comm / f"community_{algorithm.lower()}.csv",),
+            )
+        )
+    stages += [
+        Stage(
+            "centrality",
+            centrality_stage,
+            (paths,),
+            deps=("graph/paper",),
+            memory_per_input=3.0,
+            inputs=(paths.paper_graph,),
+            outputs=(centrality,),
+        ),
+        Stage(
+            "diameter",
+            diameter_stage,
+            (paths,),
+            deps=("graph/paper", "community/louvain"),
+            memory_per_input=3.0,
+            inputs=(paths.paper_graph, louvain),
+            outputs=(diameter,),
+        ),
+        Stage(
+            "postprocess/author",
+            author_postprocess_stage,
+            (paths,),
+            deps=("community/author",),
+            memory_per_input=1.5,
+            inputs=author_tables + (author_comm,),
+            outputs=tuple(VISUALIZE_DIR / name for name in author_visualize),
+        ),
+        Stage(
+            "postprocess/paper",
+            paper_postprocess_stage,
+            (paths,),
+            deps=("community/louvain", "centrality", "diameter"),
+            memory_per_input=2.0,
+            inputs=paper_tables
+            + (
+                paths.paper_map,
+                paths.venue_map,
+                paths.paper_index,
+                louvain,
+                centrality,
+                diameter,
+            ),
+            outputs=tuple(VISUALIZE_DIR / name for name in paper_visualize),
+        ),
+    ]
+
+    if memory_budget is not None:
+        preprocess = stages[0]
+        chunk_size = (
+            AUTHOR_CHUNK_SIZE if estimate_memory(preprocess) > memory_budget else None
+        )
+        rows = f"{chunk_size} at a time" if chunk_size else "at once"
+        logger.info(f"Preprocess with the author rows built {rows}.")
+        stages[0] = preprocess._replace(args=preprocess.args + (chunk_size,))
+        stages = [fit_workers(stage, memory_budget) for stage in stages]
+
+    return stages
+
+
+def ingest(args, config: dict, paths: Paths, cache: "StageCache") -> None:
+    from utils.incremental import recover_ingest, snapshot_path, staging_dir
+    from utils.logger import logger
+
+    # Complete an interrupted ingestion first, its snapshot takes the next number
+    recover_ingest(staging_dir(paths.paper_index))
+
+    def preprocess_key() -> str:
+        preprocess = build_stages(config, paths)[0]
+        return cache.fingerprint(preprocess.inputs, preprocess.params)
+
+    fresh = cache.is_fresh("preprocess", preprocess_key(), table_paths(config, paths))
+    logger.info(f"Start ingesting new records from {args.path}...")
+    # The snapshot is kept with the dataset, so that `preprocess` replays it when it runs again.
+    # It is committed along with the tables, see `ingest_records`.
+    snapshot = snapshot_path(args.path, paths.ingested)
+    if _ingest(config, paths, args.path, snapshot) == 0:
+        return
+
+    if fresh:
+        # The tables are the ones `preprocess` builds from the dataset and the snapshots
+        cache.record("preprocess", preprocess_key(), table_paths(config, paths))
+    else:
+        logger.info(
+            "The tables were not up to date, the next run preprocesses the dataset again "
+            "and replays the ingested snapshots."
+        )
+    logger.info(f"Successfully ingest the new records, saved as {snapshot}!")
+    logger.info(SEPERATOR)
+
+
+def sample(args, config: dict, paths: Paths) -> None:
+    from utils import sample_dataset
+    from utils.logger import logger
+
+    # The subset is written where the configuration expects the dataset in its own data directory,
+    # then preprocessed into the tables, so that `--root` runs the pipeline on it
+    sample_paths = parse_config(config, args.output)
+    if sample_paths.data.resolve() == paths.data.resolve():
+        logger.error(f"The subset cannot overwrite the sampled dataset {paths.data}.")
+        sys.exit(1)
+    logger.info(
+        f"Start sampling {args.fraction:.2%} of the papers of {paths.data} into {args.output}..."
+    )
+    sample_dataset(
+        paths.data,
+        paths.paper_index,
+        paths.paper_refs,
+        sample_paths.data,
+        args.fraction,
+        method=args.method,
+        seed=args.seed,
+        data_format=paths.data_format,
+    )
+    preprocess_stage(config, sample_paths)
+    logger.info(
+        f"Successfully sample the dataset, run `python main.py --root {args.output}` on it!"
+    )
+    logger.info(SEPERATOR)
+
+
+def serve(args) -> None:
+    """
+    Serve the repository over HTTP, the visualization page being `/static/`, as `liveserver` does.
+    """
+    from functools import partial
+    from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+    handler = partial(SimpleHTTPRequestHandler, directory=str(Path(__file__).parent))
+    with ThreadingHTTPServer((args.host, args.port), handler) as server:
+        print(f"Serving the visualization on http://{args.host}:{args.port}/static/")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+def _add_common_arguments(parser: argparse.ArgumentParser, subcommand: bool) -> None:
+    """
+    Add the options shared by all subcommands, accepted both before and after the subcommand.
+    The copies of the subcommands have no default, so they do not override the global ones.
+    """
+    default = argparse.SUPPRESS if subcommand else False
+    parser.add_argument(
+        "--test",
+        action="store_true",
+        default=default,
+        help="Run the script in test mode",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        default=default,
+        help="Recompute the stages even if their outputs are up to date",
+    )
+    parser.add_argument(
+        "--tracemalloc",
+        type=int,
+        default=argparse.SUPPRESS if subcommand else 0,
+        metavar="N",
+        help="Record the top N allocation sites of every stage in the run "
+        "report under logs/, which slows them down",
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="sampling",
+        choices=("sampling", "cprofile"),
+        default=argparse.SUPPRESS if subcommand else None,
+        help="Profile every stage and outermost timed function, with a sampling profiler by "
+        "default, and save its collapsed stacks or cProfile dump in a directory next to the log",
+    )
+    parser.add_argument(
+        "--root",
+        type=Path,
+        default=argparse.SUPPRESS if subcommand else None,
+        metavar="DIR",
+        help="Data directory laid out as in config.yaml, e.g. a subset cut by `sample`, "
+        "instead of `data` or `test` in test mode",
+    )
+    parser.add_argument(
+        "--memory-budget",
+        type=float,
+        default=argparse.SUPPRESS if subcommand else None,
+        metavar="GIB",
+        help="Memory shared by the stages in GiB, the physical memory by default. The stages "
+        "are estimated from their inputs and run fewer at a time, or in chunks, to stay under it",
+    )
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Preprocess the DBLP dataset, mine its communities and centrality, "
+        "and generate the data of the visualization.",
+        epilog="Without a subcommand, all stages run, or only preprocess with `--test`.",
+    )
+    _add_common_arguments(parser, subcommand=False)
     parser.add_argument(
-        "--test", action="store_true", help="Run the script in test mode"
+        "--all",
+        action="store_true",
+        help="Run all stages in test mode, same as the `all` subcommand",
+    )
+
+    subparsers = parser.add_subparsers(dest="command", metavar="command")
+    commands = {
+        "preprocess": "Preprocess the original dataset into node and edge tables",
+        "community": "Mine the communities of authors and papers",
+        "centrality": "Calculate the centrality of papers and the community diameters",
+        "postprocess": "Generate the data of the visualization",
+        "all": "Run all stages, the independent ones in parallel",
+    }
+    for name, help in commands.items():
+        _add_common_arguments(subparsers.add_parser(name, help=help), subcommand=True)
+
+    ingest = subparsers.add_parser(
+        "ingest", help="Incrementally ingest the new papers of a dblp file"
+    )
+    _add_common_arguments(ingest, subcommand=True)
+    ingest.add_argument("path", type=Path, help="dblp file with the new records")
+
+    sample = subparsers.add_parser(
+        "sample",
+        help="Cut a subset of the papers sampled on the citation graph, and preprocess it",
+    )
+    _add_common_arguments(sample, subcommand=True)
+    sample.add_argument("output", type=Path, help="Data directory of the subset")
+    sample.add_argument(
+        "--fraction",
+        type=float,
+        default=0.01,
+        help="Fraction of the papers to keep, e.g. 0.01 or 0.1",
+    )
+    sample.add_argument(
+        "--method",
+        choices=("forest_fire", "snowball"),
+        default="forest_fire",
+        help="Sampling method on the citation graph",
     )
-    parser.add_argument("--all", action="store_true", help="Run the script in all mode")
-    args = parser.parse_args()
-    root_dir = "data" if not args.test else "test"
-    base_path = Path(f"./{root_dir}")
+    sample.add_argument("--seed", type=int, default=42, help="Seed of the sampler")
+
+    serve = subparsers.add_parser(
+        "serve", help="Serve the visualization page over HTTP"
+    )
+    serve.add_argument("--host", default="127.0.0.1", help="Address to bind")
+    serve.add_argument("--port", type=int, default=5500, help="Port to listen on")
+
+    return parser
+
+
+def main() -> None:
+    ############################################################
+    #  Parse the subcommand and the mode of main.py            #
+    ############################################################
+    args = build_parser().parse_args()
+    if args.command == "serve":
+        serve(args)
+        return
+
+    if args.command in STAGES:
+        groups = STAGES[args.command]
+    elif args.command == "all" or not args.test or args.all:
+        groups = sum(STAGES.values(), ())
+    else:
+        groups = STAGES["preprocess"]
+
+    import yaml
+    from utils import set_global_seed
+    from utils.cache import StageCache
+    from utils.logger import logger
+    from utils.scheduler import run_pipeline
+    from utils.wrapper import PROFILE_ENV, TRACEMALLOC_ENV, profile_dir, start_report
+
+    # Inherited by the worker processes of the stages
+    report = start_report()
+    if args.tracemalloc:
+        os.environ[TRACEMALLOC_ENV] = str(args.tracemalloc)
+    if args.profile:
+        os.environ[PROFILE_ENV] = args.profile
+
+    set_global_seed(42)
+    root_dir = args.root or Path("data" if not args.test else "test")
+    base_path = Path(root_dir)
     logger.info(
         "=" * 20 + f"       Run script main.py in {root_dir} mode       " + "=" * 20
     )
@@ -62,134 +676,39 @@ if __name__ == "__main__":
         config = yaml.safe_load(file)
     logger.info("Successfully load the configuration file!")
 
-    DATA_PATH: Final = base_path / config["data"]["dblp"]
-    AUTHOR_NODE: Final = base_path / config["data"]["author"]["node"]
-    AUTHOR_EDGE: Final = base_path / config["data"]["author"]["edge"]
-    VENUE_MAP: Final = base_path / config["data"]["venue"]["map"]
-    PAPER_MAP: Final = base_path / config["data"]["paper"]["map"]
-    CITATION: Final = base_path / config["data"]["citation"]
-    PAPER_NODE: Final = base_path / config["data"]["paper"]["node"]
-    PAPER_EDGE: Final = base_path / config["data"]["paper"]["edge"]
-
-    community_path = Path("CommunityMining")
-    AUTHOR_COMM: Final = community_path / config["community"]["author"]
-    PAPER_COMM: Final = community_path / config["community"]["paper"]
-
-    centrality_path = Path("CentralityMeasure")
-    CENTRALITY_DIR: Final = centrality_path / config["centrality"]["results"]
-
+    paths = parse_config(config, base_path)
     logger.info("Successfully parse the configuration file!")
     logger.info(SEPERATOR)
 
     ############################################################
-    #                   Preprocess the dataset                 #
+    #           Conducting tasks on the dataset                #
     ############################################################
-    if PREPROCESS:
-        logger.info("Start preprocessing the original dataset...")
-        save_records_to_csv(
-            DATA_PATH,
-            AUTHOR_NODE,
-            AUTHOR_EDGE,
-            VENUE_MAP,
-            PAPER_MAP,
-            CITATION,
-            PAPER_NODE,
-            PAPER_EDGE,
-        )
-        logger.info("Successfully preprocess the dblp-v9 dataset!")
-        logger.info(SEPERATOR)
+    # The stages whose inputs and parameters did not change since their last run are skipped
+    cache = StageCache(force=args.force)
+    if args.command == "ingest":
+        ingest(args, config, paths, cache)
+        return
+    if args.command == "sample":
+        sample(args, config, paths)
+        return
 
-    ############################################################
-    #                     Load the dataset                     #
-    ############################################################
-    logger.info("Start loading dataframes and mappings...")
-    df_author_node: Final = load_author_node(AUTHOR_NODE)
-    df_author_edge: Final = load_author_edge(AUTHOR_EDGE)
-    dict_venue_map = load_map_dict(VENUE_MAP)
-    dict_paper_map = load_map_dict(PAPER_MAP)
-    dict_citation = load_map_dict(CITATION)
-    df_paper_node: Final = load_paper_node(PAPER_NODE, fillna=True, skip_isolate=True)
-    df_paper_edge: Final = load_paper_edge(PAPER_EDGE)
-    logger.info("Successfully load dataframes and mappings for dblp-v9 dataset!")
+    stages = [
+        stage
+        for stage in build_stages(config, paths, args.memory_budget)
+        if stage.name.split("/")[0] in groups
+    ]
+    timings = run_pipeline(stages, memory_budget=args.memory_budget, cache=cache)
+    logger.info(f"The resource usage of the stages is reported in {report}.")
+    if args.profile:
+        logger.info(f"The profiles of the stages are saved in {profile_dir()}.")
     logger.info(SEPERATOR)
-
-    ############################################################
-    #           Conducting tasks on the dataset                #
-    ############################################################
-    if not args.test or args.all:
-        # Community Mining
-        def community_mining():
-            logger.info("Start conducting community mining...")
-
-            with concurrent.futures.ProcessPoolExecutor() as executor:
-                # Start the tasks in parallel
-                futures = [
-                    executor.submit(
-                        community_detection_with_filter,
-                        df_author_node,
-                        df_author_edge,
-                        AUTHOR_COMM,
-                        Algorithm.LABEL_PROPAGATION.value,
-                    ),
-                    executor.submit(
-                        louvain_ig, df_paper_node, df_paper_edge, PAPER_COMM
-                    ),
-                    executor.submit(
-                        community_detection_no_filter,
-                        df_paper_node,
-                        df_paper_edge,
-                        PAPER_COMM,
-                        Algorithm.LABEL_PROPAGATION,
-                    ),
-                    executor.submit(
-                        community_detection_no_filter,
-                        df_paper_node,
-                        df_paper_edge,
-                        PAPER_COMM,
-                        Algorithm.MULTILEVEL,
-                    ),
-                ]
-
-                # Wait for all tasks to complete
-                for future in concurrent.futures.as_completed(futures):
-                    try:
-                        future.result()
-                    except Exception as e:
-                        logger.error(f"Error during community mining: {e}")
-
-            logger.info("Successfully mine the community of each node!")
-            logger.info(SEPERATOR)
-
-        community_mining()
-
-        # Centrality Measure and diameter
-        logger.info("Start calculating centrality and diameter...")
-        calculate_centrality_and_statistics(
-            df_paper_node, df_paper_edge, CENTRALITY_DIR
+    if any(timing.status in ("failed", "cancelled") for timing in timings.values()):
+        sys.exit(1)
+    if "postprocess" in groups:
+        logger.info(
+            "Now you can run `python main.py serve` to open the visualization page!!!"
         )
 
-        calculate_community_diameters(
-            df_paper_node,
-            df_paper_edge,
-            PAPER_COMM / "louvain.csv",
-            CENTRALITY_DIR / "diameter.json",
-        )
-        logger.info("Successfully calculate centrality and diameter!")
-        logger.info(SEPERATOR)
-
-        # Filter ids for visualization
-        logger.info("Start filtering ids for visualization...")
-        author_id = extract_top_authors_by_community(df_author_node)
-        paper_id = extract_top_nodes_by_pagerank()
-        logger.info("Successfully filter out ids for visualization!")
-        logger.info(SEPERATOR)
-
-        # Generate data for visualization
-        logger.info("Start generating data for visualization...")
-        process_author_data(df_author_node, df_author_edge, author_id)
-        process_paper_data(
-            df_paper_node, df_paper_edge, dict_paper_map, dict_venue_map, paper_id
-        )
-        logger.info("Successfully generate data for visualization!")
-        logger.info(SEPERATOR)
-        logger.info("Now you can use `liveserver` to open the visualization page!!!")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+import os
+import random
+import shutil
+import tempfile
+import yaml
+from pathlib import Path
+from typing import Dict, List
+from main import Paths, parse_config, preprocess_stage
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+
+
+def pytest_configure(config):
+    """
+    Run the tests in a scratch directory, the logs, reports and caches are written relative to the
+    working directory when the modules are imported, i.e. before the tests are collected.
+    """
+    config.cwd = os.getcwd()
+    config.work_dir = tempfile.mkdtemp(prefix="socialnetwork-tests-")
+    os.chdir(config.work_dir)
+
+
+def pytest_unconfigure(config):
+    os.chdir(config.cwd)
+    shutil.rmtree(config.work_dir, ignore_errors=True)
+
+
+def load_config(table_format: str = "csv", **preprocess) -> dict:
+    """
+    The configuration of the repository, with the given table format and preprocess options.
+    """
+    with open(ROOT_DIR / "config.yaml", "r") as f:
+        config = yaml.safe_load(f)
+    config["data"]["format"] = table_format
+    config["preprocess"].update(preprocess)
+    return config
+
+
+def make_papers(num_papers: int, seed: int = 0, prefix: str = "p") -> List[Dict]:
+    """
+    Random papers in the fields of the v9 format, citing earlier papers only. Some have no
+    authors, year, venue or references, and authors are drawn from a small pool so they share papers.
+    """
+    rng = random.Random(seed)
+    names = [f"Author {i}" for i in range(max(num_papers // 3, 2))]
+    venues = ["", "Venue A", "Venue B", "Venue C"]
+    papers = []
+    for i in range(num_papers):
+        papers.append(
+            {
+                "id": f"{prefix}{i:05d}",
+                "title": f"Paper {i} on topic {rng.randrange(10)}",
+                "authors": rng.sample(names, rng.randrange(0, 4)),
+                "year": rng.choice([None, 1999, 2005, 2010, 2015]),
+                "venue": rng.choice(venues),
+                "references": [
+                    papers[j]["id"]
+                    for j in sorted(rng.sample(range(i), min(i, rng.randrange(0, 4))))
+                ],
+            }
+        )
+    return papers
+
+
+def write_v9(papers: List[Dict], path: Path) -> Path:
+    """
+    Write papers in the v9 line-tag format.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        for paper in papers:
+            f.write(f"#*{paper['title']}\n#@{', '.join(paper['authors'])}\n")
+            f.write(f"#t{paper['year'] or ''}\n#c{paper['venue']}\n")
+            f.write(f"#index{paper['id']}\n")
+            for ref in paper["references"]:
+                f.write(f"#%{ref}\n")
+            f.write("\n")
+    return path
+
+
+def preprocess(
+    data: Path, base_path: Path, config: dict = None, ingested: List[Path] = ()
+) -> Paths:
+    """
+    Preprocess `data` into `base_path` laid out as in the configuration, like `main.py preprocess`,
+    with the `ingested` snapshots saved to be replayed.
+    """
+    from utils.incremental import save_snapshot
+
+    config = config or load_config()
+    paths = parse_config(config, base_path)
+    paths.data.parent.mkdir(parents=True, exist_ok=True)
+    shutil.copy(data, paths.data)
+    for snapshot in ingested:
+        save_snapshot(snapshot, paths.ingested)
+    preprocess_stage(config, paths)
+    return paths
+
+
+def materialize(df: "pd.DataFrame") -> "pd.DataFrame":
+    """
+    Copy the memory-mapped numpy columns of a DataFrame into arrays, so they compare as arrays.
+    """
+    import numpy as np
+
+    df = df.reset_index(drop=True)
+    for name, column in df.items():
+        if isinstance(column.dtype, np.dtype):
+            df[name] = np.array(column)
+    return df
+
+
+def read_tables(paths: Paths) -> Dict[str, "pd.DataFrame"]:
+    """
+    The node, edge and index tables written by the preprocess, as loaded by the pipeline with the
+    missing values filled, see `materialize`.
+    """
+    from utils import (
+        load_author_edge,
+        load_author_node,
+        load_paper_edge,
+        load_paper_index,
+        load_paper_node,
+    )
+
+    tables = {
+        "author_node": load_author_node(paths.author_node, fillna=True),
+        "author_edge": load_author_edge(paths.author_edge),
+        "paper_node": load_paper_node(paths.paper_node, fillna=True),
+        "paper_edge": load_paper_edge(paths.paper_edge),
+        "paper_index": load_paper_index(paths.paper_index),
+    }
+    return {name: materialize(df) for name, df in tables.items()}
@@ -0,0 +1,44 @@
+import os
+import numpy as np
+import pandas as pd
+from utils.artifacts import ArtifactRegistry, NodeTable, arrays_path
+from utils.columnar import META_FILE
+
+
+def _save(path, ids, community):
+    pd.DataFrame({"id": ids, "community": community}).to_csv(path, index=False)
+
+
+def test_other_process_maps_arrays(tmp_path):
+    path = tmp_path / "louvain.csv"
+    _save(path, [3, 1, 7], [0, 1, 0])
+    ArtifactRegistry().register(path, [3, 1, 7], community=[0, 1, 0])
+    assert arrays_path(path) == tmp_path / "louvain"
+
+    # The arrays are memory-mapped read-only instead of parsing the file
+    table = ArtifactRegistry().get(path)
+    assert not table.columns["community"].flags.writeable
+    assert table.ids.tolist() == [3, 1, 7]
+    assert table.lookup("community", [7, 3]).tolist() == [0, 0]
+
+
+def test_file_saved_after_arrays(tmp_path):
+    path = tmp_path / "louvain.csv"
+    _save(path, [3, 1, 7], [0, 1, 0])
+    ArtifactRegistry().register(path, [3, 1, 7], community=[0, 1, 0])
+    _save(path, [3, 1], [2, 2])
+    meta = (arrays_path(path) / META_FILE).stat().st_mtime_ns
+    os.utime(path, ns=(meta + 1, meta + 1))
+
+    table = ArtifactRegistry().get(path)
+    assert table.columns["community"].flags.writeable
+    assert table.ids.tolist() == [3, 1]
+    assert table.columns["community"].dtype == np.int64
+
+
+def test_lookup_missing_ids():
+    table = NodeTable(np.array([1, 3, 7]), {"community": np.array([5, 6, 7])})
+
+    assert table.lookup("community", [1, 3, 7]).tolist() == [5, 6, 7]
+    values = table.lookup("community", [7, 2])
+    assert values[0] == 7 and np.isnan(values[1])
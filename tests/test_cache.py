@@ -0,0 +1,79 @@
+from utils.cache import StageCache
+
+
+def _stage(tmp_path, cache, params=None):
+    source, output = tmp_path / "source.txt", tmp_path / "output.txt"
+    key = cache.fingerprint([source], params or {"seed": 42})
+    return key, [output]
+
+
+def test_fresh_until_changed(tmp_path):
+    (tmp_path / "source.txt").write_text("source")
+    (tmp_path / "output.txt").write_text("output")
+    cache = StageCache(tmp_path / "manifest.json")
+    key, outputs = _stage(tmp_path, cache)
+
+    assert not cache.is_fresh("stage", key, outputs)
+    cache.record("stage", key, outputs)
+    assert cache.is_fresh("stage", key, outputs)
+    # The manifest is saved when the stage is recorded
+    assert StageCache(tmp_path / "manifest.json").is_fresh("stage", key, outputs)
+
+    assert _stage(tmp_path, cache, {"seed": 0})[0] != key
+    (tmp_path / "source.txt").write_text("changed")
+    assert _stage(tmp_path, cache)[0] != key
+
+    (tmp_path / "output.txt").write_text("changed")
+    assert not cache.is_fresh("stage", key, outputs)
+
+
+def test_missing_output_is_stale(tmp_path):
+    (tmp_path / "source.txt").write_text("source")
+    cache = StageCache(tmp_path / "manifest.json")
+    key, outputs = _stage(tmp_path, cache)
+
+    # The output was not written by the stage, writing it later does not make the stage fresh
+    cache.record("stage", key, outputs)
+    assert not cache.is_fresh("stage", key, outputs)
+    (tmp_path / "output.txt").write_text("output")
+    assert not cache.is_fresh("stage", key, outputs)
+
+    cache.record("stage", key, outputs)
+    assert cache.is_fresh("stage", key, outputs)
+    (tmp_path / "output.txt").unlink()
+    assert not cache.is_fresh("stage", key, outputs)
+
+
+def test_undeclared_output_is_stale(tmp_path):
+    (tmp_path / "output.txt").write_text("output")
+    (tmp_path / "alias.json").write_text("{}")
+    cache = StageCache(tmp_path / "manifest.json")
+    key, outputs = _stage(tmp_path, cache)
+
+    cache.record("stage", key, outputs)
+    assert not cache.is_fresh("stage", key, outputs + [tmp_path / "alias.json"])
+
+
+def test_force_and_invalidate(tmp_path):
+    (tmp_path / "output.txt").write_text("output")
+    cache = StageCache(tmp_path / "manifest.json")
+    key, outputs = _stage(tmp_path, cache)
+    cache.record("stage", key, outputs)
+
+    assert not StageCache(tmp_path / "manifest.json", force=True).is_fresh(
+        "stage", key, outputs
+    )
+    cache.invalidate("stage")
+    assert not StageCache(tmp_path / "manifest.json").is_fresh("stage", key, outputs)
+
+
+def test_directory_digest(tmp_path):
+    table = tmp_path / "table"
+    table.mkdir()
+    (table / "id.npy").write_bytes(b"ids")
+    cache = StageCache(tmp_path / "manifest.json")
+
+    digest = cache.digest(table)
+    assert digest is not None and cache.digest(tmp_path / "missing") is None
+    (table / "name.npy").write_bytes(b"names")
+    assert cache.digest(table) != digest
@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+from utils.citation import CitationStore, add_citations, save_citations
+
+
+def _author_papers(rng, num_rows, num_authors):
+    return pd.DataFrame(
+        {
+            "authors": rng.integers(1, num_authors + 1, num_rows),
+            "year": pd.array(
+                rng.choice([1990, 2000, 2001, 2015, None], num_rows), dtype="Int16"
+            ),
+            "in_d": rng.integers(1, 5, num_rows),
+        }
+    )
+
+
+def test_store_queries(tmp_path):
+    author_papers = pd.DataFrame(
+        {
+            "authors": [1, 1, 2, 1],
+            "year": [2001, 2003, 2003, 2001],
+            "in_d": [2, 5, 1, 1],
+        }
+    )
+    save_citations(author_papers, tmp_path / "citation")
+    citations = CitationStore(tmp_path / "citation")
+
+    assert len(citations) == 2
+    assert citations.yearly(1) == {2001: 3, 2002: 0, 2003: 5}
+    assert citations.between(1, 2000, 2001) == {2000: 0, 2001: 3}
+    assert citations.total(1) == 8 and citations.total(2) == 1
+    assert citations.yearly(0) == {} and citations.yearly(9) == {}
+
+
+def test_add_matches_save(tmp_path):
+    rng = np.random.default_rng(0)
+    old, new = _author_papers(rng, 200, 30), _author_papers(rng, 50, 40)
+
+    save_citations(old, tmp_path / "added", num_authors=30)
+    add_citations(new, tmp_path / "added", num_authors=40)
+    save_citations(pd.concat([old, new]), tmp_path / "saved", num_authors=40)
+
+    added, saved = CitationStore(tmp_path / "added"), CitationStore(tmp_path / "saved")
+    for expected, actual in zip(saved.csr, added.csr):
+        np.testing.assert_array_equal(actual, expected)
@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+import pytest
+from conftest import (
+    load_config,
+    make_papers,
+    materialize,
+    preprocess,
+    read_tables,
+    write_v9,
+)
+from utils.columnar import (
+    append_columnar,
+    is_columnar,
+    load_columnar,
+    save_columnar,
+    saves_columnar,
+)
+
+
+@pytest.fixture
+def frame():
+    return pd.DataFrame(
+        {
+            "id": np.arange(5, dtype=np.int32),
+            "year": pd.array([2015, None, 1990, None, 2001], dtype="Int16"),
+            "score": np.linspace(0, 1, 5),
+            "isolate": [True, False, True, False, False],
+            "name": pd.array(["a", None, "", "ü#b", "c"], dtype="string"),
+        }
+    )
+
+
+def test_round_trip(tmp_path, frame):
+    save_columnar(frame, tmp_path / "table")
+
+    assert is_columnar(tmp_path / "table")
+    pd.testing.assert_frame_equal(materialize(load_columnar(tmp_path / "table")), frame)
+    assert isinstance(
+        load_columnar(tmp_path / "table", columns=["id"])["id"].to_numpy().base,
+        np.memmap,
+    )
+
+
+def test_load_rows(tmp_path, frame):
+    save_columnar(frame, tmp_path / "table")
+    rows = np.array([1, 3, 4])
+
+    loaded = load_columnar(tmp_path / "table", columns=["year", "name"], rows=rows)
+
+    pd.testing.assert_frame_equal(loaded, frame[["year", "name"]].iloc[rows])
+
+
+def test_append(tmp_path, frame):
+    # The first rows have no missing values, so the masks are created by the appends
+    save_columnar(frame.iloc[[0, 2]], tmp_path / "table")
+    append_columnar(frame.iloc[[1, 3]], tmp_path / "table")
+    append_columnar(frame.iloc[:0], tmp_path / "table")
+    append_columnar(frame.iloc[[4]], tmp_path / "table")
+
+    loaded = materialize(load_columnar(tmp_path / "table"))
+    pd.testing.assert_frame_equal(
+        loaded, frame.iloc[[0, 2, 1, 3, 4]].reset_index(drop=True)
+    )
+    with pytest.raises(ValueError, match="dtype"):
+        append_columnar(frame.astype({"year": "Int32"}), tmp_path / "table")
+    with pytest.raises(ValueError, match="columns"):
+        append_columnar(frame[["id", "name"]], tmp_path / "table")
+
+
+def test_table_paths(tmp_path):
+    (tmp_path / "empty").mkdir()
+
+    assert not is_columnar(tmp_path / "empty")
+    assert saves_columnar(tmp_path / "node")
+    assert not saves_columnar(tmp_path / "node.csv")
+    with pytest.raises(ValueError):
+        saves_columnar(tmp_path / "node.parquet")
+
+
+def test_npy_tables_match_csv(tmp_path):
+    data = write_v9(make_papers(120), tmp_path / "dblp.txt")
+
+    csv = preprocess(data, tmp_path / "csv", load_config("csv"))
+    npy = preprocess(data, tmp_path / "npy", load_config("npy"))
+
+    assert is_columnar(npy.paper_node) and csv.paper_node.suffix == ".csv"
+    csv_tables, npy_tables = read_tables(csv), read_tables(npy)
+    for name, table in csv_tables.items():
+        pd.testing.assert_frame_equal(npy_tables[name], table, obj=name)
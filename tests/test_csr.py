@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+from utils.csr import CSRIndex, append_csr, append_npy, load_csr, save_csr
+
+
+@pytest.fixture
+def csr():
+    # Rows [1, 2], [], [0], [3, 1, 2]
+    return CSRIndex(
+        np.array([0, 2, 2, 3, 6]),
+        np.array([1, 2, 0, 3, 1, 2], dtype=np.int32),
+        np.arange(6, dtype=np.float32),
+    )
+
+
+def test_rows(csr):
+    assert csr.num_rows == 4
+    np.testing.assert_array_equal(csr.row(3), [3, 1, 2])
+    np.testing.assert_array_equal(csr.counts(), [2, 0, 1, 3])
+    rows, values = csr.explode()
+    np.testing.assert_array_equal(rows, [0, 0, 2, 3, 3, 3])
+    np.testing.assert_array_equal(values, csr.indices)
+
+
+def test_take(csr):
+    taken = csr.take([3, 1, 0])
+
+    np.testing.assert_array_equal(taken.indptr, [0, 3, 3, 5])
+    np.testing.assert_array_equal(taken.indices, [3, 1, 2, 1, 2])
+    np.testing.assert_array_equal(taken.weights, [3, 4, 5, 0, 1])
+
+
+def test_save_load(tmp_path, csr):
+    save_csr(tmp_path / "csr", *csr)
+    loaded = load_csr(tmp_path / "csr")
+
+    assert isinstance(loaded.indices, np.memmap)
+    for expected, actual in zip(csr, loaded):
+        np.testing.assert_array_equal(actual, expected)
+
+    # Saving again without weights drops the stale ones
+    save_csr(tmp_path / "csr", csr.indptr, csr.indices)
+    assert load_csr(tmp_path / "csr").weights is None
+
+
+@pytest.mark.parametrize("version", [(1, 0), (2, 0)])
+def test_append_npy(tmp_path, version):
+    file = tmp_path / "values.npy"
+    with open(file, "wb") as f:
+        np.lib.format.write_array(f, np.arange(9, dtype=np.int64), version=version)
+    header_size = file.stat().st_size - 9 * 8
+
+    append_npy(file, [9])
+    append_npy(file, np.arange(10, 1000))
+
+    np.testing.assert_array_equal(np.load(file), np.arange(1000))
+    # The shape grew within the header, the array was appended in place
+    assert file.stat().st_size == header_size + 1000 * 8
+
+
+def test_append_npy_without_room_in_header(tmp_path):
+    # A header without room for a longer shape, as written by other tools than `np.save`
+    header = "{'descr': '<i4', 'fortran_order': False, 'shape': (3,), }"
+    header = header[:-1] + " " * (-(len(header) + 11) % 64) + "}\n"
+    file = tmp_path / "values.npy"
+    with open(file, "wb") as f:
+        f.write(b"\x93NUMPY\x01\x00" + len(header).to_bytes(2, "little"))
+        f.write(header.encode("latin1"))
+        f.write(np.arange(3, dtype=np.int32).tobytes())
+
+    append_npy(file, np.arange(3, 10**6 + 3))
+
+    np.testing.assert_array_equal(np.load(file), np.arange(10**6 + 3))
+    assert file.stat().st_size > 64 + (10**6 + 3) * 4
+
+
+def test_append_csr(tmp_path, csr):
+    save_csr(tmp_path / "csr", csr.indptr[:3], csr.indices[:2])
+
+    append_csr(tmp_path / "csr", np.array([0, 1, 4]), csr.indices[2:])
+
+    loaded = load_csr(tmp_path / "csr")
+    np.testing.assert_array_equal(loaded.indptr, csr.indptr)
+    np.testing.assert_array_equal(loaded.indices, csr.indices)
@@ -0,0 +1,78 @@
+import pandas as pd
+from utils.disambiguation import apply_author_mapping, disambiguate_authors
+
+
+def test_same_form():
+    authors = pd.Series(
+        ["José Smith#Ann Lee", "Jose Smith", "José Smith", "jose smith."]
+    )
+    venues = pd.Series(["KDD"] * 4)
+
+    mapping = disambiguate_authors(authors, venues)
+
+    assert mapping == {"Jose Smith": "José Smith", "jose smith.": "José Smith"}
+
+
+def test_abbreviated_form():
+    authors = pd.Series(
+        [
+            "John Smith#Ann Lee#Bo Chen",
+            "J. Smith#Ann Lee#Bo Chen",
+            "John Smith#Bo Chen",
+            "Jane Smith#Xi Wu",
+        ]
+    )
+    venues = pd.Series(["KDD", "KDD", "ICML", "SIGIR"])
+
+    mapping = disambiguate_authors(authors, venues, threshold=0.3)
+
+    assert mapping == {"J. Smith": "John Smith"}
+
+
+def test_ambiguous_form():
+    # "J. Smith" shares everything with both full forms
+    authors = pd.Series(
+        ["John Smith#Ann Lee", "James Smith#Ann Lee", "J. Smith#Ann Lee"]
+    )
+    venues = pd.Series(["KDD"] * 3)
+
+    assert disambiguate_authors(authors, venues) == {}
+
+
+def test_no_given_name():
+    authors = pd.Series(["Plato#Ann Lee", "P. Plato#Ann Lee", "", None])
+    venues = pd.Series(["KDD", "KDD", None, None])
+
+    assert disambiguate_authors(authors, venues) == {}
+
+
+def test_apply_mapping():
+    authors = pd.Series(["J. Smith#John Smith#Ann Lee", "J. Smith", None])
+
+    renamed = apply_author_mapping(authors, {"J. Smith": "John Smith"})
+
+    assert renamed.tolist()[:2] == ["John Smith#Ann Lee", "John Smith"]
+    assert pd.isna(renamed[2])
+    assert apply_author_mapping(authors, {}) is authors
+
+
+def test_non_latin_names():
+    authors = pd.Series(
+        [
+            "王伟#Ann Lee",
+            "李娜",
+            "李娜#Bo Chen",
+            "Σωκράτης#Σωκρατης",
+            "Иван Петров#Ann Lee",
+            "Иван Петров",
+            "ИВАН ПЕТРОВ",
+            "Ivan Петров#Ivan Иванов",
+        ]
+    )
+    venues = pd.Series(["KDD"] * len(authors))
+
+    # Only the spellings of the same name are merged
+    assert disambiguate_authors(authors, venues) == {
+        "Σωκρατης": "Σωκράτης",
+        "ИВАН ПЕТРОВ": "Иван Петров",
+    }
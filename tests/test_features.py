@@ -0,0 +1,80 @@
+import json
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from conftest import make_papers, preprocess, write_v9
+from LinkPrediction.features import build_paper_features
+from sklearn.feature_extraction import FeatureHasher
+from sklearn.feature_extraction.text import HashingVectorizer
+from utils.titles import TitleStore
+
+
+def _load(path, prefix):
+    archive = np.load(path)
+    return sp.csr_matrix(
+        (
+            archive[f"{prefix}_data"],
+            archive[f"{prefix}_indices"],
+            archive[f"{prefix}_indptr"],
+        ),
+        shape=tuple(archive[f"{prefix}_shape"]),
+    )
+
+
+def _build(paths, output, **kwargs):
+    build_paper_features(
+        paths.paper_map,
+        paths.paper_node,
+        paths.venue_map,
+        paths.paper_refs,
+        output,
+        n_features=2**10,
+        **kwargs,
+    )
+    return output
+
+
+def test_chunks_match_one_pass(tmp_path):
+    papers = make_papers(60)
+    paths = preprocess(write_v9(papers, tmp_path / "dblp.txt"), tmp_path / "data")
+
+    whole = _build(paths, tmp_path / "whole.npz", chunk_size=1000, num_workers=1)
+    # More chunks than the window of in-flight chunks
+    chunked = _build(paths, tmp_path / "chunked.npz", chunk_size=4, num_workers=2)
+
+    X, chunked_X = _load(whole, "attr"), _load(chunked, "attr")
+    assert X.shape == (60, 2**10)
+    assert (X != chunked_X).nnz == 0
+    assert (X.getnnz(axis=1) > 0).all()
+
+    adjacency = _load(whole, "adj")
+    assert adjacency.nnz == sum(len(p["references"]) for p in papers)
+
+
+def test_missing_venue(tmp_path):
+    papers = make_papers(30)
+    paths = preprocess(write_v9(papers, tmp_path / "dblp.txt"), tmp_path / "data")
+    X = _load(_build(paths, tmp_path / "features.npz", num_workers=1), "attr")
+
+    # The papers with an empty `#c` line have the ID of the empty venue name
+    with open(paths.venue_map, "r", encoding="utf-8") as f:
+        id_to_venue = {int(idx): venue for idx, venue in json.load(f).items()}
+    node = pd.read_csv(paths.paper_node).sort_values("id")
+    assert (
+        (node["venue"].map(id_to_venue) == "").sum()
+        == sum(paper["venue"] == "" for paper in papers)
+        > 0
+    )
+
+    titles = TitleStore(paths.paper_map)
+    words = HashingVectorizer(
+        n_features=2**10, alternate_sign=False, norm=None, dtype=np.float32
+    ).transform(titles.get(i, "") for i in node["id"])
+    meta = FeatureHasher(
+        n_features=2**10, input_type="string", alternate_sign=False, dtype=np.float32
+    ).transform(
+        ([] if id_to_venue[venue] == "" else [f"venue:{venue}"])
+        + ([] if pd.isna(year) else [f"year:{int(year)}"])
+        for venue, year in zip(node["venue"], node["year"])
+    )
+    assert (X != (words + meta).tocsr()).nnz == 0
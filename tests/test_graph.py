@@ -0,0 +1,106 @@
+import os
+import igraph as ig
+import numpy as np
+import pytest
+from utils.graph import (
+    GRAPH_META,
+    _iter_edge_pairs,
+    clear_igraph_cache,
+    get_igraph,
+    load_graph,
+    save_graph,
+    simplify_edges,
+)
+
+NODE_IDS = np.array([40, 10, 30, 20])
+
+
+def _multigraph(seed=0, num_vertices=30, num_edges=200):
+    # Many self loops and duplicate edges in both directions
+    rng = np.random.default_rng(seed)
+    return rng.integers(0, num_vertices, (2, num_edges))
+
+
+def test_round_trip(tmp_path):
+    # The edge to the unknown node 99 is dropped
+    src, dst = [10, 40, 10, 99, 30], [20, 30, 30, 10, 30]
+    weights = [1.5, 2.0, 3.0, 4.0, 5.0]
+
+    graph = save_graph(tmp_path / "graph", NODE_IDS, src, dst, weights)
+
+    assert not graph.adjacency.indices.flags.writeable
+    assert graph.node_ids.tolist() == NODE_IDS.tolist() and not graph.directed
+    # The edges are grouped by source vertex, in their order otherwise
+    assert [graph.edges()[0].tolist(), graph.edges()[1].tolist()] == [
+        [0, 1, 1, 2],
+        [2, 3, 2, 2],
+    ]
+    assert graph.adjacency.weights.tolist() == [2.0, 1.5, 3.0, 5.0]
+    loaded = load_graph(tmp_path / "graph")
+    for expected, actual in zip(graph.adjacency, loaded.adjacency):
+        np.testing.assert_array_equal(actual, expected)
+
+    G = graph.to_igraph()
+    assert G.vcount() == 4 and G.ecount() == 4 and not G.is_directed()
+    assert G.es["weight"] == [2.0, 1.5, 3.0, 5.0]
+    assert G.get_edgelist() == [(0, 2), (1, 3), (1, 2), (2, 2)]
+
+
+@pytest.mark.parametrize("directed", [False, True])
+def test_simple_matches_igraph(tmp_path, directed):
+    src, dst = _multigraph()
+    ids = np.arange(30)
+    expected = ig.Graph(n=30, edges=list(zip(src, dst)), directed=directed)
+    expected.simplify(loops=True, multiple=True, combine_edges=None)
+
+    save_graph(tmp_path / "graph", ids, src, dst, directed=directed, simple=True)
+
+    simple = load_graph(tmp_path / "graph", simple=True)
+    assert simple.adjacency.weights is None
+    assert simple.to_igraph().get_edgelist() == expected.get_edgelist()
+    assert load_graph(tmp_path / "graph").num_edges == 200
+    assert simplify_edges(src, dst, 30, directed)[0].tolist() == [
+        edge[0] for edge in expected.get_edgelist()
+    ]
+
+
+def test_simple_variant_required(tmp_path):
+    save_graph(tmp_path / "graph", NODE_IDS, [10], [20], simple=True)
+    save_graph(tmp_path / "graph", NODE_IDS, [10], [20])
+
+    assert not (tmp_path / "graph" / "simple").exists()
+    with pytest.raises(ValueError, match="simplified"):
+        load_graph(tmp_path / "graph", simple=True)
+
+
+def test_igraph_cache(tmp_path):
+    path = tmp_path / "graph"
+    save_graph(path, NODE_IDS, [10, 10], [20, 20], simple=True)
+    clear_igraph_cache()
+
+    G = get_igraph(path)
+    assert get_igraph(path) is G
+    assert get_igraph(path, simple=True) is not G
+    assert get_igraph(path, simple=True).ecount() == 1
+
+    # Saved again, the artifact has a newer `graph.json`
+    version = (path / GRAPH_META).stat().st_mtime_ns
+    save_graph(path, NODE_IDS, [10, 30, 40], [20, 20, 20])
+    os.utime(path / GRAPH_META, ns=(version + 10**9, version + 10**9))
+    assert get_igraph(path) is not G and get_igraph(path).ecount() == 3
+
+    H = get_igraph(path)
+    clear_igraph_cache()
+    assert get_igraph(path) is not H
+    # A graph given directly is not cached
+    graph = load_graph(path)
+    assert get_igraph(graph) is not get_igraph(graph)
+
+
+def test_edge_pairs():
+    src, dst = np.arange(10), np.arange(10, 20)
+
+    pairs = list(_iter_edge_pairs(src, dst, chunk_size=3))
+
+    assert pairs == list(zip(range(10), range(10, 20)))
+    assert all(type(value) is int for value in pairs[-1])
@@ -0,0 +1,173 @@
+import filecmp
+import json
+import numpy as np
+import pandas as pd
+import pytest
+from conftest import load_config, make_papers, preprocess, read_tables, write_v9
+from main import _ingest
+from utils import incremental
+from utils import load_citations, load_map_dict, load_paper_refs, load_titles
+from utils.incremental import snapshot_path, staging_dir
+
+
+def _by_name(paths):
+    """
+    The tables with the authors and venues given by name instead of by ID, since the ingestion
+    interns the new ones after the existing ones while the preprocess sorts them.
+    """
+    tables = read_tables(paths)
+    authors = tables["author_node"]
+    names = dict(zip(authors["id"].astype(str), authors["name"]))
+    venues = load_map_dict(paths.venue_map)
+    citations = load_citations(paths.citation)
+
+    papers = tables["paper_node"].assign(
+        authors=lambda df: [[names[a] for a in row] for row in df["authors"]],
+        venue=lambda df: df["venue"].map(venues),
+    )
+    authors = (
+        authors.assign(
+            co_authors=lambda df: [
+                sorted(names[a] for a in row) for row in df["co_authors"]
+            ],
+            papers=lambda df: [sorted(row) for row in df["papers"]],
+            citations=lambda df: [citations.yearly(i) for i in df["id"]],
+        )
+        .drop(columns="id")
+        .sort_values("name", ignore_index=True)
+    )
+    edges = sorted(
+        (*sorted((names[str(src)], names[str(dst)])), w)
+        for src, dst, w in tables["author_edge"].itertuples(index=False)
+    )
+    return papers, authors, edges
+
+
+@pytest.mark.parametrize("table_format", ["csv", "npy"])
+def test_ingest_matches_full_preprocess(tmp_path, table_format):
+    config = load_config(table_format)
+    papers = make_papers(150)
+    old = write_v9(papers[:100], tmp_path / "old.txt")
+    # The new records repeat an ingested paper, which is skipped
+    new = write_v9(papers[99:], tmp_path / "new.txt")
+    full = preprocess(
+        write_v9(papers, tmp_path / "full.txt"), tmp_path / "full", config
+    )
+
+    paths = preprocess(old, tmp_path / "ingest", config)
+    assert _ingest(config, paths, new) == 50
+    assert _ingest(config, paths, new) == 0
+
+    full_tables, tables = read_tables(full), read_tables(paths)
+    for name in ("paper_edge", "paper_index"):
+        pd.testing.assert_frame_equal(tables[name], full_tables[name], obj=name)
+    for expected, actual in zip(_by_name(full), _by_name(paths)):
+        if isinstance(expected, pd.DataFrame):
+            pd.testing.assert_frame_equal(actual, expected)
+        else:
+            assert actual == expected
+
+    refs, full_refs = load_paper_refs(paths.paper_refs), load_paper_refs(
+        full.paper_refs
+    )
+    np.testing.assert_array_equal(refs.indptr, full_refs.indptr)
+    np.testing.assert_array_equal(refs.indices, full_refs.indices)
+    ids = range(1, len(papers) + 1)
+    assert load_titles(paths.paper_map).lookup(ids) == [p["title"] for p in papers]
+
+
+def test_preprocess_replays_the_ingested_snapshots(tmp_path):
+    papers = make_papers(120)
+    old = write_v9(papers[:80], tmp_path / "old.txt")
+    new = write_v9(papers[80:], tmp_path / "new.txt")
+    config = load_config()
+
+    ingested = preprocess(old, tmp_path / "ingest", config)
+    _ingest(config, ingested, new)
+    replayed = preprocess(old, tmp_path / "replay", config, ingested=[new])
+
+    for name, table in read_tables(ingested).items():
+        pd.testing.assert_frame_equal(read_tables(replayed)[name], table, obj=name)
+    for name in ("venue_map", "paper_map", "citation", "paper_refs"):
+        expected, actual = getattr(ingested, name), getattr(replayed, name)
+        if expected.is_dir():
+            comparison = filecmp.dircmp(expected, actual)
+            assert not comparison.diff_files and not comparison.left_only, name
+        else:
+            assert filecmp.cmp(expected, actual, shallow=False), name
+
+
+def _files(paths):
+    """
+    The contents of the files of a data directory by relative path.
+    """
+    base = paths.data.parents[1]
+    return {
+        file.relative_to(base).as_posix(): file.read_bytes()
+        for file in sorted(base.rglob("*"))
+        if file.is_file()
+    }
+
+
+def _ingested(tmp_path, name, config, papers):
+    paths = preprocess(
+        write_v9(papers[:60], tmp_path / "old.txt"), tmp_path / name, config
+    )
+    new = write_v9(papers[59:], tmp_path / "new.txt")
+    return paths, new
+
+
+@pytest.mark.parametrize("table_format", ["csv", "npy"])
+@pytest.mark.parametrize("failure", [0, 6, -1])
+def test_interrupted_ingest(tmp_path, monkeypatch, table_format, failure):
+    config, papers = load_config(table_format), make_papers(90)
+    expected, new = _ingested(tmp_path, "expected", config, papers)
+    _ingest(config, expected, new, snapshot_path(new, expected.ingested))
+
+    paths, new = _ingested(tmp_path, "interrupted", config, papers)
+    apply_operation, applied = incremental._apply_operation, []
+
+    def interrupt(staging, operation):
+        # Fail at the given operation of the commit, `-1` for the last one
+        with open(staging / incremental.MANIFEST_FILE, "r") as f:
+            num_operations = len(json.load(f))
+        if len(applied) == failure % num_operations:
+            raise KeyboardInterrupt
+        applied.append(operation)
+        apply_operation(staging, operation)
+
+    monkeypatch.setattr(incremental, "_apply_operation", interrupt)
+    with pytest.raises(KeyboardInterrupt):
+        _ingest(config, paths, new, snapshot_path(new, paths.ingested))
+    assert (staging_dir(paths.paper_index) / incremental.MANIFEST_FILE).exists()
+    monkeypatch.undo()
+
+    # The committed ingestion is completed, its papers are not ingested twice
+    assert _ingest(config, paths, new, snapshot_path(new, paths.ingested)) == 0
+    assert not staging_dir(paths.paper_index).exists()
+    assert _files(paths) == _files(expected)
+
+
+def test_interrupted_staging(tmp_path, monkeypatch):
+    config, papers = load_config(), make_papers(90)
+    expected, new = _ingested(tmp_path, "expected", config, papers)
+    _ingest(config, expected, new)
+
+    paths, new = _ingested(tmp_path, "interrupted", config, papers)
+    before = _files(paths)
+
+    def interrupt(*args, **kwargs):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(incremental, "add_citations", interrupt)
+    with pytest.raises(KeyboardInterrupt):
+        _ingest(config, paths, new)
+    monkeypatch.undo()
+
+    # Nothing was committed, the staged outputs are dropped by the next ingestion
+    after = _files(paths)
+    assert {
+        name: data for name, data in after.items() if ".ingest" not in name
+    } == before
+    assert _ingest(config, paths, new) == 30
+    assert _files(paths) == _files(expected)
@@ -0,0 +1,145 @@
+import numpy as np
+import pandas as pd
+import pytest
+from conftest import load_config, make_papers, materialize, preprocess, write_v9
+from utils import load_author_edge, load_author_node, load_paper_node
+from utils.loader import FILTER_OPS, LIST_BATCH_ROWS, _split_lists, iter_paper_node
+
+# The filter of each operator and the predicate it stands for, rows with a missing value failing it
+OP_FILTERS = [
+    (("year", "==", 2005), lambda v: v == 2005),
+    (("year", "!=", 2005), lambda v: v != 2005),
+    (("year", "<", 2005), lambda v: v < 2005),
+    (("year", "<=", 2005), lambda v: v <= 2005),
+    (("year", ">", 2005), lambda v: v > 2005),
+    (("year", ">=", 2005), lambda v: v >= 2005),
+    (("year", "in", [1999, 2015]), lambda v: v in (1999, 2015)),
+    (("year", "not in", [1999, 2015]), lambda v: v not in (1999, 2015)),
+]
+
+
+@pytest.fixture(scope="module")
+def tables(tmp_path_factory):
+    """
+    The same papers preprocessed into csv files and into columnar directories.
+    """
+    tmp_path = tmp_path_factory.mktemp("loader")
+    data = write_v9(make_papers(120, seed=3), tmp_path / "data.txt")
+    return {
+        table_format: preprocess(
+            data, tmp_path / table_format, load_config(table_format)
+        )
+        for table_format in ["csv", "npy"]
+    }
+
+
+def _expected(df: pd.DataFrame, column: str, predicate) -> pd.DataFrame:
+    keep = [value is not pd.NA and predicate(value) for value in df[column]]
+    return df[np.array(keep, dtype=bool)]
+
+
+def test_filter_ops_covered():
+    assert {op for (_, op, _), _ in OP_FILTERS} == set(FILTER_OPS)
+
+
+@pytest.mark.parametrize("table_format", ["csv", "npy"])
+@pytest.mark.parametrize("filter, predicate", OP_FILTERS, ids=lambda x: str(x))
+def test_filter_op(tables, table_format, filter, predicate):
+    path = tables[table_format].paper_node
+    full = load_paper_node(path)
+
+    loaded = load_paper_node(path, filters=[filter])
+
+    expected = _expected(full, "year", predicate)
+    assert 0 < len(loaded) < len(full)
+    assert loaded.index.tolist() == expected.index.tolist()
+    pd.testing.assert_frame_equal(materialize(loaded), materialize(expected))
+
+
+@pytest.mark.parametrize("table_format", ["csv", "npy"])
+def test_combined_filters(tables, table_format):
+    path = tables[table_format].author_edge
+    full = load_author_edge(path)
+
+    loaded = load_author_edge(path, filters=[("w", ">", 1), ("src", "<=", 20)])
+
+    expected = full[(full["w"] > 1) & (full["src"] <= 20)]
+    assert 0 < len(loaded) < len(full)
+    pd.testing.assert_frame_equal(materialize(loaded), materialize(expected))
+
+
+@pytest.mark.parametrize("table_format", ["csv", "npy"])
+def test_skip_isolate_projection(tables, table_format):
+    path = tables[table_format].paper_node
+    full = load_paper_node(path)
+
+    loaded = load_paper_node(path, skip_isolate=True, columns=["id", "year"])
+    batches = list(
+        iter_paper_node(path, batch_size=50, skip_isolate=True, columns=["id", "year"])
+    )
+
+    expected = full.loc[~full["isolate"], ["id", "year"]]
+    assert 0 < len(loaded) < len(full)
+    assert list(loaded.columns) == ["id", "year"]
+    pd.testing.assert_frame_equal(materialize(loaded), materialize(expected))
+    pd.testing.assert_frame_equal(
+        materialize(pd.concat(batches)), materialize(expected)
+    )
+
+
+def test_unknown_filter_op(tables):
+    with pytest.raises(ValueError, match="Unknown filter operator"):
+        load_paper_node(tables["csv"].paper_node, filters=[("year", "~", 2005)])
+
+
+@pytest.mark.parametrize(
+    "load, table, kwargs",
+    [
+        (load_paper_node, "paper_node", {}),
+        (load_paper_node, "paper_node", {"filters": [("venue", "!=", "")]}),
+        (
+            load_paper_node,
+            "paper_node",
+            {"skip_isolate": True, "lists": False, "filters": [("in_d", ">=", 1)]},
+        ),
+        (load_author_node, "author_node", {"filters": [("num_papers", ">", 1)]}),
+        (load_author_node, "author_node", {"columns": ["id", "name"]}),
+        (load_author_edge, "author_edge", {"filters": [("w", "in", [2, 3])]}),
+    ],
+)
+def test_backends_identical(tables, load, table, kwargs):
+    csv = load(getattr(tables["csv"], table), **kwargs)
+    npy = load(getattr(tables["npy"], table), **kwargs)
+
+    assert len(csv) > 0
+    assert csv.index.tolist() == npy.index.tolist()
+    pd.testing.assert_frame_equal(materialize(csv), materialize(npy))
+
+
+@pytest.mark.parametrize("batch_size", [2, LIST_BATCH_ROWS])
+def test_split_lists(batch_size):
+    values = pd.Series(["3#1", "", pd.NA, "7", "", "2#2#5"], dtype="string")
+
+    index = _split_lists(values, batch_size)
+
+    assert index.indptr.tolist() == [0, 2, 2, 2, 3, 3, 6]
+    assert index.indices.tolist() == [3, 1, 7, 2, 2, 5]
+    assert index.indices.dtype == np.int32
+
+
+def test_split_lists_empty():
+    values = pd.Series([pd.NA, ""] * 3, dtype="string")
+
+    index = _split_lists(values, batch_size=4)
+
+    assert index.indptr.tolist() == [0] * 7
+    assert len(index.indices) == 0
+    assert len(_split_lists(pd.Series([], dtype="string")).indptr) == 1
+
+
+@pytest.mark.parametrize("bad", ["1#x", "1##2", "2#", "1.5", "99999999999"])
+def test_split_lists_bad_token(bad):
+    values = pd.Series(["1#2", bad, "3"], dtype="string")
+
+    with pytest.raises(ValueError, match="Invalid list value in rows 0 to 3"):
+        _split_lists(values)
@@ -0,0 +1,102 @@
+import ast
+import numpy as np
+import pandas as pd
+import pytest
+from conftest import load_config, make_papers, preprocess, write_v9
+from main import (
+    author_community_stage,
+    author_graph_stage,
+    author_postprocess_stage,
+    centrality_stage,
+    diameter_stage,
+    louvain_stage,
+    paper_graph_stage,
+    paper_postprocess_stage,
+)
+from utils.artifacts import registry
+from utils.graph import clear_igraph_cache
+
+
+@pytest.fixture
+def pipeline(tmp_path, monkeypatch):
+    """
+    Run the stages of a small dataset in this process, the results and the visualization data
+    being written relative to `tmp_path`.
+    """
+    monkeypatch.chdir(tmp_path)
+    papers = make_papers(300, seed=1)
+    paths = preprocess(write_v9(papers, tmp_path / "dblp.txt"), tmp_path / "data")
+    for stage in (
+        paper_graph_stage,
+        louvain_stage,
+        centrality_stage,
+        diameter_stage,
+        paper_postprocess_stage,
+        author_graph_stage,
+        author_community_stage,
+        author_postprocess_stage,
+    ):
+        stage(paths)
+    yield papers, paths
+    registry.clear()
+    clear_igraph_cache()
+
+
+def test_paper_ids(pipeline):
+    papers, paths = pipeline
+    by_index = {paper["id"]: paper for paper in papers}
+    to_id = pd.read_csv(paths.paper_index).set_index("index")["id"]
+    names = pd.read_csv(paths.author_node).set_index("id")["name"].fillna("")
+    louvain = pd.read_csv(paths.paper_comm / "louvain.csv").set_index("id")
+    centrality = pd.read_csv(
+        paths.centrality_dir / "centrality_measures.csv", float_precision="round_trip"
+    ).set_index("id")
+    nodes = pd.read_csv("visualize/paper_node.csv", float_precision="round_trip")
+    edges = pd.read_csv("visualize/paper_edge.csv")
+    assert len(nodes) > 0 and len(edges) > 0
+
+    # The nodes are shown by their original `#index`, with the values of their interned ID
+    for row in nodes.itertuples(index=False):
+        paper, paper_id = by_index[row.id], to_id[row.id]
+        assert row.title == paper["title"]
+        assert row.venue == paper["venue"] or (
+            pd.isna(row.venue) and not paper["venue"]
+        )
+        assert row.out_d == len(paper["references"])
+        assert row.in_d == sum(row.id in p["references"] for p in papers)
+        authors = [names[int(a)] for a in ast.literal_eval(row.authors)]
+        assert authors == paper["authors"]
+        assert row.community == louvain.loc[paper_id, "community"]
+        assert (
+            row.pagerank_centrality == centrality.loc[paper_id, "pagerank_centrality"]
+        )
+
+    # The edges are the references between the shown papers
+    shown = set(nodes["id"])
+    expected = {
+        (paper["id"], ref)
+        for paper in papers
+        if paper["id"] in shown
+        for ref in paper["references"]
+        if ref in shown
+    }
+    assert set(edges.itertuples(index=False, name=None)) == expected
+
+
+def test_author_ids(pipeline):
+    papers, paths = pipeline
+    index = pd.read_csv(paths.paper_index).set_index("id")["index"]
+    by_index = {paper["id"]: paper for paper in papers}
+    labels = pd.read_csv(
+        paths.author_comm / "community_label_propagation.csv"
+    ).set_index("id")["community"]
+    nodes = pd.read_csv("visualize/author_node.csv")
+    edges = pd.read_csv("visualize/author_edge.csv")
+    assert len(nodes) > 0
+
+    for row in nodes.itertuples(index=False):
+        assert row.community == labels[row.id]
+        written = [by_index[index[int(p)]] for p in ast.literal_eval(row.papers)]
+        assert written == [p for p in papers if row.name in p["authors"]]
+    shown = set(nodes["id"])
+    assert np.isin(edges[["src", "dst"]].to_numpy(), list(shown)).all()
@@ -0,0 +1,139 @@
+import json
+import pandas as pd
+import pytest
+import utils.preprocess as preprocess
+from conftest import load_config, make_papers, write_v9
+from main import parse_config
+from utils.disambiguation import disambiguate_authors
+
+
+def _write_jsonl(papers, path):
+    with open(path, "w", encoding="utf-8") as f:
+        for paper in papers:
+            f.write(
+                json.dumps(
+                    {**paper, "authors": [{"name": name} for name in paper["authors"]]}
+                )
+            )
+            f.write("\n")
+    return path
+
+
+@pytest.mark.parametrize("data_format", ["v9", "jsonl"])
+def test_sharded_parse_matches_serial(tmp_path, monkeypatch, data_format):
+    papers = make_papers(300)
+    # A lone `\r` is not a line break, whether the file is parsed whole or in shards
+    papers[7]["title"] = "Carriage\rreturn"
+    if data_format == "v9":
+        data = write_v9(papers, tmp_path / "dblp.txt")
+    else:
+        data = _write_jsonl(papers, tmp_path / "dblp.jsonl")
+
+    serial = preprocess._get_dataframe(data, batch_size=64, num_workers=1)
+    monkeypatch.setattr(preprocess, "MIN_SHARD_SIZE", 1)
+    sharded = preprocess._get_dataframe(data, batch_size=64, num_workers=3)
+
+    pd.testing.assert_frame_equal(sharded, serial)
+    assert len(serial) == len(papers)
+    assert serial["title"][7] == "Carriage\rreturn"
+    assert serial["id"].tolist() == [paper["id"] for paper in papers]
+
+
+def test_shards_start_at_records(tmp_path):
+    data = write_v9(make_papers(50), tmp_path / "dblp.txt")
+
+    shards = preprocess._find_shard_offsets(data, 4)
+
+    assert shards[0][0] == 0 and shards[-1][1] == data.stat().st_size
+    assert all(end == start for (_, end), (start, _) in zip(shards, shards[1:]))
+    with open(data, "rb") as f:
+        for start, _ in shards:
+            f.seek(start)
+            assert f.readline().startswith(b"#*")
+
+
+def test_streamed_batches(tmp_path, monkeypatch):
+    data = write_v9(make_papers(300), tmp_path / "dblp.txt")
+    (tmp_path / "spool").mkdir()
+
+    monkeypatch.setattr(preprocess, "MIN_SHARD_SIZE", 1)
+    batches = list(
+        preprocess._iter_dataframes(data, 64, 3, spool_dir=tmp_path / "spool")
+    )
+
+    assert len(batches) > 3 and all(len(batch) <= 64 for batch in batches)
+    # The batches of the workers are deleted once read
+    assert not any((tmp_path / "spool").iterdir())
+    pd.testing.assert_frame_equal(
+        pd.concat(batches, ignore_index=True),
+        preprocess._get_dataframe(data, num_workers=1),
+    )
+
+
+def _save(data, base_path, table_format, **kwargs):
+    """
+    Preprocess `data` into `base_path` with the author disambiguation, return the saved files.
+    """
+    paths = parse_config(load_config(table_format), base_path)
+    preprocess.save_records_to_csv(
+        data,
+        paths.author_node,
+        paths.author_edge,
+        paths.venue_map,
+        paths.paper_map,
+        paths.citation,
+        paths.paper_node,
+        paths.paper_edge,
+        paths.paper_index,
+        paths.paper_refs,
+        author_alias=paths.author_alias,
+        disambiguate=True,
+        **kwargs,
+    )
+    return {
+        file.relative_to(base_path).as_posix(): file.read_bytes()
+        for file in sorted(base_path.rglob("*"))
+        if file.is_file()
+    }
+
+
+@pytest.mark.parametrize("table_format", ["csv", "npy"])
+def test_streamed_tables(tmp_path, monkeypatch, table_format):
+    papers = make_papers(300)
+    for paper in papers[::7]:
+        paper.update(authors=["J. Doe", "Partner of Doe"], venue="Venue D")
+    for paper in papers[3::7]:
+        paper.update(authors=["John Doe", "Partner of Doe"], venue="Venue D")
+    data = write_v9(papers, tmp_path / "dblp.txt")
+
+    whole = _save(data, tmp_path / "whole", table_format)
+    monkeypatch.setattr(preprocess, "MIN_SHARD_SIZE", 1)
+    streamed = _save(
+        data,
+        tmp_path / "streamed",
+        table_format,
+        batch_size=16,
+        num_workers=3,
+        chunk_size=10,
+    )
+
+    assert streamed == whole
+    assert json.loads(whole["author/alias.json"]) == {"J. Doe": "John Doe"}
+
+
+def test_disambiguate_codes(tmp_path):
+    papers = make_papers(300)
+    for paper in papers[::5]:
+        paper["authors"] = paper["authors"] + ["A. Smith", "Bo Chen"]
+    for paper in papers[2::5]:
+        paper["authors"] = paper["authors"] + ["Ann Smith", "Bo Chen", "ann smith"]
+    data = write_v9(papers, tmp_path / "dblp.txt")
+
+    records = preprocess._stream_records(
+        data, tmp_path / "index.csv", tmp_path / "title"
+    )
+    df = preprocess._get_dataframe(data)
+
+    aliases = preprocess._disambiguate(records)
+    assert aliases == disambiguate_authors(df["authors"], df["venue"])
+    assert aliases == {"A. Smith": "Ann Smith", "ann smith": "Ann Smith"}
@@ -0,0 +1,85 @@
+import io
+import json
+import pytest
+from conftest import make_papers, write_v9
+from utils.readers import _iter_json_records, detect_format, iter_file_records
+
+
+def _json_object(paper):
+    return {
+        "id": paper["id"],
+        "title": paper["title"],
+        "authors": [{"name": name, "org": "Somewhere"} for name in paper["authors"]],
+        "year": paper["year"] or 0,
+        "venue": {"raw": paper["venue"]},
+        "references": paper["references"],
+    }
+
+
+def _expected(papers):
+    return [
+        {
+            "id": paper["id"],
+            "title": paper["title"],
+            "authors": "#".join(paper["authors"]),
+            "year": paper["year"],
+            "venue": paper["venue"],
+            "references": "#".join(paper["references"]),
+        }
+        for paper in papers
+    ]
+
+
+@pytest.fixture
+def papers():
+    return make_papers(30)
+
+
+def test_v9(tmp_path, papers):
+    data = write_v9(papers, tmp_path / "dblp.txt")
+
+    assert detect_format(data) == "v9"
+    assert list(iter_file_records(data)) == _expected(papers)
+
+
+def test_jsonl(tmp_path, papers):
+    data = tmp_path / "dblp.json"
+    data.write_text("\n".join(json.dumps(_json_object(p)) for p in papers) + "\n")
+
+    assert detect_format(data) == "jsonl"
+    assert list(iter_file_records(data)) == _expected(papers)
+
+
+def test_json(tmp_path, papers):
+    data = tmp_path / "dblp.json"
+    data.write_text(json.dumps([_json_object(p) for p in papers], indent=2))
+
+    assert detect_format(data) == "json"
+    assert list(iter_file_records(data)) == _expected(papers)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64])
+def test_json_chunks(papers, chunk_size):
+    text = json.dumps([_json_object(p) for p in papers])
+    # The Mongo-style integers of the v13 dump, cut by the chunks as well
+    text = text.replace('"year": 2015', '"year": NumberInt(2015)')
+
+    records = list(_iter_json_records(io.StringIO(text), chunk_size))
+
+    assert records == _expected(papers)
+
+
+def test_comma_in_json_author_names(tmp_path):
+    data = tmp_path / "dblp.jsonl"
+    data.write_text(json.dumps({"id": 1, "authors": ["Smith, J.", "Doe"]}) + "\n")
+    v9 = tmp_path / "dblp.txt"
+    v9.write_text("#*Title\n#@Smith, J., Doe\n#index1\n")
+
+    assert next(iter_file_records(data))["authors"] == "Smith, J.#Doe"
+    # The v9 format separates the authors with `, `
+    assert next(iter_file_records(v9))["authors"] == "Smith#J.#Doe"
+
+
+def test_unknown_format(tmp_path):
+    with pytest.raises(ValueError):
+        list(iter_file_records(tmp_path / "dblp.txt", "xml"))
@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+from utils.reducers import DegreeCount, GroupBySum, TopK, iter_batches, reduce_batches
+
+EDGES = pd.DataFrame(
+    {
+        "src": [0, 1, 1, 4, 2, 5],
+        "dst": [1, 2, 3, 1, 0, 1],
+        "weight": [1.0, 2.0, 0.5, 1.0, 3.0, 1.0],
+    }
+)
+PAPERS = pd.DataFrame(
+    {
+        "id": range(8),
+        "community": [0, 1, 0, 2, 1, 0, 2, 1],
+        "citations": [5, 1, 9, 3, 7, 9, np.nan, 2],
+    }
+)
+
+
+def test_iter_batches():
+    batches = list(iter_batches(PAPERS, batch_size=3))
+
+    assert [len(batch) for batch in batches] == [3, 3, 2]
+    assert list(iter_batches(iter(batches))) == batches
+    assert list(iter_batches(PAPERS.iloc[:0])) == []
+
+
+def test_degree_count():
+    degree, weighted = DegreeCount(), DegreeCount(weight="weight")
+
+    reduce_batches(iter_batches(EDGES, batch_size=2), degree, weighted)
+
+    assert degree.result().tolist() == [2, 5, 2, 1, 1, 1]
+    assert np.allclose(weighted.result(), [4.0, 5.5, 5.0, 0.5, 1.0, 1.0])
+
+
+def test_top_k():
+    top, grouped = TopK(3, "citations"), TopK(1, "citations", group="community")
+
+    reduce_batches(iter_batches(PAPERS, batch_size=3), top, grouped)
+
+    # Ties are won by the first seen row
+    assert top.result()["id"].tolist() == PAPERS.nlargest(3, "citations")["id"].tolist()
+    assert top.result()["id"].tolist() == [2, 5, 4]
+    assert sorted(grouped.result()["id"].tolist()) == [2, 3, 4]
+    assert TopK(1, "citations").result().empty
+
+
+def test_group_by_sum():
+    sums = GroupBySum("community", ["citations"])
+
+    reduce_batches(iter_batches(PAPERS, batch_size=3), sums)
+
+    expected = PAPERS.groupby("community")["citations"]
+    assert sums.result()["citations"].tolist() == expected.sum().tolist()
+    assert sums.result()["count"].tolist() == expected.size().tolist()
+    assert np.allclose(sums.mean()["citations"], expected.mean())
+    assert GroupBySum("community", ["citations"]).result().empty
@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+import scipy.sparse as sp
+from conftest import make_papers, preprocess, write_v9
+from utils.readers import iter_file_records
+from utils.sampler import forest_fire_sample, sample_dataset, snowball_sample
+
+
+def _two_stars():
+    # Vertices 0 and 5 are the centers of two disconnected stars of 4 leaves
+    edges = [(0, i) for i in range(1, 5)] + [(5, i) for i in range(6, 10)]
+    src, dst = np.array(edges).T
+    adjacency = sp.csr_matrix(
+        (np.ones(len(edges), dtype=bool), (src, dst)), shape=(10, 10)
+    )
+    return (adjacency + adjacency.T).tocsr()
+
+
+@pytest.mark.parametrize("sampler", [forest_fire_sample, snowball_sample])
+def test_sample_size(sampler):
+    adjacency = _two_stars()
+
+    for size in (1, 4, 7, 10, 20):
+        vertices = sampler(adjacency, size, seed=1)
+        assert len(vertices) == min(size, 10)
+        assert (np.diff(vertices) > 0).all()
+    assert (sampler(adjacency, 6, seed=3) == sampler(adjacency, 6, seed=3)).all()
+
+
+def test_snowball_neighborhoods():
+    adjacency = _two_stars()
+
+    # A center takes all its leaves, a leaf its center which takes the other leaves
+    vertices = snowball_sample(adjacency, 5, seed=0)
+    assert vertices.tolist() in ([0, 1, 2, 3, 4], [5, 6, 7, 8, 9])
+    assert len(snowball_sample(adjacency, 10, seed=0, max_neighbors=1)) == 10
+
+
+@pytest.mark.parametrize("method", ["forest_fire", "snowball"])
+def test_sample_dataset(tmp_path, method):
+    papers = make_papers(40)
+    data = write_v9(papers, tmp_path / "dblp.txt")
+    paths = preprocess(data, tmp_path / "data")
+    output = tmp_path / "sample" / "dblp.txt"
+
+    count = sample_dataset(
+        data, paths.paper_index, paths.paper_refs, output, 0.25, method, seed=7
+    )
+
+    records = list(iter_file_records(output))
+    ids = {record["id"] for record in records}
+    assert count == len(records) == 10
+    # Only the references within the sample are kept, in the order of the dataset
+    by_id = {paper["id"]: paper for paper in papers}
+    for record in records:
+        expected = [ref for ref in by_id[record["id"]]["references"] if ref in ids]
+        assert record["references"] == "#".join(expected)
+        assert record["title"] == by_id[record["id"]]["title"]
+    assert [record["id"] for record in records] == sorted(ids)
+
+
+def test_sample_dataset_arguments(tmp_path):
+    data = write_v9(make_papers(12), tmp_path / "dblp.txt")
+    paths = preprocess(data, tmp_path / "data")
+
+    with pytest.raises(ValueError, match="fraction"):
+        sample_dataset(data, paths.paper_index, paths.paper_refs, tmp_path / "out", 0)
+    with pytest.raises(ValueError, match="method"):
+        sample_dataset(
+            data,
+            paths.paper_index,
+            paths.paper_refs,
+            tmp_path / "out",
+            0.5,
+            "uniform",
+        )
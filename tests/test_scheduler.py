@@ -0,0 +1,152 @@
+import pytest
+import main
+from conftest import load_config, make_papers, write_v9
+from utils.cache import StageCache
+from utils.preprocess import AUTHOR_CHUNK_SIZE, PARSE_WORKER_MEMORY
+from utils.scheduler import (
+    Stage,
+    Timing,
+    critical_path,
+    estimate_memory,
+    fit_workers,
+    run_pipeline,
+)
+
+
+def _copy(source, output, suffix):
+    output.write_text(source.read_text() + suffix)
+
+
+def _write(output, text):
+    output.write_text(text)
+
+
+def _fail():
+    raise RuntimeError("broken stage")
+
+
+def _chain(tmp_path):
+    a, b, c = (tmp_path / f"{name}.txt" for name in "abc")
+    return [
+        # Declared before its dependency
+        Stage("c", _copy, (b, c, "c"), deps=("b",), inputs=(b,), outputs=(c,)),
+        Stage("a", _write, (a, "a"), outputs=(a,)),
+        Stage("b", _copy, (a, b, "b"), deps=("a",), inputs=(a,), outputs=(b,)),
+    ]
+
+
+def test_dependencies_first(tmp_path):
+    timings = run_pipeline(_chain(tmp_path), max_cores=2, memory_budget=4)
+
+    assert (tmp_path / "c.txt").read_text() == "abc"
+    assert {name: t.status for name, t in timings.items()} == dict.fromkeys(
+        "abc", "done"
+    )
+    assert timings["a"].end <= timings["b"].start <= timings["b"].end
+    assert timings["b"].end <= timings["c"].start
+
+
+def test_skip_fresh_stages(tmp_path):
+    cache = StageCache(tmp_path / "manifest.json")
+    run_pipeline(_chain(tmp_path), max_cores=1, memory_budget=4, cache=cache)
+
+    timings = run_pipeline(_chain(tmp_path), max_cores=1, memory_budget=4, cache=cache)
+    assert all(t.status == "skipped" for t in timings.values())
+
+    # A changed output makes its stage run again, the dependent one being skipped as the
+    # output is written back with the same contents
+    (tmp_path / "b.txt").write_text("changed")
+    timings = run_pipeline(_chain(tmp_path), max_cores=1, memory_budget=4, cache=cache)
+    assert {name: t.status for name, t in timings.items()} == {
+        "a": "skipped",
+        "b": "done",
+        "c": "skipped",
+    }
+    assert (tmp_path / "c.txt").read_text() == "abc"
+
+
+def test_failure_cancels_dependents(tmp_path):
+    stages = [
+        Stage("broken", _fail),
+        Stage("dependent", _write, (tmp_path / "dependent.txt", ""), deps=("broken",)),
+        Stage("other", _write, (tmp_path / "other.txt", "other")),
+        # Not scheduled, assumed to be completed
+        Stage("last", _write, (tmp_path / "last.txt", ""), deps=("missing",)),
+    ]
+
+    timings = run_pipeline(stages, max_cores=1, memory_budget=4)
+
+    assert {name: t.status for name, t in timings.items()} == {
+        "broken": "failed",
+        "dependent": "cancelled",
+        "other": "done",
+        "last": "done",
+    }
+    assert not (tmp_path / "dependent.txt").exists()
+
+
+def test_dependency_cycle():
+    stages = [Stage("a", _fail, deps=("b",)), Stage("b", _fail, deps=("a",))]
+
+    with pytest.raises(ValueError, match="cycle"):
+        run_pipeline(stages, max_cores=1, memory_budget=4)
+
+
+def test_critical_path():
+    stages = [
+        Stage("parse", _fail),
+        Stage("graph", _fail, deps=("parse",)),
+        Stage("stats", _fail, deps=("parse",)),
+        Stage("plot", _fail, deps=("graph", "stats")),
+    ]
+    timings = {
+        "parse": Timing(0.0, 2.0, "done"),
+        "graph": Timing(2.0, 5.0, "done"),
+        "stats": Timing(2.0, 3.0, "done"),
+        "plot": Timing(5.0, 6.0, "done"),
+    }
+
+    assert critical_path(stages, timings) == [
+        ("parse", 2.0),
+        ("graph", 3.0),
+        ("plot", 1.0),
+    ]
+    assert critical_path(stages, {}) == []
+
+
+def test_fit_workers(tmp_path):
+    pool = Stage("pool", _write, (tmp_path / "pool.txt",), cores=4, memory=1.0)
+
+    assert fit_workers(pool, 2.2) == pool
+    pool = pool._replace(worker_memory=0.5)
+    fitted = fit_workers(pool, 2.2)
+    assert fitted.args == (tmp_path / "pool.txt", 2) and fitted.cores == 2
+    assert fit_workers(pool, 10.0).cores == 4
+    # At least one process, even over the budget
+    assert fit_workers(pool, 0.5).cores == 1
+
+
+@pytest.mark.parametrize(
+    "budget, chunk_size, num_workers",
+    [
+        # The budget is given relative to the estimated peak of the preprocess
+        (lambda peak: peak + 2.5 * PARSE_WORKER_MEMORY, None, 2),
+        (lambda peak: peak + 100, None, 8),
+        (lambda peak: peak / 2, AUTHOR_CHUNK_SIZE, 1),
+    ],
+)
+def test_budget_stages(tmp_path, monkeypatch, budget, chunk_size, num_workers):
+    monkeypatch.setattr(main.os, "cpu_count", lambda: 8)
+    config = load_config()
+    paths = main.parse_config(config, tmp_path)
+    write_v9(make_papers(300), paths.data)
+    peak = estimate_memory(main.build_stages(config, paths)[0])
+
+    stages = main.build_stages(config, paths, memory_budget=budget(peak))
+
+    preprocess = stages[0]
+    assert preprocess.name == "preprocess" and peak > 0
+    assert preprocess.args == (config, paths, chunk_size, num_workers)
+    assert preprocess.cores == num_workers
+    # The stages without their own process pool are left as they are
+    assert all(stage.cores == 1 and not stage.worker_memory for stage in stages[1:])
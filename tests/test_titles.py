@@ -0,0 +1,30 @@
+from utils.titles import TitleStore, append_titles, save_titles
+
+TITLES = ["On Graphs.", "", "Ünïcödé títle", None, "Last"]
+
+
+def test_save_and_lookup(tmp_path):
+    save_titles(TITLES, tmp_path / "title")
+    titles = TitleStore(tmp_path / "title")
+
+    assert len(titles) == 5
+    assert titles[1] == "On Graphs." and titles[3] == "Ünïcödé títle"
+    assert titles.get(4) == "" and titles.get(6) is None and titles.get(0) is None
+    assert titles.lookup([5, 1, 7, 3]) == ["Last", "On Graphs.", None, "Ünïcödé títle"]
+
+
+def test_append_matches_save(tmp_path):
+    save_titles(TITLES[:2], tmp_path / "appended")
+    append_titles(TITLES[2:], tmp_path / "appended")
+    save_titles(TITLES, tmp_path / "saved")
+
+    appended, saved = TitleStore(tmp_path / "appended"), TitleStore(tmp_path / "saved")
+    assert appended.lookup(range(1, 6)) == saved.lookup(range(1, 6))
+
+
+def test_empty_store(tmp_path):
+    save_titles([], tmp_path / "title")
+
+    assert len(TitleStore(tmp_path / "title")) == 0
+    append_titles(["First"], tmp_path / "title")
+    assert TitleStore(tmp_path / "title")[1] == "First"
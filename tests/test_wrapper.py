@@ -0,0 +1,177 @@
+import cProfile
+import json
+import os
+import pstats
+import re
+import time
+import numpy as np
+import pytest
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List
+from utils.wrapper import (
+    MIB,
+    PROFILE_ENV,
+    REPORT_ENV,
+    StackSampler,
+    _start_profiler,
+    profile,
+    profile_dir,
+    start_report,
+    timer,
+)
+
+
+@pytest.fixture
+def report(tmp_path, monkeypatch) -> Path:
+    """
+    A run report started under `tmp_path`, the environment being restored after the test.
+    """
+    monkeypatch.setenv(REPORT_ENV, "")
+    return start_report(tmp_path)
+
+
+def _records(path: Path) -> List[Dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def _stage_in_worker(name: str) -> int:
+    with profile(name, kind="stage"):
+        pass
+    return os.getpid()
+
+
+def _busy(seconds: float) -> int:
+    end, total = time.perf_counter() + seconds, 0
+    while time.perf_counter() < end:
+        total += sum(range(100))
+    return total
+
+
+@timer
+def _timed() -> int:
+    with profile("block"):
+        return 1
+
+
+def test_start_report(report, tmp_path):
+    assert report.parent == tmp_path and report.suffix == ".jsonl"
+    # A report already started, e.g. by a parent process, is kept
+    assert start_report(tmp_path / "other") == report
+
+
+def test_stage_records(report):
+    with profile("stage a", kind="stage") as record:
+        assert _timed() == 1
+
+    (written,) = _records(report)
+    assert written == record
+    assert written["name"] == "stage a" and written["kind"] == "stage"
+    assert written["status"] == "done" and written["pid"] == os.getpid()
+    assert written["wall"] >= 0 and written["cpu"] >= 0
+    assert written["peak_rss"] > 0
+
+
+def test_no_report(monkeypatch):
+    monkeypatch.delenv(REPORT_ENV, raising=False)
+
+    with profile("stage a", kind="stage") as record:
+        pass
+
+    assert record["status"] == "done"
+
+
+def test_worker_record(report):
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        pid = executor.submit(_stage_in_worker, "stage worker").result()
+
+    (written,) = _records(report)
+    assert pid != os.getpid()
+    assert written["name"] == "stage worker" and written["pid"] == pid
+
+
+def test_nested_stages(report):
+    with profile("stage outer", kind="stage"):
+        with profile("stage inner", kind="stage"):
+            data = np.ones(64 * MIB, dtype=np.uint8)
+            del data
+
+    inner, outer = _records(report)
+    assert (inner["name"], outer["name"]) == ("stage inner", "stage outer")
+    assert inner["peak_rss"] - inner["rss_start"] >= 60 * MIB
+    assert outer["peak_rss"] >= inner["peak_rss"]
+
+
+def test_failed_stage(report):
+    with pytest.raises(RuntimeError, match="boom"):
+        with profile("stage failing", kind="stage"):
+            raise RuntimeError("boom")
+
+    (written,) = _records(report)
+    assert written["name"] == "stage failing" and written["status"] == "failed"
+    assert written["wall"] >= 0
+
+
+def test_folded_stacks(tmp_path):
+    sampler = StackSampler(interval=0.001)
+    sampler.start()
+    _busy(0.2)
+    sampler.stop()
+    sampler.save(tmp_path / "busy.folded")
+
+    with open(tmp_path / "busy.folded", "r", encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    stacks = [re.fullmatch(r"(.+) (\d+)", line).groups() for line in lines]
+    counts = [int(count) for _, count in stacks]
+    assert counts == sorted(counts, reverse=True) and sum(counts) > 0
+    # Frames from the outermost to the innermost, `name (file:line)` each
+    frames = [stack.split(";") for stack, _ in stacks]
+    assert all(
+        re.fullmatch(r".+ \(.+:\d+\)", frame) for stack in frames for frame in stack
+    )
+    busy = [
+        stack for stack in frames if stack[-1].startswith("_busy (test_wrapper.py:")
+    ]
+    assert busy and all(stack[-2].startswith("test_folded_stacks ") for stack in busy)
+
+
+@pytest.mark.parametrize(
+    "mode, suffix", [("sampling", ".folded"), ("cprofile", ".prof")]
+)
+def test_saved_profile(report, monkeypatch, mode, suffix):
+    monkeypatch.setenv(PROFILE_ENV, mode)
+
+    with profile("stage busy", kind="stage"):
+        _busy(0.1)
+
+    (written,) = _records(report)
+    path = Path(written["profile"])
+    assert path.parent == profile_dir()
+    assert path.name == f"stage busy.{os.getpid()}{suffix}"
+    if mode == "cprofile":
+        stats = pstats.Stats(str(path))
+        assert any(function == "_busy" for _, _, function in stats.stats)
+
+
+def test_profiler_already_active(report, monkeypatch):
+    monkeypatch.setenv(PROFILE_ENV, "cprofile")
+    outer = cProfile.Profile()
+    outer.enable()
+    try:
+        assert _start_profiler("cprofile") is None
+        with profile("stage profiled", kind="stage") as record:
+            pass
+    finally:
+        outer.disable()
+
+    assert "profile" not in record
+    # The outer profiler kept recording
+    assert any(
+        function == "_start_profiler" for _, _, function in pstats.Stats(outer).stats
+    )
+
+
+def test_unknown_profiler():
+    with pytest.raises(ValueError, match="Unknown profiler"):
+        _start_profiler("perf")
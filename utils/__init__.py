@@ -1,20 +1,52 @@
-from .preprocess import save_records_to_csv
-from .loader import (
-    load_paper_node,
-    load_paper_edge,
-    load_author_node,
-    load_author_edge,
-    load_map_dict,
-)
-from .seeder import set_global_seed
+from .lazy import lazy_exports
 
 __author__ = "mango7789"
 __all__ = [
     "save_records_to_csv",
+    "ingest_records",
+    "sample_dataset",
     "load_paper_node",
     "load_paper_edge",
+    "load_paper_index",
+    "load_paper_refs",
+    "load_paper_authors",
     "load_author_node",
+    "load_author_lists",
     "load_author_edge",
+    "iter_paper_node",
+    "iter_paper_edge",
+    "iter_author_node",
+    "iter_author_edge",
+    "load_citations",
+    "load_titles",
     "load_map_dict",
+    "apply_filters",
     "set_global_seed",
 ]
+
+# The submodules import pandas and numpy, they are only imported on the first access of their names
+__getattr__, __dir__ = lazy_exports(
+    __name__,
+    {
+        "save_records_to_csv": ".preprocess",
+        "ingest_records": ".incremental",
+        "sample_dataset": ".sampler",
+        "load_paper_node": ".loader",
+        "load_paper_edge": ".loader",
+        "load_paper_index": ".loader",
+        "load_paper_refs": ".loader",
+        "load_paper_authors": ".loader",
+        "load_author_node": ".loader",
+        "load_author_lists": ".loader",
+        "load_author_edge": ".loader",
+        "iter_paper_node": ".loader",
+        "iter_paper_edge": ".loader",
+        "iter_author_node": ".loader",
+        "iter_author_edge": ".loader",
+        "load_citations": ".loader",
+        "load_titles": ".loader",
+        "load_map_dict": ".loader",
+        "apply_filters": ".loader",
+        "set_global_seed": ".seeder",
+    },
+)
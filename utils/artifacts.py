@@ -0,0 +1,131 @@
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import Dict, Final, NamedTuple, Tuple, Union
+from .columnar import META_FILE, is_columnar, load_columnar, save_columnar
+from .graph import _resolve_vertices
+
+# Types of the known columns of the stage outputs, the other columns are inferred
+ARTIFACT_DTYPES: Final = {
+    "id": np.int64,
+    "community": np.int64,
+    "degree_centrality": np.int64,
+    "pagerank_centrality": np.float64,
+}
+
+
+class NodeTable(NamedTuple):
+    """
+    Output of a stage as typed arrays aligned with the node IDs `ids`, e.g. the community labels
+    or the centrality of the vertices of a graph artifact, `columns[name][i]` being the value of
+    the node `ids[i]`.
+
+    Lookups resolve the IDs to positions with a binary search instead of merging DataFrames on
+    the IDs, and are skipped when the IDs are already aligned, e.g. two outputs of the same graph.
+    """
+
+    ids: np.ndarray
+    columns: Dict[str, np.ndarray]
+
+    def positions(self, ids) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Positions of the given IDs in the table, and a mask of the IDs that were found.
+        """
+        ids = np.asarray(ids)
+        if np.array_equal(ids, self.ids):
+            return np.arange(len(ids)), np.ones(len(ids), dtype=bool)
+        return _resolve_vertices(self.ids, ids)
+
+    def lookup(self, name: str, ids) -> np.ndarray:
+        """
+        Values of the column `name` for the given IDs, like `Series.map`: NaN for the missing IDs,
+        the integer columns being converted to float only if some are missing.
+        """
+        index, found = self.positions(ids)
+        if found.all():
+            return self.columns[name][index]
+        values = np.full(len(index), np.nan)
+        values[found] = self.columns[name][index[found]]
+        return values
+
+
+def arrays_path(path: Path) -> Path:
+    """
+    Columnar directory of the arrays registered along with the output at `path`, i.e. the path
+    without its suffix, e.g. `louvain/` next to `louvain.csv`.
+    """
+    return Path(path).with_suffix("")
+
+
+class ArtifactRegistry:
+    """
+    Outputs of the stages kept in memory by path, so that the stages run by the same process, e.g.
+    the steps of the postprocess, share them instead of each parsing the CSV files again.
+
+    A writer registers its output after saving it. The arrays are also saved as a columnar table
+    next to the file (see `arrays_path`), so the stages run by other processes memory-map them
+    instead of parsing the file, which is only parsed if it was saved again after its arrays.
+    An entry is keyed by the modification time of the file, so an output saved again by another
+    process is loaded again.
+
+    Example usage:
+    >>> registry.register(path, node_ids, community=membership)
+    >>> registry.get(path).lookup("community", ids)
+    """
+
+    def __init__(self):
+        self._tables: Dict[str, Tuple[int, NodeTable]] = {}
+
+    def register(self, path: Path, ids, **columns) -> NodeTable:
+        path = Path(path)
+        table = NodeTable(
+            np.asarray(ids, dtype=ARTIFACT_DTYPES["id"]),
+            {
+                name: np.asarray(values, dtype=ARTIFACT_DTYPES.get(name))
+                for name, values in columns.items()
+            },
+        )
+        save_columnar(
+            pd.DataFrame({"id": table.ids, **table.columns}, copy=False),
+            arrays_path(path),
+        )
+        self._tables[str(path.resolve())] = (path.stat().st_mtime_ns, table)
+        return table
+
+    def get(self, path: Path) -> NodeTable:
+        path = Path(path)
+        key, version = str(path.resolve()), path.stat().st_mtime_ns
+        entry = self._tables.get(key)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+
+        arrays = arrays_path(path)
+        if is_columnar(arrays) and (arrays / META_FILE).stat().st_mtime_ns >= version:
+            # Registered by the writer after saving the file, the arrays are memory-mapped
+            df = load_columnar(arrays)
+        else:
+            # Parse the exact floats written by the stage, like the registered arrays
+            df = pd.read_csv(path, float_precision="round_trip")
+            df = df.astype(
+                {c: t for c, t in ARTIFACT_DTYPES.items() if c in df.columns}
+            )
+        table = NodeTable(
+            df["id"].to_numpy(),
+            {name: df[name].to_numpy() for name in df.columns if name != "id"},
+        )
+        self._tables[key] = (version, table)
+        return table
+
+    def clear(self) -> None:
+        self._tables.clear()
+
+
+# Registry of the current process
+registry = ArtifactRegistry()
+
+
+def as_table(table: Union[NodeTable, Path]) -> NodeTable:
+    """
+    The table itself, or the output registered or saved at its path, see `ArtifactRegistry.get`.
+    """
+    return table if isinstance(table, NodeTable) else registry.get(table)
@@ -0,0 +1,127 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Final, Iterable, Optional
+
+CACHE_DIR: Final = Path(".cache")
+MANIFEST: Final = CACHE_DIR / "manifest.json"
+# Size of the blocks read when hashing a file
+BLOCK_SIZE: Final = 1024**2
+
+
+def _hash_file(path: Path) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        while block := f.read(BLOCK_SIZE):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class StageCache:
+    """
+    Content-addressed cache of the pipeline stages, backed by a JSON manifest.
+
+    The fingerprint of a stage is the blake2b digest of the contents of its input files and of its
+    parameters. When a stage completes, its fingerprint and the digests of its outputs are recorded,
+    and the manifest is saved at once, so that an interrupted run resumes after the last completed
+    stage. A stage is fresh, i.e. skipped, if its fingerprint is the recorded one and its outputs
+    still exist unchanged.
+
+    The digests of the files are memoized by path, size and modification time, so an unchanged
+    file like `dblp.txt` is only hashed once. The code of the stages is not part of the fingerprint,
+    use `force` to recompute the stages after changing it.
+    """
+
+    def __init__(self, manifest: Path = MANIFEST, force: bool = False):
+        self.manifest = Path(manifest)
+        self.force = force
+        self.stages: Dict[str, Dict[str, Any]] = {}
+        self.files: Dict[str, Dict[str, Any]] = {}
+        if self.manifest.exists():
+            with open(self.manifest, "r") as f:
+                content = json.load(f)
+            self.stages, self.files = content["stages"], content["files"]
+
+    def _save(self) -> None:
+        # Write a temporary file then rename it, a crash never leaves a truncated manifest
+        self.manifest.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.manifest.with_suffix(".tmp")
+        with open(tmp, "w") as f:
+            json.dump({"stages": self.stages, "files": self.files}, f, indent=4)
+        os.replace(tmp, self.manifest)
+
+    def digest(self, path: Path) -> Optional[str]:
+        """
+        Digest of the contents of a file, or of the relative paths and contents of all files of a
+        directory such as a columnar table. `None` if the path does not exist.
+        """
+        path = Path(path)
+        if path.is_dir():
+            digest = hashlib.blake2b(digest_size=16)
+            for file in sorted(p for p in path.rglob("*") if p.is_file()):
+                digest.update(file.relative_to(path).as_posix().encode())
+                digest.update(self.digest(file).encode())
+            return digest.hexdigest()
+        if not path.exists():
+            return None
+
+        stat = path.stat()
+        key = str(path.resolve())
+        memo = self.files.get(key)
+        if memo is None or (memo["size"], memo["mtime_ns"]) != (
+            stat.st_size,
+            stat.st_mtime_ns,
+        ):
+            memo = {
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+                "digest": _hash_file(path),
+            }
+            self.files[key] = memo
+        return memo["digest"]
+
+    def fingerprint(self, inputs: Iterable[Path], params: Dict[str, Any]) -> str:
+        """
+        Fingerprint of a stage from the contents of its `inputs` and its JSON-serializable `params`.
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        for path in inputs:
+            digest.update(f"{Path(path).as_posix()}={self.digest(path)};".encode())
+        digest.update(json.dumps(params, sort_keys=True, default=str).encode())
+        return digest.hexdigest()
+
+    def is_fresh(
+        self, stage: str, key: str, outputs: Optional[Iterable[Path]] = None
+    ) -> bool:
+        """
+        Whether `stage` was completed with the fingerprint `key` and its outputs are unchanged since.
+
+        A stage is stale if one of its recorded outputs was missing when it completed, or if one of
+        the declared `outputs` was not recorded at all.
+        """
+        record = self.stages.get(stage)
+        if self.force or record is None or record["key"] != key:
+            return False
+        recorded = record["outputs"]
+        if any(str(path) not in recorded for path in outputs or ()):
+            return False
+        return all(
+            digest is not None and self.digest(path) == digest
+            for path, digest in recorded.items()
+        )
+
+    def invalidate(self, stage: str) -> None:
+        if self.stages.pop(stage, None) is not None:
+            self._save()
+
+    def record(self, stage: str, key: str, outputs: Iterable[Path]) -> None:
+        """
+        Record the completion of `stage`, an output which was not written is recorded as `None`
+        so the stage is never fresh.
+        """
+        self.stages[stage] = {
+            "key": key,
+            "outputs": {str(path): self.digest(path) for path in outputs},
+        }
+        self._save()
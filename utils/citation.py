@@ -0,0 +1,143 @@
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from pathlib import Path
+from typing import Dict, Optional
+from .csr import CSRIndex, load_csr, save_csr
+
+
+def save_citations(
+    author_papers: pd.DataFrame, path: Path, num_authors: Optional[int] = None
+) -> None:
+    """
+    Sum the citations of papers per author and year, then save them as a sparse author x year matrix.
+
+    `author_papers` holds one author of a cited paper per row, in the columns `authors`, `year` and `in_d`.
+    The matrix is saved as a CSR index (see `utils.csr`) with one row per author ID in `[0, num_authors]`,
+    the years as `indices` and the citations as `weights`. `num_authors` defaults to the largest cited author.
+    """
+    grouped = (
+        author_papers.dropna(subset=["year"])
+        .astype({"authors": "int64", "year": "int32", "in_d": "int64"})
+        .groupby(["authors", "year"])["in_d"]
+        .sum()
+    )
+    authors = grouped.index.get_level_values("authors").to_numpy()
+    if num_authors is None:
+        num_authors = int(authors.max()) if len(authors) else 0
+
+    indptr = np.zeros(num_authors + 2, dtype=np.int64)
+    np.cumsum(np.bincount(authors, minlength=num_authors + 1), out=indptr[1:])
+
+    save_csr(
+        path,
+        indptr,
+        grouped.index.get_level_values("year").to_numpy(),
+        grouped.to_numpy().astype(np.int32),
+    )
+
+
+def add_citations(
+    author_papers: pd.DataFrame,
+    path: Path,
+    num_authors: int,
+    output: Optional[Path] = None,
+) -> None:
+    """
+    Add the citations of `author_papers`, in the columns of `save_citations`, to the matrix saved at
+    `path`, which grows to the rows `[0, num_authors]`. The matrices are summed as sparse arrays,
+    so the work is proportional to the stored citations instead of the papers of the authors.
+    The sum is saved to `output` instead of `path` if given.
+    """
+    grouped = (
+        author_papers.dropna(subset=["year"])
+        .astype({"authors": "int64", "year": "int32", "in_d": "int64"})
+        .groupby(["authors", "year"])["in_d"]
+        .sum()
+    )
+    old = load_csr(path)
+    indptr = np.asarray(old.indptr)
+    indptr = np.concatenate(
+        [indptr, np.full(num_authors + 2 - len(indptr), indptr[-1], dtype=np.int64)]
+    )
+    years = grouped.index.get_level_values("year").to_numpy()
+    num_years = max(int(np.max(old.indices, initial=0)), int(years.max(initial=0))) + 1
+
+    citations = sp.csr_matrix(
+        (np.asarray(old.weights), np.asarray(old.indices), indptr),
+        shape=(num_authors + 1, num_years),
+    ) + sp.csr_matrix(
+        (
+            grouped.to_numpy(),
+            (grouped.index.get_level_values("authors").to_numpy(), years),
+        ),
+        shape=(num_authors + 1, num_years),
+    )
+    citations.sort_indices()
+    del old
+
+    save_csr(
+        output or path,
+        citations.indptr,
+        citations.indices,
+        citations.data.astype(np.int32),
+    )
+
+
+class CitationStore:
+    """
+    Lazy view of the author x year citation matrix saved by `save_citations`.
+
+    Nothing is read before the first query, then the matrix is memory-mapped and each query
+    only slices the row of the author.
+
+    Example usage:
+    >>> citations = CitationStore("./data/author/citation")
+    >>> citations.yearly(42)
+    {2001: 3, 2002: 0, 2003: 5}
+    >>> citations.between(42, 2002, 2003)
+    {2002: 0, 2003: 5}
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._csr: Optional[CSRIndex] = None
+
+    @property
+    def csr(self) -> CSRIndex:
+        if self._csr is None:
+            self._csr = load_csr(self.path)
+        return self._csr
+
+    def __len__(self) -> int:
+        return self.csr.num_rows - 1
+
+    def _row(self, author: int):
+        csr = self.csr
+        if not 0 <= author < csr.num_rows:
+            return csr.indices[:0], csr.weights[:0]
+        start, end = csr.indptr[author], csr.indptr[author + 1]
+        return csr.indices[start:end], csr.weights[start:end]
+
+    def yearly(self, author: int) -> Dict[int, int]:
+        """
+        Citations of an author per year, from the first to the last cited year, 0 for the years in between.
+        """
+        years, counts = self._row(author)
+        if len(years) == 0:
+            return {}
+        return self.between(author, int(years[0]), int(years[-1]))
+
+    def between(self, author: int, start: int, end: int) -> Dict[int, int]:
+        """
+        Citations of an author per year in `[start, end]`, 0 for the years without citations.
+        """
+        years, counts = self._row(author)
+        yearly_citations = dict(zip(years.tolist(), counts.tolist()))
+        return {year: yearly_citations.get(year, 0) for year in range(start, end + 1)}
+
+    def total(self, author: int) -> int:
+        """
+        Total citations of an author.
+        """
+        return int(self._row(author)[1].sum())
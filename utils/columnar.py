@@ -0,0 +1,253 @@
+import json
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import Dict, Final, List, Optional, Tuple
+from .csr import append_npy
+
+META_FILE: Final = "meta.json"
+# Rows of a string column decoded at a time, only their bytes are copied out of the blob
+STRING_BLOCK_ROWS: Final = 65_536
+# Nullable dtypes saved as a numeric `.npy` file plus a `.mask.npy`
+MASKED_ARRAYS: Final = (
+    pd.arrays.IntegerArray,
+    pd.arrays.FloatingArray,
+    pd.arrays.BooleanArray,
+)
+
+
+def is_columnar(path: Path) -> bool:
+    """
+    Whether `path` is a columnar table directory saved by `save_columnar`, i.e. it holds `meta.json`.
+    """
+    return (Path(path) / META_FILE).is_file()
+
+
+def saves_columnar(path: Path) -> bool:
+    """
+    Whether a table saved to `path` is written as a columnar directory, i.e. `path` has no suffix,
+    as `main.parse_config` lays out the `npy` tables, or as a csv file if its suffix is `.csv`.
+    """
+    suffix = Path(path).suffix
+    if suffix not in ("", ".csv"):
+        raise ValueError(
+            f"Cannot save a table to {path}, expected a `.csv` file or a directory without suffix."
+        )
+    return suffix == ""
+
+
+def _encode_strings(values: pd.Series) -> Tuple[bytes, np.ndarray, np.ndarray]:
+    """
+    Encode a string column as an utf-8 blob, the byte length of every value and its missing mask.
+    """
+    mask = values.isna().to_numpy()
+    encoded = [
+        b"" if missing else str(value).encode("utf-8")
+        for value, missing in zip(values, mask)
+    ]
+    lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded))
+    return b"".join(encoded), lengths, mask
+
+
+def _save_strings(values: pd.Series, path: Path, name: str) -> bool:
+    """
+    Save a string column as an utf-8 blob plus an offset array, return whether it has missing values.
+    """
+    blob, lengths, mask = _encode_strings(values)
+
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    np.save(path / f"{name}.data.npy", np.frombuffer(blob, dtype=np.uint8))
+    np.save(path / f"{name}.offsets.npy", offsets)
+
+    if mask.any():
+        np.save(path / f"{name}.mask.npy", mask)
+        return True
+    return False
+
+
+def _load_strings(
+    path: Path, name: str, masked: bool, rows: Optional[np.ndarray] = None
+) -> List[Optional[str]]:
+    """
+    Decode a string column saved by `_save_strings`, only the given `rows` if specified.
+
+    The strings become Python objects of the pandas `string` dtype, which cannot be backed by the
+    memory-mapped blob, so unlike the numeric columns they are not memory-mapped once loaded.
+    The blob is decoded `STRING_BLOCK_ROWS` rows at a time, so it is never copied as a whole.
+    """
+    data = np.load(path / f"{name}.data.npy", mmap_mode="r")
+    offsets = np.load(path / f"{name}.offsets.npy", mmap_mode="r")
+
+    if rows is None:
+        values = []
+        for first in range(0, len(offsets) - 1, STRING_BLOCK_ROWS):
+            bounds = offsets[first : first + STRING_BLOCK_ROWS + 1].tolist()
+            base = bounds[0]
+            buffer = data[base : bounds[-1]].tobytes()
+            values += [
+                buffer[start - base : end - base].decode("utf-8")
+                for start, end in zip(bounds, bounds[1:])
+            ]
+    else:
+        # Only the pages of the selected rows are read from the memory-mapped blob
+        values = [
+            data[start:end].tobytes().decode("utf-8")
+            for start, end in zip(offsets[rows].tolist(), offsets[rows + 1].tolist())
+        ]
+
+    if masked:
+        mask = np.load(path / f"{name}.mask.npy", mmap_mode="r")
+        if rows is not None:
+            mask = mask[rows]
+        for idx in np.flatnonzero(mask):
+            values[idx] = None
+
+    return values
+
+
+def save_columnar(df: pd.DataFrame, path: Path) -> None:
+    """
+    Save a DataFrame as a columnar table directory.
+
+    Every numeric column is written as a single `.npy` file (plus a `.mask.npy` for nullable dtypes),
+    every other column as an utf-8 blob with an int64 offset array. The dtypes are recorded in
+    `meta.json`, so loading requires no parsing and the numeric columns can be memory-mapped,
+    while the string columns are decoded, see `_load_strings`.
+    """
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+
+    columns = []
+    for name in df.columns:
+        series = df[name]
+        dtype = series.dtype
+        column = {"name": name, "dtype": str(dtype), "masked": False}
+
+        if isinstance(series.array, MASKED_ARRAYS):
+            # Nullable numeric or boolean dtypes, e.g. `Int16`, the missing values saved as 0
+            column["kind"] = "numeric"
+            mask = series.isna().to_numpy()
+            np.save(
+                path / f"{name}.npy",
+                series.to_numpy(dtype=dtype.numpy_dtype, na_value=dtype.type(0)),
+            )
+            if mask.any():
+                np.save(path / f"{name}.mask.npy", mask)
+                column["masked"] = True
+        elif isinstance(dtype, np.dtype) and dtype.kind in "biuf":
+            column["kind"] = "numeric"
+            np.save(path / f"{name}.npy", series.to_numpy())
+        else:
+            column["kind"] = "string"
+            column["masked"] = _save_strings(series, path, name)
+
+        columns.append(column)
+
+    with open(path / META_FILE, "w") as f:
+        json.dump({"length": len(df), "columns": columns}, f, indent=4)
+
+
+def append_columnar(df: pd.DataFrame, path: Path) -> None:
+    """
+    Append the rows of a DataFrame to a columnar table directory saved by `save_columnar`, with the
+    same columns and dtypes. Every file is appended in place (see `utils.csr.append_npy`), so the work
+    is proportional to the appended rows, and a column gets its `.mask.npy` once it has missing values.
+    """
+    path = Path(path)
+    with open(path / META_FILE, "r") as f:
+        meta = json.load(f)
+
+    names = [column["name"] for column in meta["columns"]]
+    if list(df.columns) != names:
+        raise ValueError(
+            f"Cannot append the columns {list(df.columns)} to {path}, expected {names}."
+        )
+
+    for column in meta["columns"]:
+        name = column["name"]
+        series = df[name]
+        if str(series.dtype) != column["dtype"]:
+            raise ValueError(
+                f"Cannot append a column {name} of dtype {series.dtype} to {path}, "
+                f"expected {column['dtype']}."
+            )
+
+        if column["kind"] == "string":
+            blob, lengths, mask = _encode_strings(series)
+            offsets = path / f"{name}.offsets.npy"
+            end = int(np.load(offsets, mmap_mode="r")[-1])
+            append_npy(path / f"{name}.data.npy", np.frombuffer(blob, dtype=np.uint8))
+            append_npy(offsets, end + np.cumsum(lengths))
+        else:
+            mask = series.isna().to_numpy()
+            if isinstance(series.array, MASKED_ARRAYS):
+                values = series.to_numpy(
+                    dtype=series.dtype.numpy_dtype, na_value=series.dtype.type(0)
+                )
+            else:
+                values = series.to_numpy()
+            append_npy(path / f"{name}.npy", values)
+
+        if column["masked"]:
+            append_npy(path / f"{name}.mask.npy", mask)
+        elif mask.any():
+            np.save(
+                path / f"{name}.mask.npy",
+                np.concatenate([np.zeros(meta["length"], dtype=bool), mask]),
+            )
+            column["masked"] = True
+
+    meta["length"] += len(df)
+    with open(path / META_FILE, "w") as f:
+        json.dump(meta, f, indent=4)
+
+
+def columnar_length(path: Path) -> int:
+    """
+    Number of rows of a columnar table directory, read from its `meta.json`.
+    """
+    with open(Path(path) / META_FILE, "r") as f:
+        return json.load(f)["length"]
+
+
+def load_columnar(
+    path: Path, columns: Optional[List[str]] = None, rows: Optional[np.ndarray] = None
+) -> pd.DataFrame:
+    """
+    Load a columnar table directory saved by `save_columnar`.
+
+    Numeric columns are memory-mapped read-only and handed to pandas without a copy.
+    Only the given `columns` are read when specified. If the positions of `rows` are given,
+    only these rows are read (copied) and they keep their positions as index.
+    """
+    path = Path(path)
+    with open(path / META_FILE, "r") as f:
+        meta = json.load(f)
+
+    data: Dict[str, object] = {}
+    for column in meta["columns"]:
+        name = column["name"]
+        if columns is not None and name not in columns:
+            continue
+
+        if column["kind"] == "string":
+            values = _load_strings(path, name, column["masked"], rows)
+            data[name] = pd.array(values, dtype=column["dtype"])
+            continue
+
+        values = np.load(path / f"{name}.npy", mmap_mode="r")
+        if rows is not None:
+            values = values[rows]
+        dtype = pd.api.types.pandas_dtype(column["dtype"])
+        if isinstance(dtype, pd.api.extensions.ExtensionDtype):
+            if column["masked"]:
+                mask = np.load(path / f"{name}.mask.npy", mmap_mode="r")
+                if rows is not None:
+                    mask = mask[rows]
+            else:
+                mask = np.zeros(len(values), dtype=bool)
+            values = dtype.construct_array_type()(values, mask)
+        data[name] = values
+
+    return pd.DataFrame(data, index=rows, copy=False)
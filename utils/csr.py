@@ -0,0 +1,179 @@
+import io
+import numpy as np
+from pathlib import Path
+from typing import List, NamedTuple, Optional, Tuple
+
+
+class CSRIndex(NamedTuple):
+    """
+    A compressed sparse row index, the values of row `i` are `indices[indptr[i]:indptr[i + 1]]`.
+    """
+
+    indptr: np.ndarray
+    indices: np.ndarray
+    weights: Optional[np.ndarray] = None
+
+    @property
+    def num_rows(self) -> int:
+        return len(self.indptr) - 1
+
+    def row(self, i: int) -> np.ndarray:
+        """
+        Values of row `i`, an O(1) slice of `indices`.
+        """
+        return self.indices[self.indptr[i] : self.indptr[i + 1]]
+
+    def counts(self) -> np.ndarray:
+        """
+        Number of values of every row.
+        """
+        return np.diff(self.indptr)
+
+    def explode(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Flatten into aligned `(rows, values)` arrays, like `DataFrame.explode` without the empty rows.
+        """
+        return np.repeat(np.arange(self.num_rows), self.counts()), np.asarray(
+            self.indices
+        )
+
+    def take(self, rows) -> "CSRIndex":
+        """
+        Gather the given rows into a new CSR index, in the given order.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        starts, ends = self.indptr[rows], self.indptr[rows + 1]
+        indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum(ends - starts, out=indptr[1:])
+        # Position of every gathered value in `indices`
+        positions = np.repeat(starts - indptr[:-1], ends - starts) + np.arange(
+            indptr[-1]
+        )
+        weights = None if self.weights is None else self.weights[positions]
+        return CSRIndex(indptr, self.indices[positions], weights)
+
+    def to_arrow(self):
+        """
+        Convert into an Arrow list array backed pandas Series, without copying the values.
+        Requires the optional `pyarrow` dependency.
+        """
+        try:
+            import pyarrow as pa
+        except ImportError as e:
+            raise ImportError("`pyarrow` is required to convert to Arrow lists.") from e
+        import pandas as pd
+
+        array = pa.LargeListArray.from_arrays(
+            pa.array(np.asarray(self.indptr)), pa.array(np.asarray(self.indices))
+        )
+        return pd.Series(pd.arrays.ArrowExtensionArray(array))
+
+
+def save_csr(
+    path: Path,
+    indptr: np.ndarray,
+    indices: np.ndarray,
+    weights: Optional[np.ndarray] = None,
+) -> None:
+    """
+    Save a CSR index as a directory of `indptr.npy` (int64), `indices.npy` (int32)
+    and the optional `weights.npy`.
+    """
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+
+    np.save(path / "indptr.npy", np.asarray(indptr, dtype=np.int64))
+    np.save(path / "indices.npy", np.asarray(indices, dtype=np.int32))
+    if weights is not None:
+        np.save(path / "weights.npy", np.asarray(weights))
+    elif (path / "weights.npy").exists():
+        (path / "weights.npy").unlink()
+
+
+# In-place edit of a file: truncate it to `size` bytes, then write the `(offset, bytes)` in order
+Patch = Tuple[int, List[Tuple[int, bytes]]]
+
+
+def npy_append_patch(file: Path, values: np.ndarray) -> Optional[Patch]:
+    """
+    The `Patch` appending values to a 1-D `.npy` array in place: the values are written after the
+    data, then only the shape in the header is updated. Applying it again gives the same file.
+    `None` if the header has no room for the new shape.
+    """
+    with open(file, "rb") as f:
+        version = np.lib.format.read_magic(f)
+        if version == (1, 0):
+            read_header = np.lib.format.read_array_header_1_0
+            write_header = np.lib.format.write_array_header_1_0
+        else:
+            read_header = np.lib.format.read_array_header_2_0
+            write_header = np.lib.format.write_array_header_2_0
+        shape, fortran_order, dtype = read_header(f)
+        data_offset = f.tell()
+
+    values = np.asarray(values, dtype=dtype)
+    header = io.BytesIO()
+    write_header(
+        header,
+        {
+            "descr": np.lib.format.dtype_to_descr(dtype),
+            "fortran_order": fortran_order,
+            "shape": (shape[0] + len(values),),
+        },
+    )
+    if header.tell() != data_offset:
+        return None
+    end = data_offset + shape[0] * dtype.itemsize
+    # The data first, an interrupted patch leaves the array as it was
+    return end, [(end, values.tobytes()), (0, header.getvalue())]
+
+
+def apply_patch(file: Path, patch: Patch) -> None:
+    size, writes = patch
+    with open(file, "r+b") as f:
+        f.truncate(size)
+        for offset, data in writes:
+            f.seek(offset)
+            f.write(data)
+
+
+def append_npy(file: Path, values: np.ndarray) -> None:
+    """
+    Append values to a 1-D `.npy` array in place, the work being proportional to the values,
+    see `npy_append_patch`. The header of `np.save` is padded for the shape to grow, otherwise
+    the array is saved again with the values.
+    """
+    patch = npy_append_patch(file, values)
+    if patch is not None:
+        apply_patch(file, patch)
+        return
+
+    array = np.load(file)
+    np.save(file, np.concatenate([array, np.asarray(values, dtype=array.dtype)]))
+
+
+def append_csr(path: Path, indptr: np.ndarray, indices: np.ndarray) -> None:
+    """
+    Append rows to a CSR index saved by `save_csr` without weights, with `append_npy`.
+    The rows are given as a CSR index of their own, i.e. `indptr` starts at 0.
+    """
+    path = Path(path)
+    end = int(load_csr(path).indptr[-1])
+    append_npy(path / "indices.npy", np.asarray(indices, dtype=np.int32))
+    append_npy(path / "indptr.npy", end + np.asarray(indptr[1:], dtype=np.int64))
+
+
+def load_csr(path: Path) -> CSRIndex:
+    """
+    Memory-map a CSR index saved by `save_csr`, nothing is read until the rows are accessed.
+    """
+    path = Path(path)
+    weights = None
+    if (path / "weights.npy").exists():
+        weights = np.load(path / "weights.npy", mmap_mode="r")
+
+    return CSRIndex(
+        indptr=np.load(path / "indptr.npy", mmap_mode="r"),
+        indices=np.load(path / "indices.npy", mmap_mode="r"),
+        weights=weights,
+    )
@@ -0,0 +1,298 @@
+import re
+import unicodedata
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from typing import Dict, Final, Tuple
+from .logger import logger
+from .wrapper import timer
+
+# Number of MinHash permutations, split into `NUM_BANDS` LSH bands of `NUM_PERM // NUM_BANDS` rows
+NUM_PERM: Final = 32
+NUM_BANDS: Final = 16
+# Minimal estimated Jaccard similarity of the co-author and venue sets of two variants to be merged
+THRESHOLD: Final = 0.3
+
+_SEPARATORS: Final = re.compile(r"[\s.,_\-]+")
+
+
+def _fold(token: str) -> str:
+    """
+    ASCII transliteration of a lower-case NFKD token, e.g. "jose" for "josé". A token without
+    any ASCII letter, e.g. in CJK, Greek or Cyrillic, keeps its letters without their accents.
+    """
+    folded = token.encode("ascii", "ignore").decode()
+    if folded:
+        return folded
+    return "".join(char for char in token if not unicodedata.combining(char))
+
+
+def _normalize(name: str) -> Tuple[str, ...]:
+    """
+    Split a name into lower-case tokens, transliterated to ASCII when possible (see `_fold`),
+    the surname being the last one. A name of separators only is its own case-folded token,
+    so that it is never merged with another name.
+    """
+    folded = unicodedata.normalize("NFKD", name.replace("'", "")).casefold()
+    tokens = tuple(
+        token for token in map(_fold, _SEPARATORS.split(folded.strip(" .,_-"))) if token
+    )
+    return tokens or (name.casefold(),)
+
+
+def _parse_forms(names: pd.Index) -> pd.DataFrame:
+    """
+    Normalize every distinct name, see `_normalize`.
+
+    The columns include `form` (the normalized name), `block` (surname + first initial),
+    `initials` of the given names and `abbreviated`, whether all given names are initials.
+    Names without given names have no block, they are never merged with another form.
+    """
+    tokens = [_normalize(name) for name in names]
+    blocks, initials, abbreviated = [], [], []
+    for parts in tokens:
+        given = parts[:-1]
+        blocks.append(f"{parts[-1]} {given[0][0]}" if given and given[0] else None)
+        initials.append("".join(part[:1] for part in given))
+        abbreviated.append(bool(given) and all(len(part) == 1 for part in given))
+
+    return pd.DataFrame(
+        {
+            "name": names,
+            "form": [" ".join(parts) for parts in tokens],
+            "block": blocks,
+            "initials": initials,
+            "abbreviated": abbreviated,
+        }
+    )
+
+
+def _minhash(tokens: sp.csr_matrix, seed: int) -> np.ndarray:
+    """
+    MinHash signatures of the token sets in the rows of `tokens`, one random hash value per
+    token and permutation. Every row must have at least one token.
+    """
+    rng = np.random.default_rng(seed)
+    signatures = np.empty((tokens.shape[0], NUM_PERM), dtype=np.uint32)
+    for k in range(NUM_PERM):
+        hashes = rng.integers(0, 2**32, size=tokens.shape[1], dtype=np.uint32)
+        signatures[:, k] = np.minimum.reduceat(
+            hashes[tokens.indices], tokens.indptr[:-1]
+        )
+    return signatures
+
+
+def _hash_bands(bands: np.ndarray) -> np.ndarray:
+    """
+    Hash the rows of the band signatures into single uint64 bucket keys.
+    """
+    keys = np.zeros(len(bands), dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        for column in bands.T:
+            keys = keys * np.uint64(1_000_003) ^ column.astype(np.uint64)
+    return keys
+
+
+def disambiguate_authors(
+    authors: pd.Series,
+    venues: pd.Series,
+    threshold: float = THRESHOLD,
+    seed: int = 42,
+) -> Dict[str, str]:
+    """
+    Find the name variants of the same author and map each of them to a canonical name.
+
+    - Names with the same normalized form (case, accents and punctuation aside) are merged directly.
+    - An abbreviated form like "J. Smith" is merged into a full form like "John Smith" of the same
+      block (surname + first initial) whose initials match, if the MinHash estimate of the Jaccard
+      similarity of their co-author and venue sets reaches `threshold`. Candidate pairs are only the
+      ones sharing an LSH bucket of the block, so there is no all-pairs comparison. An abbreviated form
+      matching several full forms is ambiguous and kept as is.
+
+    The canonical name of a group is its most frequent spelling, the one of the full form if any.
+
+    Parameters:
+        - authors: `#`-joined author names of each paper.
+        - venues: Venue names of each paper, aligned with `authors`.
+        - threshold: Minimal estimated Jaccard similarity to merge a pair.
+        - seed: Seed of the MinHash permutations.
+
+    Return the mapping of 'name: canonical name' of the names to be renamed.
+    """
+    occurrences = authors.reset_index(drop=True).str.split("#").explode()
+    occurrences = occurrences[occurrences.notna() & (occurrences != "")]
+    name_codes, names = pd.factorize(occurrences)
+    venues = venues.reset_index(drop=True)
+    venue_codes, venue_names = pd.factorize(venues)
+    venue_codes[(venues.fillna("") == "").to_numpy()] = -1
+
+    return disambiguate_names(
+        names,
+        name_codes,
+        occurrences.index.to_numpy(),
+        venue_codes,
+        len(venue_names),
+        threshold,
+        seed,
+    )
+
+
+@timer
+def disambiguate_names(
+    names: pd.Index,
+    name_codes: np.ndarray,
+    papers: np.ndarray,
+    venue_codes: np.ndarray,
+    num_venues: int,
+    threshold: float = THRESHOLD,
+    seed: int = 42,
+) -> Dict[str, str]:
+    """
+    Find the name variants of the same author like `disambiguate_authors`, from the codes of the
+    author occurrences instead of the author names of each paper.
+
+    Parameters:
+        - names: Distinct non-empty author names.
+        - name_codes: Code in `names` of every occurrence of an author in a paper.
+        - papers: Position of the paper of every occurrence, aligned with `name_codes`.
+        - venue_codes: Code of the venue of every paper in `[0, num_venues)`, -1 for no venue.
+        - num_venues: Number of distinct venues.
+        - threshold: Minimal estimated Jaccard similarity to merge a pair.
+        - seed: Seed of the MinHash permutations.
+
+    Return the mapping of 'name: canonical name' of the names to be renamed.
+    """
+    logger.info("Start disambiguating the names of authors...")
+
+    names = pd.Index(names)
+    counts = np.bincount(name_codes, minlength=len(names))
+    forms = _parse_forms(names)
+    forms["count"] = counts
+
+    # Group the names by normalized form, the most frequent spelling representing the form
+    form_codes, _ = pd.factorize(forms["form"])
+    forms["form_code"] = form_codes
+    spelling = (
+        forms.sort_values(["count", "name"], ascending=[False, True])
+        .drop_duplicates("form_code")
+        .set_index("form_code")["name"]
+    )
+    groups = (
+        forms.drop_duplicates("form_code")
+        .set_index("form_code")
+        .sort_index()[["block", "initials", "abbreviated"]]
+    )
+    groups["spelling"] = spelling
+
+    # Only the blocks with both abbreviated and full forms may have pairs to merge
+    has_both = groups.groupby("block")["abbreviated"].agg(["any", "all"])
+    candidate_blocks = has_both.index[has_both["any"] & ~has_both["all"]]
+    candidates = groups.index[groups["block"].isin(candidate_blocks)].to_numpy()
+
+    target = np.arange(len(groups))
+    if len(candidates):
+        # Form x paper incidence of all forms, and the co-author block and venue tokens of each paper
+        occurrence_forms = form_codes[name_codes]
+        num_papers = len(venue_codes)
+        incidence = sp.csr_matrix(
+            (np.ones(len(papers), dtype=np.int32), (occurrence_forms, papers)),
+            shape=(len(groups), num_papers),
+        )
+        block_codes, _ = pd.factorize(groups["block"])
+        num_blocks = block_codes.max() + 1
+        has_venue = venue_codes >= 0
+        known = block_codes[occurrence_forms] >= 0
+        paper_tokens = sp.csr_matrix(
+            (
+                np.ones(known.sum() + has_venue.sum(), dtype=np.int32),
+                (
+                    np.concatenate([papers[known], np.flatnonzero(has_venue)]),
+                    np.concatenate(
+                        [
+                            block_codes[occurrence_forms][known],
+                            num_blocks + venue_codes[has_venue],
+                        ]
+                    ),
+                ),
+            ),
+            shape=(num_papers, num_blocks + num_venues),
+        )
+
+        # Token sets of the candidate forms, without their own block shared by the whole block
+        tokens = (incidence[candidates] @ paper_tokens).tocoo()
+        keep = tokens.col != block_codes[candidates][tokens.row]
+        tokens = sp.csr_matrix(
+            (np.ones(keep.sum(), dtype=np.int8), (tokens.row[keep], tokens.col[keep])),
+            shape=tokens.shape,
+        )
+        nonempty = np.diff(tokens.indptr) > 0
+        candidates, tokens = candidates[nonempty], tokens[nonempty]
+        signatures = _minhash(tokens, seed)
+
+        # LSH: the forms of a block sharing the signature of a band are candidate pairs
+        rows = NUM_PERM // NUM_BANDS
+        bands = signatures.reshape(len(candidates), NUM_BANDS, rows)
+        buckets = pd.DataFrame(
+            {
+                "form": np.repeat(candidates, NUM_BANDS),
+                "position": np.repeat(np.arange(len(candidates)), NUM_BANDS),
+                "band": np.tile(np.arange(NUM_BANDS), len(candidates)),
+                "bucket": _hash_bands(bands.reshape(-1, rows)),
+            }
+        )
+        buckets["block"] = groups["block"].to_numpy()[buckets["form"]]
+        buckets["abbreviated"] = groups["abbreviated"].to_numpy()[buckets["form"]]
+        pairs = (
+            buckets[buckets["abbreviated"]]
+            .merge(
+                buckets[~buckets["abbreviated"]],
+                on=["block", "band", "bucket"],
+                suffixes=("", "_full"),
+            )
+            .drop_duplicates(["form", "form_full"])
+        )
+
+        # Verify the initials and the estimated Jaccard similarity of the pairs
+        initials = groups["initials"].to_numpy()
+        compatible = np.array(
+            [
+                full.startswith(abbr)
+                for abbr, full in zip(
+                    initials[pairs["form"]], initials[pairs["form_full"]]
+                )
+            ],
+            dtype=bool,
+        )
+        similarity = (
+            signatures[pairs["position"]] == signatures[pairs["position_full"]]
+        ).mean(axis=1)
+        pairs = pairs[compatible & (similarity >= threshold)]
+
+        # Merge the abbreviated forms with exactly one matching full form
+        unique = pairs.groupby("form")["form_full"].transform("nunique") == 1
+        pairs = pairs[unique]
+        target[pairs["form"].to_numpy()] = pairs["form_full"].to_numpy()
+        logger.info(f"Merge {len(pairs)} abbreviated name forms into their full forms.")
+
+    canonical = groups["spelling"].to_numpy()[target[form_codes]]
+    renamed = names.to_numpy() != canonical
+    logger.info(
+        f"Successfully map {renamed.sum()} of {len(names)} names to canonical names!"
+    )
+
+    return dict(zip(names[renamed], canonical[renamed]))
+
+
+def apply_author_mapping(authors: pd.Series, mapping: Dict[str, str]) -> pd.Series:
+    """
+    Rename the `#`-joined author names of each paper with `mapping`, keeping the first occurrence
+    of an author listed twice after the renaming.
+    """
+    if not mapping:
+        return authors
+
+    def rename(names: str) -> str:
+        renamed = [mapping.get(name, name) for name in names.split("#")]
+        return "#".join(dict.fromkeys(renamed))
+
+    return authors.map(rename, na_action="ignore").astype(authors.dtype)
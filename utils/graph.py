@@ -0,0 +1,235 @@
+import json
+import shutil
+import numpy as np
+import igraph as ig
+from functools import lru_cache
+from pathlib import Path
+from typing import Final, Iterator, NamedTuple, Tuple, Union
+from .csr import CSRIndex, load_csr, save_csr
+
+# Metadata file of a graph artifact, along with the `.npy` arrays
+GRAPH_META: Final = "graph.json"
+# Number of igraph Graphs kept by `get_igraph` during a stage, e.g. a graph and its simplified variant
+GRAPH_CACHE_SIZE: Final = 2
+# Edges converted to Python integers at a time when building an igraph Graph
+IGRAPH_CHUNK_EDGES: Final = 2**16
+
+
+def _resolve_vertices(
+    node_ids: np.ndarray, ids: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Resolve node IDs to vertex indices (the positions in `node_ids`) with a binary search.
+    Return the indices and a mask of the IDs that were found.
+    """
+    order = np.argsort(node_ids, kind="stable")
+    sorted_ids = node_ids[order]
+    if len(sorted_ids) == 0:
+        return np.zeros(len(ids), dtype=np.int64), np.zeros(len(ids), dtype=bool)
+
+    pos = np.clip(np.searchsorted(sorted_ids, ids), 0, len(sorted_ids) - 1)
+    found = sorted_ids[pos] == ids
+
+    return order[pos], found
+
+
+class CSRGraph(NamedTuple):
+    """
+    A graph stored as the CSR adjacency of its vertices, vertex `i` being the node `node_ids[i]`:
+    the edges of vertex `i` go to the vertices `adjacency.row(i)`, with the optional weights
+    `adjacency.weights` aligned with `adjacency.indices`.
+
+    Saved by `save_graph` as a directory of `.npy` arrays and memory-mapped by `load_graph`, so that
+    the worker processes attach to the pages of a single artifact instead of each unpickling the
+    node and edge DataFrames and resolving the edges again.
+    """
+
+    node_ids: np.ndarray
+    adjacency: CSRIndex
+    directed: bool = False
+
+    @property
+    def num_vertices(self) -> int:
+        return len(self.node_ids)
+
+    @property
+    def num_edges(self) -> int:
+        return len(self.adjacency.indices)
+
+    def edges(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Source and target vertex indices of every edge.
+        """
+        return self.adjacency.explode()
+
+    def simplify(self) -> "CSRGraph":
+        """
+        The graph without self loops and duplicate edges, nor weights, see `simplify_edges`.
+        """
+        src, dst = simplify_edges(*self.edges(), self.num_vertices, self.directed)
+        adjacency = CSRIndex(_csr_indptr(src, self.num_vertices), dst)
+        return CSRGraph(self.node_ids, adjacency, self.directed)
+
+    def to_igraph(self) -> ig.Graph:
+        """
+        Build the igraph Graph of the edges, with the `weight` edge attribute if weighted.
+
+        igraph only reads the edges from Python integers, they are converted `IGRAPH_CHUNK_EDGES`
+        at a time (see `_iter_edge_pairs`) instead of as a list of pairs of all edges. The weights
+        are a list of Python floats anyway, igraph keeping the attributes as lists.
+        """
+        src, dst = self.edges()
+        G = ig.Graph(
+            n=self.num_vertices,
+            edges=_iter_edge_pairs(src, dst),
+            directed=self.directed,
+        )
+        if self.adjacency.weights is not None:
+            G.es["weight"] = np.asarray(self.adjacency.weights).tolist()
+
+        return G
+
+
+def _iter_edge_pairs(
+    src: np.ndarray, dst: np.ndarray, chunk_size: int = IGRAPH_CHUNK_EDGES
+) -> Iterator[Tuple[int, int]]:
+    """
+    The `(src, dst)` pairs of the edges as Python integers, converted `chunk_size` edges at a time,
+    so that only one chunk of them is in memory while igraph copies them.
+    """
+    for start in range(0, len(src), chunk_size):
+        yield from zip(
+            src[start : start + chunk_size].tolist(),
+            dst[start : start + chunk_size].tolist(),
+        )
+
+
+def _csr_indptr(src: np.ndarray, num_vertices: int) -> np.ndarray:
+    """
+    CSR row pointers of edges sorted by source vertex.
+    """
+    indptr = np.zeros(num_vertices + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=num_vertices), out=indptr[1:])
+    return indptr
+
+
+def simplify_edges(
+    src: np.ndarray, dst: np.ndarray, num_vertices: int, directed: bool = False
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Remove the self loops and the duplicate edges of a graph in a vectorized way, the endpoints
+    of an undirected edge being unordered.
+
+    The edges are returned sorted by `(src, dst)`, with `src <= dst` if undirected, i.e. in the same
+    order as `ig.Graph.simplify(loops=True, combine_edges=None)`, so both give the same results.
+    """
+    src, dst = np.asarray(src, dtype=np.int64), np.asarray(dst, dtype=np.int64)
+    if not directed:
+        src, dst = np.minimum(src, dst), np.maximum(src, dst)
+    loops = src == dst
+    keys = np.unique(src[~loops] * num_vertices + dst[~loops])
+
+    return keys // num_vertices, keys % num_vertices
+
+
+def save_graph(
+    path: Path,
+    node_ids,
+    src,
+    dst,
+    weights=None,
+    directed: bool = False,
+    simple: bool = False,
+) -> CSRGraph:
+    """
+    Save a graph artifact readable by `load_graph`, from integer node and edge arrays, e.g. the
+    `id` column of a node DataFrame and the `src` and `dst` columns of an edge DataFrame.
+
+    The edges are resolved to vertex indices once, those touching a node outside of `node_ids` are
+    dropped, and they are grouped by source vertex keeping their order otherwise. The directory holds
+    `node_ids.npy`, the CSR arrays of `save_csr` and `graph.json`.
+
+    If `simple`, the simplified variant without self loops and duplicate edges (see `simplify_edges`)
+    is saved as well in the `simple` subdirectory, without the weights.
+
+    Return the memory-mapped graph.
+    """
+    path = Path(path)
+    node_ids = np.asarray(node_ids, dtype=np.int64)
+    src_idx, src_found = _resolve_vertices(node_ids, np.asarray(src))
+    dst_idx, dst_found = _resolve_vertices(node_ids, np.asarray(dst))
+    valid = src_found & dst_found
+    src_idx, dst_idx = src_idx[valid], dst_idx[valid]
+
+    order = np.argsort(src_idx, kind="stable")
+    if weights is not None:
+        weights = np.asarray(weights)[valid][order]
+    save_csr(path, _csr_indptr(src_idx, len(node_ids)), dst_idx[order], weights)
+    np.save(path / "node_ids.npy", node_ids)
+
+    if simple:
+        simple_src, simple_dst = simplify_edges(
+            src_idx, dst_idx, len(node_ids), directed
+        )
+        save_csr(path / "simple", _csr_indptr(simple_src, len(node_ids)), simple_dst)
+    elif (path / "simple").exists():
+        shutil.rmtree(path / "simple")
+
+    with open(path / GRAPH_META, "w") as f:
+        json.dump({"directed": directed, "simple": simple}, f)
+
+    return load_graph(path)
+
+
+def load_graph(path: Path, simple: bool = False) -> CSRGraph:
+    """
+    Memory-map a graph artifact saved by `save_graph`, without copying its arrays.
+    If `simple`, map the simplified variant, which must have been saved.
+    """
+    path = Path(path)
+    with open(path / GRAPH_META, "r") as f:
+        meta = json.load(f)
+    if simple and not meta.get("simple", False):
+        raise ValueError(f"The graph {path} is saved without its simplified variant.")
+
+    return CSRGraph(
+        node_ids=np.load(path / "node_ids.npy", mmap_mode="r"),
+        adjacency=load_csr(path / "simple" if simple else path),
+        directed=meta["directed"],
+    )
+
+
+def as_graph(graph: Union[CSRGraph, Path], simple: bool = False) -> CSRGraph:
+    """
+    The graph itself, or the artifact memory-mapped from its path, e.g. the path sent to a worker.
+    """
+    return graph if isinstance(graph, CSRGraph) else load_graph(graph, simple)
+
+
+@lru_cache(maxsize=GRAPH_CACHE_SIZE)
+def _cached_igraph(path: str, simple: bool, version: int) -> ig.Graph:
+    return load_graph(path, simple).to_igraph()
+
+
+def get_igraph(graph: Union[CSRGraph, Path], simple: bool = False) -> ig.Graph:
+    """
+    The igraph Graph of a graph artifact, built once per variant then reused until the end of the
+    stage, as long as the artifact is not saved again. The scheduler calls `clear_igraph_cache` after
+    every stage, so a long-lived worker does not keep the graphs of the previous stages alive.
+
+    A graph passed directly is built every time, since it has no artifact to key the cache.
+    If `simple`, the graph without self loops and duplicate edges is built instead. The cached graph
+    is shared, it must not be modified, e.g. use `G.copy()` before `G.simplify()`.
+    """
+    if isinstance(graph, CSRGraph):
+        return (graph.simplify() if simple else graph).to_igraph()
+    path = Path(graph)
+    version = (path / GRAPH_META).stat().st_mtime_ns
+    return _cached_igraph(str(path.resolve()), simple, version)
+
+
+def clear_igraph_cache() -> None:
+    """
+    Drop the igraph Graphs built by `get_igraph` in this process.
+    """
+    _cached_igraph.cache_clear()
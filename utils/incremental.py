@@ -0,0 +1,581 @@
+import gc
+import json
+import os
+import shutil
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from pathlib import Path
+from typing import Any, Callable, Dict, Final, List, Optional, Tuple
+from .loader import (
+    CHUNK_ROWS,
+    _iter_table,
+    _read_table,
+    PAPER_NODE_DTYPES,
+    PAPER_EDGE_DTYPES,
+    PAPER_INDEX_DTYPES,
+    AUTHOR_NODE_DTYPES,
+    AUTHOR_EDGE_DTYPES,
+)
+from .citation import add_citations
+from .columnar import saves_columnar
+from .csr import apply_patch, load_csr, npy_append_patch
+from .disambiguation import apply_author_mapping
+from .logger import logger
+from .preprocess import (
+    BATCH_SIZE,
+    _get_dataframe,
+    _resolve_references,
+    _save_table,
+)
+from .titles import DATA_FILE, OFFSETS_FILE, _encode
+from .wrapper import timer
+
+# Directory of the staged outputs of an ingestion, next to the paper index
+STAGING_DIR: Final = ".ingest"
+# Written last, the staged outputs are committed once it exists
+MANIFEST_FILE: Final = "manifest.json"
+
+
+def _merge_lists(old: str, new: List[int]) -> str:
+    """
+    Merge IDs into a `#`-joined sorted list of IDs.
+    """
+    ids = {int(x) for x in old.split("#") if x} | set(new)
+    return "#".join(map(str, sorted(ids)))
+
+
+def staging_dir(paper_index: Path) -> Path:
+    """
+    Directory of the staged outputs of an ingestion into the tables of `paper_index`.
+    """
+    return Path(paper_index).parent / STAGING_DIR
+
+
+def _apply_operation(staging: Path, operation: Dict[str, Any]) -> None:
+    """
+    Apply an operation of the manifest, applying it again gives the same file:
+    - `replace`: move the staged file over `target`, already done if the staged file is gone.
+    - `patch`: truncate `target` to `size` bytes and write the staged bytes at their offsets.
+    """
+    target = Path(operation["target"])
+    if "replace" in operation:
+        staged = staging / operation["replace"]
+        if staged.exists():
+            target.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(staged, target)
+    else:
+        writes = [
+            (offset, (staging / staged).read_bytes())
+            for offset, staged in operation["writes"]
+        ]
+        apply_patch(target, (operation["size"], writes))
+
+
+def _apply_manifest(staging: Path) -> None:
+    """
+    Apply the operations of the manifest in `staging`, then drop the staged outputs.
+    """
+    manifest = staging / MANIFEST_FILE
+    with open(manifest, "r", encoding="utf-8") as f:
+        operations = json.load(f)
+    for operation in operations:
+        _apply_operation(staging, operation)
+    # The manifest first, the staged files left without it are dropped by the next recovery
+    manifest.unlink()
+    shutil.rmtree(staging, ignore_errors=True)
+
+
+def recover_ingest(staging: Path) -> None:
+    """
+    Finish the ingestion interrupted while its outputs were staged in `staging`: without a manifest
+    nothing was changed yet and the staged outputs are dropped, otherwise the operations of the
+    manifest are applied again, see `_apply_operation`.
+    """
+    staging = Path(staging)
+    if (staging / MANIFEST_FILE).exists():
+        logger.warning(f"Complete the interrupted ingestion staged in {staging}.")
+        _apply_manifest(staging)
+    elif staging.exists():
+        logger.warning(f"Drop the outputs of the interrupted ingestion in {staging}.")
+        shutil.rmtree(staging, ignore_errors=True)
+
+
+class _Transaction:
+    """
+    Outputs of an ingestion staged in a directory, then committed to the tables together.
+
+    The tables are not modified until `commit`, which writes the manifest of the operations last
+    and applies them. An ingestion interrupted before the manifest leaves the tables as they were,
+    and one interrupted after it is completed by `recover_ingest`, so the tables are never left
+    half-ingested.
+    """
+
+    def __init__(self, staging: Path):
+        recover_ingest(staging)
+        self.staging = Path(staging)
+        self.staging.mkdir(parents=True)
+        self.operations: List[Dict[str, Any]] = []
+        self.staged: List[Tuple[Path, Path]] = []
+        self.num_files = 0
+
+    def _new_file(self, target: Path) -> Path:
+        # The name of the target is kept, its suffix tells a csv file from a columnar table
+        self.num_files += 1
+        return self.staging / f"{self.num_files}-{target.name}"
+
+    def stage(self, target: Path) -> Path:
+        """
+        Path of the new version of a file or of a columnar directory, to be written by the caller.
+        """
+        target = Path(target)
+        staged = self._new_file(target)
+        self.staged.append((staged, target))
+        return staged
+
+    def patch(self, target: Path, size: int, writes: List[Tuple[int, bytes]]) -> None:
+        operation = {"target": str(Path(target).resolve()), "size": size, "writes": []}
+        self.operations.append(operation)
+        for offset, data in writes:
+            staged = self._new_file(Path(target))
+            staged.write_bytes(data)
+            operation["writes"].append((offset, staged.name))
+
+    def append(self, target: Path, data: bytes) -> None:
+        size = Path(target).stat().st_size
+        self.patch(target, size, [(size, data)])
+
+    def append_npy(self, target: Path, values: np.ndarray) -> None:
+        """
+        Append values to a 1-D `.npy` array, see `utils.csr.append_npy`.
+        """
+        patch = npy_append_patch(target, values)
+        if patch is not None:
+            self.patch(target, *patch)
+            return
+        array = np.load(target)
+        with open(self.stage(target), "wb") as f:
+            np.save(f, np.concatenate([array, np.asarray(values, dtype=array.dtype)]))
+
+    def commit(self) -> None:
+        # A staged columnar directory replaces the files of the table one by one
+        for staged, target in self.staged:
+            if staged.is_dir():
+                files = sorted(p for p in staged.rglob("*") if p.is_file())
+                pairs = [(file, target / file.relative_to(staged)) for file in files]
+            else:
+                pairs = [(staged, target)]
+            for file, destination in pairs:
+                self.operations.append(
+                    {
+                        "replace": file.relative_to(self.staging).as_posix(),
+                        "target": str(destination.resolve()),
+                    }
+                )
+        tmp = self.staging / f"{MANIFEST_FILE}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.operations, f, indent=4)
+        os.replace(tmp, self.staging / MANIFEST_FILE)
+        _apply_manifest(self.staging)
+
+
+def _update_table(
+    path: Path,
+    dtypes: Dict[str, str],
+    update: Optional[Callable[[pd.DataFrame], pd.DataFrame]],
+    new_rows: Callable[[], pd.DataFrame],
+    transaction: _Transaction,
+) -> None:
+    """
+    Stage the table with `update` applied to its rows and the rows returned by `new_rows` appended,
+    `new_rows` being called once the existing rows are updated.
+
+    A csv file is only appended if `update` is `None`, otherwise it is rewritten `CHUNK_ROWS` rows
+    at a time to a staged file, so only one chunk is in memory. A columnar table is read and saved
+    again as a whole, since its columns are saved as a whole.
+    """
+    path = Path(path)
+    if saves_columnar(path):
+        df = _read_table(path, dtypes)
+        if update is not None:
+            df = update(df)
+        _save_table(
+            pd.concat([df, new_rows()], ignore_index=True),
+            transaction.stage(path),
+            dtypes,
+        )
+        return
+
+    if update is None:
+        rows = new_rows()[list(dtypes)].to_csv(index=False, header=False)
+        transaction.append(path, rows.encode())
+        return
+
+    staged = transaction.stage(path)
+    pd.DataFrame(columns=list(dtypes)).to_csv(staged, index=False)
+    for chunk in _iter_table(path, dtypes, CHUNK_ROWS):
+        update(chunk).to_csv(staged, index=False, mode="a", header=False)
+    new_rows()[list(dtypes)].to_csv(staged, index=False, mode="a", header=False)
+
+
+def ingested_snapshots(ingested_dir: Path) -> List[Path]:
+    """
+    Snapshots saved by `save_snapshot`, in the order they were ingested.
+    """
+    ingested_dir = Path(ingested_dir)
+    if not ingested_dir.is_dir():
+        return []
+    return sorted(p for p in ingested_dir.iterdir() if p.is_file())
+
+
+def snapshot_path(data_path: Path, ingested_dir: Path) -> Path:
+    """
+    Path of the copy of a snapshot in `ingested_dir`, numbered after the previous ones so that
+    `preprocess` replays them in order after the dataset, see `main.preprocess_stage`.
+    """
+    ingested_dir = Path(ingested_dir)
+    return ingested_dir / (
+        f"{len(ingested_snapshots(ingested_dir)) + 1:04d}-{Path(data_path).name}"
+    )
+
+
+def save_snapshot(data_path: Path, ingested_dir: Path) -> Path:
+    """
+    Keep a copy of an ingested snapshot in `ingested_dir`, see `snapshot_path`.
+    """
+    target = snapshot_path(data_path, ingested_dir)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    shutil.copyfile(data_path, target)
+    return target
+
+
+@timer
+def ingest_records(
+    data_path: Path,
+    author_node: Path,
+    author_edge: Path,
+    venue_map: Path,
+    paper_map: Path,
+    citation: Path,
+    paper_node: Path,
+    paper_edge: Path,
+    paper_index: Path,
+    paper_refs: Path,
+    batch_size: int = BATCH_SIZE,
+    num_workers: Optional[int] = None,
+    max_authors_per_paper: Optional[int] = None,
+    data_format: str = "auto",
+    author_alias: Optional[Path] = None,
+    snapshot: Optional[Path] = None,
+    staging: Optional[Path] = None,
+) -> int:
+    """
+    Incrementally ingest a newer snapshot, or a batch of new papers, into the artifacts saved by
+    `save_records_to_csv`. The IDs of existing papers, authors and venues are kept stable.
+
+    Only the papers whose `#index` is not in `paper_index` are ingested. New papers, authors and
+    venues get the next free IDs, and the references of the new papers become new edges, updating
+    `in_d`, the co-author weights and the yearly citations of the affected authors. The references
+    of already ingested papers are kept as they are.
+
+    Only the rows of the paper index and the author names matching the papers of the snapshot are
+    kept, so the memory grows with the snapshot, not with the dataset. The I/O does not: the paper
+    index and the author names are scanned, and the csv tables whose existing rows change, i.e.
+    the paper and author nodes and the author edges, are rewritten `CHUNK_ROWS` rows at a time,
+    so an ingestion reads and writes them in full, O(dataset). The columnar tables are even read
+    and saved again as a whole. Only the tables only growing, i.e. the paper index and edges, the
+    references and the titles, are appended, O(snapshot). The new co-author pairs come after the
+    existing ones.
+
+    Every output is staged in `staging`, next to the paper index by default (see `staging_dir`),
+    then committed to the tables together, along with the copy of the snapshot to `snapshot` if
+    given, see `save_snapshot`. An interrupted ingestion is rolled back or completed by the next one,
+    see `recover_ingest`, so it is never applied twice nor in part.
+
+    The snapshot may be in any format supported by `save_records_to_csv`, see `data_format`.
+    If `author_alias` exists, the author names are renamed with the saved disambiguation aliases.
+
+    Return the number of ingested papers.
+    """
+    staging = Path(staging or staging_dir(paper_index))
+    recover_ingest(staging)
+    df = _get_dataframe(data_path, batch_size, num_workers, data_format)
+
+    # Only the index of the papers of the snapshot and of the papers they cite is read
+    references = df["references"].str.split("#").explode()
+    papers = set(df["id"]) | set(references[references.notna() & (references != "")])
+    index_df = _read_table(
+        paper_index, PAPER_INDEX_DTYPES, filters=[("index", "in", list(papers))]
+    )
+    del references, papers
+
+    # Keep the papers which are not ingested yet
+    df = df[~df["id"].isin(index_df["index"])].reset_index(drop=True)
+    if df.empty:
+        logger.info(f"There are no new papers in {data_path}, nothing to ingest.")
+        return 0
+    logger.info(f"Start ingesting {len(df)} new papers from {data_path}...")
+    transaction = _Transaction(staging)
+
+    # Intern the new papers after the existing ones, the IDs being dense from 1
+    refs = load_csr(paper_refs)
+    first_id = refs.num_rows + 1
+    # The references of the new papers come after the existing ones, matching `start`/`end`
+    first_start = int(refs.indptr[-1]) + 1
+    del refs
+    num_papers = first_id + len(df)
+    original_index = df["id"]
+    df["id"] = np.arange(first_id, num_papers, dtype=np.int32)
+    new_index = pd.DataFrame({"id": df["id"], "index": original_index})
+    indptr, indices = _resolve_references(
+        df["references"],
+        pd.concat([index_df["index"], new_index["index"]], ignore_index=True),
+        pd.concat([index_df["id"], new_index["id"]], ignore_index=True),
+    )
+    del index_df
+
+    # Rename the name variants merged by the disambiguation of the preprocessing
+    if author_alias is not None and author_alias.exists():
+        with open(author_alias, "r", encoding="utf-8") as f:
+            df["authors"] = apply_author_mapping(df["authors"], json.load(f))
+
+    # Intern the new authors after the existing ones, the names are scanned and only the ones of
+    # the authors of the new papers are kept
+    authors = df["authors"].str.split("#").explode()
+    wanted = set(authors)
+    known = []
+    first_author = 1
+    name_dtypes = {column: AUTHOR_NODE_DTYPES[column] for column in ("id", "name")}
+    for chunk in _iter_table(author_node, name_dtypes, CHUNK_ROWS):
+        names = chunk["name"].fillna("")
+        matched = names.isin(wanted).to_numpy()
+        if matched.any():
+            known.append(
+                pd.Series(chunk["id"].to_numpy()[matched], index=names[matched])
+            )
+        if len(chunk):
+            first_author = max(first_author, int(chunk["id"].max()) + 1)
+    name_to_id = pd.concat(known) if known else pd.Series([], dtype=np.int32)
+    new_names = sorted(wanted - set(name_to_id.index))
+    num_authors = first_author - 1 + len(new_names)
+    name_to_id = pd.concat(
+        [
+            name_to_id,
+            pd.Series(
+                np.arange(first_author, num_authors + 1, dtype=np.int32),
+                index=new_names,
+            ),
+        ]
+    )
+    author_ids = authors.map(name_to_id).astype(np.int32)
+    df["authors"] = author_ids.groupby(level=0).agg(list)
+    del known, name_to_id
+
+    # Intern the new venues after the existing ones
+    with open(venue_map, "r", encoding="utf-8") as f:
+        id_to_venue = json.load(f)
+    venue_to_id = {venue: int(idx) for idx, venue in id_to_venue.items()}
+    next_venue = max(venue_to_id.values(), default=0) + 1
+    for venue in sorted(set(df["venue"]) - set(venue_to_id)):
+        venue_to_id[venue] = next_venue
+        id_to_venue[str(next_venue)] = venue
+        next_venue += 1
+    df["venue"] = df["venue"].map(venue_to_id)
+
+    df["out_d"] = np.diff(indptr)
+    df["start"] = first_start + indptr[:-1]
+    df["end"] = first_start + indptr[1:]
+
+    src = np.repeat(df["id"].to_numpy(), df["out_d"].to_numpy())
+    dst = indices
+    # Number of new citations of every paper
+    in_degree = np.bincount(dst, minlength=num_papers)
+    df["in_d"] = in_degree[df["id"].to_numpy()]
+    df["isolate"] = (df["in_d"] == 0) & (df["out_d"] == 0)
+
+    # Paper nodes: add the new citations to `in_d` and append the new papers, the cited papers
+    # being kept for the yearly citations of their authors
+    cited = [df.loc[df["in_d"] != 0, ["authors", "year", "in_d"]].explode("authors")]
+
+    def update_papers(chunk: pd.DataFrame) -> pd.DataFrame:
+        added = in_degree[chunk["id"].to_numpy()]
+        if not added.any():
+            return chunk
+        chunk = chunk.assign(in_d=chunk["in_d"] + added)
+        chunk["isolate"] = (chunk["in_d"] == 0) & (chunk["out_d"] == 0)
+        rows = chunk.loc[added != 0, ["authors", "year"]].assign(in_d=added[added != 0])
+        # An empty list stands for the single author 1, see `_save_paper_chunk`
+        rows["authors"] = rows["authors"].fillna("").replace("", "1").str.split("#")
+        cited.append(rows.explode("authors"))
+        return chunk
+
+    def new_papers() -> pd.DataFrame:
+        new_paper_df = df[list(PAPER_NODE_DTYPES)].copy()
+        new_paper_df["authors"] = new_paper_df["authors"].apply(
+            lambda x: "" if x == [1] else "#".join(map(str, x))
+        )
+        return new_paper_df
+
+    _update_table(
+        paper_node,
+        PAPER_NODE_DTYPES,
+        update_papers if in_degree[:first_id].any() else None,
+        new_papers,
+        transaction,
+    )
+
+    # Author nodes and co-author edges of the new papers
+    incidence = sp.csr_matrix(
+        (
+            np.ones(len(author_ids), dtype=np.int32),
+            (author_ids.to_numpy() - 1, author_ids.index.to_numpy()),
+        ),
+        shape=(num_authors, len(df)),
+    )
+    incidence.sum_duplicates()
+    incidence.data[:] = 1
+    coauthorship = incidence
+    if max_authors_per_paper is not None:
+        hyper = np.asarray(incidence.sum(axis=0)).ravel() > max_authors_per_paper
+        coauthorship = incidence[:, ~hyper]
+    co_authors = (coauthorship @ coauthorship.T).tocsr()
+    co_authors.setdiag(0)
+    co_authors.eliminate_zeros()
+    co_authors.sort_indices()
+
+    # New papers and co-authors of every author of the new papers, by author ID
+    new_ids = df["id"].to_numpy()
+    changes = {}
+    for row in np.flatnonzero(np.diff(incidence.indptr)).tolist():
+        papers = incidence.indices[incidence.indptr[row] : incidence.indptr[row + 1]]
+        partners = co_authors.indices[
+            co_authors.indptr[row] : co_authors.indptr[row + 1]
+        ]
+        changes[row + 1] = (new_ids[papers], partners + 1)
+
+    def update_authors(chunk: pd.DataFrame) -> pd.DataFrame:
+        changed = chunk["id"].isin(changes).to_numpy()
+        if not changed.any():
+            return chunk
+        chunk = chunk.assign(
+            co_authors=chunk["co_authors"].fillna(""), papers=chunk["papers"].fillna("")
+        )
+        for idx, author in zip(
+            chunk.index[changed], chunk["id"].to_numpy()[changed].tolist()
+        ):
+            papers, partners = changes[author]
+            chunk.at[idx, "papers"] = _merge_lists(chunk.at[idx, "papers"], papers)
+            chunk.at[idx, "co_authors"] = _merge_lists(
+                chunk.at[idx, "co_authors"], partners
+            )
+        for column, count in [
+            ("papers", "num_papers"),
+            ("co_authors", "num_co_authors"),
+        ]:
+            lists = chunk.loc[changed, column]
+            chunk.loc[changed, count] = lists.str.count("#") + (lists != "")
+        return chunk
+
+    def new_authors() -> pd.DataFrame:
+        lists = [
+            changes.get(author, ([], []))
+            for author in range(first_author, num_authors + 1)
+        ]
+        new_author_df = pd.DataFrame(
+            {
+                "id": np.arange(first_author, num_authors + 1, dtype=np.int32),
+                "name": new_names,
+                "co_authors": [_merge_lists("", partners) for _, partners in lists],
+                "papers": [_merge_lists("", papers) for papers, _ in lists],
+                "num_co_authors": [len(set(partners)) for _, partners in lists],
+                "num_papers": [len(set(papers)) for papers, _ in lists],
+            }
+        )
+        return new_author_df.astype(AUTHOR_NODE_DTYPES)
+
+    _update_table(
+        author_node,
+        AUTHOR_NODE_DTYPES,
+        update_authors if any(author < first_author for author in changes) else None,
+        new_authors,
+        transaction,
+    )
+
+    # Co-author edges: add the weights of the existing pairs, then append the new pairs
+    edges = sp.triu(co_authors, k=1).tocoo()
+    keys = (edges.row + 1).astype(np.int64) * (num_authors + 1) + (edges.col + 1)
+    order = np.argsort(keys)
+    keys, weights = keys[order], edges.data[order]
+    matched = np.zeros(len(keys), dtype=bool)
+
+    def update_edges(chunk: pd.DataFrame) -> pd.DataFrame:
+        chunk_keys = chunk["src"].to_numpy(np.int64) * (num_authors + 1) + chunk[
+            "dst"
+        ].to_numpy(np.int64)
+        pos = np.clip(np.searchsorted(keys, chunk_keys), 0, len(keys) - 1)
+        hit = keys[pos] == chunk_keys
+        if not hit.any():
+            return chunk
+        matched[pos[hit]] = True
+        w = chunk["w"].to_numpy().copy()
+        w[hit] += weights[pos[hit]]
+        return chunk.assign(w=w)
+
+    def new_edges() -> pd.DataFrame:
+        return pd.DataFrame(
+            {
+                "src": keys[~matched] // (num_authors + 1),
+                "dst": keys[~matched] % (num_authors + 1),
+                "w": weights[~matched],
+            }
+        ).astype(AUTHOR_EDGE_DTYPES)
+
+    _update_table(
+        author_edge,
+        AUTHOR_EDGE_DTYPES,
+        update_edges if len(keys) else None,
+        new_edges,
+        transaction,
+    )
+
+    # Tables only growing
+    _update_table(paper_index, PAPER_INDEX_DTYPES, None, lambda: new_index, transaction)
+    _update_table(
+        paper_edge,
+        PAPER_EDGE_DTYPES,
+        None,
+        lambda: pd.DataFrame({"src": src, "dst": dst}).astype(PAPER_EDGE_DTYPES),
+        transaction,
+    )
+    # References and titles, appended like `utils.csr.append_csr` and `utils.titles.append_titles`
+    transaction.append_npy(Path(paper_refs) / "indices.npy", indices)
+    transaction.append_npy(
+        Path(paper_refs) / "indptr.npy", first_start - 1 + indptr[1:]
+    )
+    blob, lengths = _encode(df["title"])
+    end = int(np.load(Path(paper_map) / OFFSETS_FILE, mmap_mode="r")[-1])
+    transaction.append(Path(paper_map) / DATA_FILE, blob)
+    transaction.append_npy(Path(paper_map) / OFFSETS_FILE, end + np.cumsum(lengths))
+    with open(transaction.stage(venue_map), "w") as f:
+        json.dump(id_to_venue, f, indent=4)
+
+    # Add the new citations to the author x year matrix
+    add_citations(
+        pd.concat(cited, ignore_index=True),
+        citation,
+        num_authors,
+        output=transaction.stage(citation),
+    )
+    if snapshot is not None:
+        shutil.copyfile(data_path, transaction.stage(snapshot))
+
+    transaction.commit()
+
+    logger.info(
+        f"Successfully ingest {len(df)} papers, {len(new_names)} authors and {len(src)} citations!"
+    )
+
+    del df
+    gc.collect()
+
+    return len(new_ids)
@@ -0,0 +1,33 @@
+import importlib
+from typing import Callable, Dict, List, Tuple
+
+
+def lazy_exports(
+    package: str, exports: Dict[str, str]
+) -> Tuple[Callable[[str], object], Callable[[], List[str]]]:
+    """
+    Build the module-level `__getattr__` and `__dir__` of a package facade (PEP 562), which imports
+    the submodule of an exported name only on its first access, so that importing the package does
+    not import pandas, igraph and the other heavy dependencies of its submodules.
+
+    Parameters:
+        - package: `__name__` of the package.
+        - exports: Mapping of 'exported name: relative submodule', e.g. `{"louvain_ig": ".louvain"}`.
+
+    Example usage, in `__init__.py`:
+    >>> __getattr__, __dir__ = lazy_exports(__name__, {"louvain_ig": ".louvain"})
+    """
+
+    def __getattr__(name: str) -> object:
+        if name not in exports:
+            raise AttributeError(f"module {package!r} has no attribute {name!r}")
+        module = importlib.import_module(exports[name], package)
+        value = getattr(module, name)
+        # Cache the value in the package, the next accesses do not go through `__getattr__`
+        setattr(importlib.import_module(package), name, value)
+        return value
+
+    def __dir__() -> List[str]:
+        return sorted(set(vars(importlib.import_module(package))) | set(exports))
+
+    return __getattr__, __dir__
@@ -1,9 +1,56 @@
 import json
+import operator
+import numpy as np
 import pandas as pd
 from pathlib import Path
+from typing import Any, Dict, Final, Iterator, List, Optional, Tuple
+from .citation import CitationStore
+from .columnar import columnar_length, is_columnar, load_columnar
+from .csr import CSRIndex, load_csr
 from .logger import logger
+from .titles import TitleStore
 from .wrapper import timer
 
+PAPER_NODE_DTYPES: Final = {
+    "id": "int32",
+    "authors": "string",
+    "year": "Int16",
+    "venue": "str",
+    "out_d": "Int16",
+    "start": "Int64",
+    "end": "Int64",
+    "in_d": "Int16",
+    "isolate": "bool",
+}
+PAPER_EDGE_DTYPES: Final = {"src": "int32", "dst": "int32"}
+PAPER_INDEX_DTYPES: Final = {"id": "int32", "index": "string"}
+AUTHOR_NODE_DTYPES: Final = {
+    "id": "int32",
+    "name": "string",
+    "co_authors": "string",
+    "papers": "string",
+    "num_co_authors": "Int32",
+    "num_papers": "Int32",
+}
+AUTHOR_EDGE_DTYPES: Final = {"src": "int32", "dst": "int32", "w": "int16"}
+
+# Row predicates `(column, op, value)`, a row is kept if it satisfies all of them
+Filters = List[Tuple[str, str, Any]]
+FILTER_OPS: Final = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "in": lambda values, other: values.isin(other),
+    "not in": lambda values, other: ~values.isin(other) & values.notna(),
+}
+# Rows of a csv file parsed at a time when filtering
+CHUNK_ROWS: Final = 1_000_000
+# Rows of a list column parsed at a time into a CSR index
+LIST_BATCH_ROWS: Final = 100_000
+
 
 def _load_logger(df: pd.DataFrame, path: Path):
     logger.info(
@@ -11,40 +58,242 @@ def _load_logger(df: pd.DataFrame, path: Path):
     )
 
 
+def apply_filters(df: pd.DataFrame, filters: Filters) -> pd.DataFrame:
+    """
+    Keep the rows of an in-memory DataFrame satisfying all `filters`, like the load_* functions do while reading.
+    """
+    return df[_filter_mask(df, filters)]
+
+
+def _filter_mask(df: pd.DataFrame, filters: Filters) -> np.ndarray:
+    """
+    Evaluate the conjunction of `filters` on `df`, rows with a missing value fail the predicate.
+    """
+    mask = np.ones(len(df), dtype=bool)
+    for column, op, value in filters:
+        if op not in FILTER_OPS:
+            raise ValueError(
+                f"Unknown filter operator {op}, expected one of {list(FILTER_OPS)}."
+            )
+        result = FILTER_OPS[op](df[column], value)
+        mask &= np.asarray(result.fillna(False), dtype=bool)
+    return mask
+
+
+def _read_table(
+    path: Path,
+    dtypes: Dict[str, str],
+    columns: Optional[List[str]] = None,
+    filters: Optional[Filters] = None,
+) -> pd.DataFrame:
+    """
+    Read a table either from a csv file or from a columnar directory, see `utils.columnar`.
+    The columnar tables are stored with `dtypes` already, so the cast is a no-op there.
+
+    Only `columns` are read if given, and only the rows satisfying all `filters` are materialized:
+    - For a columnar table, the filtered columns are memory-mapped first and only the selected rows
+      of the other columns are read.
+    - For a csv file, the rows are parsed and filtered `CHUNK_ROWS` at a time.
+    The selected rows keep their positions in the table as index.
+    """
+    filter_dtypes = {column: dtypes[column] for column, _, _ in filters or []}
+    if columns is not None:
+        dtypes = {column: dtypes[column] for column in columns}
+    if not filters:
+        if is_columnar(path):
+            return load_columnar(path, columns=columns).astype(dtypes, copy=False)
+        return pd.read_csv(path, usecols=columns, low_memory=True).astype(dtypes)
+
+    if is_columnar(path):
+        mask_df = load_columnar(path, columns=list(filter_dtypes))
+        rows = np.flatnonzero(_filter_mask(mask_df, filters))
+        del mask_df
+        df = load_columnar(path, columns=columns, rows=rows)
+        return df.astype(dtypes, copy=False)
+
+    chunks = list(_iter_table(path, dtypes, CHUNK_ROWS, filters, filter_dtypes))
+    if not chunks:
+        return pd.DataFrame(columns=list(dtypes)).astype(dtypes)
+    return pd.concat(chunks)
+
+
+def _iter_table(
+    path: Path,
+    dtypes: Dict[str, str],
+    batch_size: int,
+    filters: Optional[Filters] = None,
+    filter_dtypes: Optional[Dict[str, str]] = None,
+) -> Iterator[pd.DataFrame]:
+    """
+    Read the `dtypes` columns of a table `batch_size` rows at a time, yielding the typed rows of each
+    batch satisfying `filters`, whose dtypes are `filter_dtypes`. Only one batch is in memory at a time.
+    """
+    filter_dtypes = filter_dtypes or {}
+    needed = list({**dtypes, **filter_dtypes})
+
+    if is_columnar(path):
+        length = columnar_length(path)
+        chunks = (
+            load_columnar(
+                path,
+                columns=needed,
+                rows=np.arange(start, min(start + batch_size, length)),
+            )
+            for start in range(0, length, batch_size)
+        )
+    else:
+        chunks = pd.read_csv(
+            path, usecols=needed, chunksize=batch_size, low_memory=True
+        )
+
+    for chunk in chunks:
+        if filters:
+            chunk = chunk[_filter_mask(chunk.astype(filter_dtypes), filters)]
+        yield chunk[list(dtypes)].astype(dtypes)
+
+
+def _split_lists(values: pd.Series, batch_size: int = LIST_BATCH_ROWS) -> CSRIndex:
+    """
+    Parse a column of `#`-joined integer lists into a CSR index, row `i` being the list of the i-th row.
+    Missing values and empty strings are empty lists. The lists are parsed `batch_size` rows at a time,
+    and a value which is not an int32 raises a `ValueError`.
+    """
+    values = values.fillna("")
+
+    indptr = np.zeros(len(values) + 1, dtype=np.int64)
+    np.cumsum(
+        (values.str.count("#") + (values != "")).to_numpy(dtype=np.int64),
+        out=indptr[1:],
+    )
+
+    indices = np.empty(indptr[-1], dtype=np.int32)
+    for start in range(0, len(values), batch_size):
+        stop = min(start + batch_size, len(values))
+        batch = values.iloc[start:stop]
+        batch = batch[batch != ""]
+        tokens = "#".join(batch).split("#") if len(batch) else []
+        if len(tokens) != indptr[stop] - indptr[start]:
+            raise ValueError(
+                f"Parsed {len(tokens)} values from rows {start} to {stop}, "
+                f"expected {indptr[stop] - indptr[start]}."
+            )
+        try:
+            indices[indptr[start] : indptr[stop]] = np.fromiter(
+                map(int, tokens), dtype=np.int32, count=len(tokens)
+            )
+        except (ValueError, OverflowError) as e:
+            raise ValueError(
+                f"Invalid list value in rows {start} to {stop}: {e}"
+            ) from e
+
+    return CSRIndex(indptr, indices)
+
+
+def _load_lists(
+    path: Path, dtypes: Dict[str, str], columns: List[str]
+) -> Dict[str, CSRIndex]:
+    df = _read_table(path, dtypes, ["id"] + columns)
+    if not (np.diff(df["id"].to_numpy()) > 0).all():
+        df = df.sort_values("id")
+
+    lists = {column: _split_lists(df[column]) for column in columns}
+    logger.info(
+        f"Load {', '.join(columns)} of {path} as CSR indices with {len(df)} rows, "
+        f"{sum(len(v.indices) for v in lists.values())} values"
+    )
+
+    return lists
+
+
+def _project(
+    dtypes: Dict[str, str], columns: Optional[List[str]], skip: Tuple[str, ...] = ()
+) -> List[str]:
+    """
+    The columns to read, all of the table by default, without the `skip` ones.
+    """
+    return [column for column in columns or dtypes if column not in skip]
+
+
+def _split_list_column(df: pd.DataFrame, column: str, fillna: bool) -> None:
+    if fillna:
+        df[column] = df[column].fillna("")
+
+    df[column] = df[column].str.split("#")
+    df[column] = df[column].apply(lambda x: x if x != [""] else [])
+
+
+def _paper_node_query(
+    skip_isolate: bool,
+    lists: bool,
+    columns: Optional[List[str]],
+    filters: Optional[Filters],
+) -> Tuple[List[str], Filters]:
+    filters = list(filters or [])
+    if skip_isolate:
+        filters.append(("isolate", "==", False))
+    skip = () if lists else ("authors",)
+    return _project(PAPER_NODE_DTYPES, columns, skip), filters
+
+
+def _paper_node_frame(
+    df: pd.DataFrame, fillna: bool, skip_isolate: bool
+) -> pd.DataFrame:
+    if "authors" in df.columns:
+        _split_list_column(df, "authors", fillna)
+
+    if skip_isolate and "isolate" in df.columns:
+        df = df.drop(columns=["isolate"])
+
+    return df
+
+
+def _author_node_frame(df: pd.DataFrame, fillna: bool) -> pd.DataFrame:
+    if fillna and "name" in df.columns:
+        df["name"] = df["name"].fillna("")
+
+    for column in ["co_authors", "papers"]:
+        if column in df.columns:
+            _split_list_column(df, column, fillna)
+
+    return df
+
+
 @timer
 def load_paper_node(
-    path: Path, fillna: bool = True, skip_isolate: bool = False
+    path: Path,
+    fillna: bool = True,
+    skip_isolate: bool = False,
+    lists: bool = True,
+    columns: Optional[List[str]] = None,
+    filters: Optional[Filters] = None,
 ) -> pd.DataFrame:
     """
-    For the `paper/node.csv` file:
+    For the `paper/node.csv` file (or its columnar directory `paper/node`):
     - The columns include: `id`, `authors`, `year`, `venue`, `out_d`, `start`, `end`, `in_d`, `isolate`
     - `year = 0` indicates that the year value is missing.
     - `venue = 1` indicates that the venue value is missing.
     - An empty string in the `authors` column indicates a missing value in the original file.
     - When loading the `authors` column as a list, the value `[]` is treated as `NaN` in the DataFrame.
+    - With `lists=False` the `authors` column is not read at all, see `load_paper_authors` to load it as offsets.
+    - Only `columns` and the rows satisfying `filters`, e.g. `[("year", ">=", 2000)]`, are read.
+      `skip_isolate` is a shortcut of the `("isolate", "==", False)` filter, dropping the column.
     """
-    df = pd.read_csv(path, low_memory=True).astype(
-        {
-            "id": "string",
-            "authors": "string",
-            "year": "Int16",
-            "venue": "str",
-            "out_d": "Int16",
-            "start": "Int64",
-            "end": "Int64",
-            "in_d": "Int16",
-            "isolate": "bool",
-        }
-    )
+    columns, filters = _paper_node_query(skip_isolate, lists, columns, filters)
+    df = _read_table(path, PAPER_NODE_DTYPES, columns, filters)
+    df = _paper_node_frame(df, fillna, skip_isolate)
 
-    if fillna:
-        df["authors"] = df["authors"].fillna("")
+    _load_logger(df, path)
 
-    df["authors"] = df["authors"].str.split("#")
-    df["authors"] = df["authors"].apply(lambda x: x if x != [""] else [])
+    return df
 
-    if skip_isolate:
-        df = df[~df["isolate"]].drop(columns=["isolate"])
+
+@timer
+def load_paper_edge(
+    path: Path,
+    columns: Optional[List[str]] = None,
+    filters: Optional[Filters] = None,
+) -> pd.DataFrame:
+    df = _read_table(path, PAPER_EDGE_DTYPES, columns, filters)
 
     _load_logger(df, path)
 
@@ -52,13 +301,13 @@ def load_paper_node(
 
 
 @timer
-def load_paper_edge(path: Path) -> pd.DataFrame:
-    df = pd.read_csv(path, low_memory=True).astype(
-        {
-            "src": "string",
-            "dst": "string",
-        }
-    )
+def load_paper_index(path: Path, filters: Optional[Filters] = None) -> pd.DataFrame:
+    """
+    For the `paper/index.csv` file:
+    - The columns include: `id` and `index`, the dense int32 ID of a paper and its original `#index`.
+    - Only the rows satisfying `filters`, e.g. `[("id", "in", ids)]`, are read.
+    """
+    df = _read_table(path, PAPER_INDEX_DTYPES, filters=filters)
 
     _load_logger(df, path)
 
@@ -66,32 +315,53 @@ def load_paper_edge(path: Path) -> pd.DataFrame:
 
 
 @timer
-def load_author_node(path: Path, fillna: bool = True) -> pd.DataFrame:
+def load_paper_refs(path: Path) -> CSRIndex:
     """
-    For the `author/node.csv` file:
-    - The columns include: `id`, `name`, `co_authors`, `papers`, `num_co_authors` and `num_papers`.
-    - `id = 1` indicates that the `name` of the author and the list of `co_authors` are missing.
+    For the `paper/refs` directory, the CSR index of references:
+    - The references of paper `id` are `indices[indptr[id - 1]:indptr[id]]`, i.e. `refs.row(id - 1)`.
+    - `indptr[id - 1] + 1` and `indptr[id] + 1` are the `start` and `end` of the paper in `paper/node.csv`.
+    - Both arrays are memory-mapped, so a lookup only reads the slice it needs.
     """
-    df = pd.read_csv(path, low_memory=True).astype(
-        {
-            "id": "str",
-            "name": "string",
-            "co_authors": "string",
-            "papers": "string",
-            "num_co_authors": "Int32",
-            "num_papers": "Int32",
-        }
+    refs = load_csr(path)
+    logger.info(
+        f"Load {path} as CSR index with {refs.num_rows} papers and {len(refs.indices)} references"
     )
 
-    if fillna:
-        df["name"] = df["name"].fillna("")
-        df["co_authors"] = df["co_authors"].fillna("")
-        df["papers"] = df["papers"].fillna("")
+    return refs
 
-    df["co_authors"] = df["co_authors"].str.split("#")
-    df["co_authors"] = df["co_authors"].apply(lambda x: x if x != [""] else [])
-    df["papers"] = df["papers"].str.split("#")
-    df["papers"] = df["papers"].apply(lambda x: x if x != [""] else [])
+
+@timer
+def load_paper_authors(path: Path) -> CSRIndex:
+    """
+    For the `authors` column of `paper/node.csv` (or of its columnar directory `paper/node`):
+    - The author IDs of all papers as one flat int32 array plus offsets, instead of one list per row.
+    - The authors of paper `id` are `authors.row(id - 1)`, the IDs being dense from 1.
+    - Use `counts()`, `explode()` and `take(rows)` of `CSRIndex` to count, explode and look them up.
+    """
+    return _load_lists(path, PAPER_NODE_DTYPES, ["authors"])["authors"]
+
+
+@timer
+def load_author_node(
+    path: Path,
+    fillna: bool = True,
+    lists: bool = True,
+    columns: Optional[List[str]] = None,
+    filters: Optional[Filters] = None,
+) -> pd.DataFrame:
+    """
+    For the `author/node.csv` file (or its columnar directory `author/node`):
+    - The columns include: `id`, `name`, `co_authors`, `papers`, `num_co_authors` and `num_papers`.
+    - `id = 1` indicates that the `name` of the author and the list of `co_authors` are missing.
+    - With `lists=False` the `co_authors` and `papers` columns are not read at all,
+      see `load_author_lists` to load them as offsets.
+    - Only `columns` and the rows satisfying `filters`, e.g. `[("num_papers", ">", 1)]`, are read.
+    """
+    skip = () if lists else ("co_authors", "papers")
+    df = _read_table(
+        path, AUTHOR_NODE_DTYPES, _project(AUTHOR_NODE_DTYPES, columns, skip), filters
+    )
+    df = _author_node_frame(df, fillna)
 
     _load_logger(df, path)
 
@@ -99,16 +369,123 @@ def load_author_node(path: Path, fillna: bool = True) -> pd.DataFrame:
 
 
 @timer
-def load_author_edge(path: str) -> pd.DataFrame:
-    df = pd.read_csv(path, low_memory=True).astype(
-        {"src": "str", "dst": "str", "w": "int16"}
-    )
+def load_author_lists(path: Path) -> Dict[str, CSRIndex]:
+    """
+    For the `co_authors` and `papers` columns of `author/node.csv` (or of its columnar directory `author/node`):
+    - Both lists of all authors as flat int32 arrays plus offsets, keyed by column name.
+    - The co-authors of author `id` are `lists["co_authors"].row(id - 1)`, the IDs being dense from 1.
+    - Use `CSRIndex.to_arrow()` for Arrow list arrays, which requires `pyarrow`.
+    """
+    return _load_lists(path, AUTHOR_NODE_DTYPES, ["co_authors", "papers"])
+
+
+@timer
+def load_author_edge(
+    path: str,
+    columns: Optional[List[str]] = None,
+    filters: Optional[Filters] = None,
+) -> pd.DataFrame:
+    df = _read_table(path, AUTHOR_EDGE_DTYPES, columns, filters)
 
     _load_logger(df, path)
 
     return df
 
 
+def _iter_rows(
+    path: Path,
+    dtypes: Dict[str, str],
+    batch_size: int,
+    columns: Optional[List[str]],
+    filters: Optional[Filters],
+) -> Iterator[pd.DataFrame]:
+    filter_dtypes = {column: dtypes[column] for column, _, _ in filters or []}
+    if columns is not None:
+        dtypes = {column: dtypes[column] for column in columns}
+    return _iter_table(path, dtypes, batch_size, filters, filter_dtypes)
+
+
+def iter_paper_node(
+    path: Path,
+    batch_size: int = CHUNK_ROWS,
+    fillna: bool = True,
+    skip_isolate: bool = False,
+    lists: bool = True,
+    columns: Optional[List[str]] = None,
+    filters: Optional[Filters] = None,
+) -> Iterator[pd.DataFrame]:
+    """
+    Iterate over `paper/node.csv` (or its columnar directory `paper/node`) `batch_size` rows at a time,
+    each batch being typed and shaped like `load_paper_node` with the same arguments. Only one batch is in
+    memory at a time, and the rows failing `filters` are dropped from their batch.
+    """
+    columns, filters = _paper_node_query(skip_isolate, lists, columns, filters)
+    for batch in _iter_rows(path, PAPER_NODE_DTYPES, batch_size, columns, filters):
+        yield _paper_node_frame(batch, fillna, skip_isolate)
+
+
+def iter_paper_edge(
+    path: Path,
+    batch_size: int = CHUNK_ROWS,
+    columns: Optional[List[str]] = None,
+    filters: Optional[Filters] = None,
+) -> Iterator[pd.DataFrame]:
+    """
+    Iterate over `paper/edge.csv` (or its columnar directory `paper/edge`) `batch_size` rows at a time,
+    see `iter_paper_node`.
+    """
+    return _iter_rows(path, PAPER_EDGE_DTYPES, batch_size, columns, filters)
+
+
+def iter_author_node(
+    path: Path,
+    batch_size: int = CHUNK_ROWS,
+    fillna: bool = True,
+    lists: bool = True,
+    columns: Optional[List[str]] = None,
+    filters: Optional[Filters] = None,
+) -> Iterator[pd.DataFrame]:
+    """
+    Iterate over `author/node.csv` (or its columnar directory `author/node`) `batch_size` rows at a time,
+    each batch being typed and shaped like `load_author_node` with the same arguments, see `iter_paper_node`.
+    """
+    skip = () if lists else ("co_authors", "papers")
+    columns = _project(AUTHOR_NODE_DTYPES, columns, skip)
+    for batch in _iter_rows(path, AUTHOR_NODE_DTYPES, batch_size, columns, filters):
+        yield _author_node_frame(batch, fillna)
+
+
+def iter_author_edge(
+    path: Path,
+    batch_size: int = CHUNK_ROWS,
+    columns: Optional[List[str]] = None,
+    filters: Optional[Filters] = None,
+) -> Iterator[pd.DataFrame]:
+    """
+    Iterate over `author/edge.csv` (or its columnar directory `author/edge`) `batch_size` rows at a time,
+    see `iter_paper_node`.
+    """
+    return _iter_rows(path, AUTHOR_EDGE_DTYPES, batch_size, columns, filters)
+
+
+def load_citations(path: Path) -> CitationStore:
+    """
+    For the `author/citation` directory, the sparse author x year citation matrix:
+    - The store is lazy, the matrix is only memory-mapped at the first query.
+    - `yearly(author)` gives the citations per year like the former `citation.json` entries.
+    """
+    return CitationStore(path)
+
+
+def load_titles(path: Path) -> TitleStore:
+    """
+    For the `paper/title` directory, the 'id: title' store:
+    - The store is lazy, the titles are memory-mapped at the first lookup and only the requested ones are decoded.
+    - Use `lookup(ids)` for a batch of IDs, or `get(id)` / `[id]` for a single one.
+    """
+    return TitleStore(path)
+
+
 @timer
 def load_map_dict(path: Path) -> dict:
     try:
@@ -1,27 +1,53 @@
 import os
 import logging
+import shutil
 from logging.handlers import RotatingFileHandler
 from pathlib import Path
 from datetime import datetime
 
-# Set up directory for logs
+# Directory for logs, created along with the log file on the first record
 LOG_DIR = Path("logs")
-LOG_DIR.mkdir(exist_ok=True)
 
 MAX_LOG_FILES = 20
 
 
 def _delete_old_logs():
     """
-    Deletes the oldest half of the log files if the number of log files exceeds MAX_LOG_FILES.
+    Deletes the oldest half of the log files if the number of log files exceeds MAX_LOG_FILES,
+    and likewise for the run reports and the profile directories of `utils.wrapper`.
     """
-    log_files = sorted(LOG_DIR.glob("*.log"), key=os.path.getmtime)
+    for pattern in ("*.log", "*.jsonl"):
+        log_files = sorted(LOG_DIR.glob(pattern), key=os.path.getmtime)
+
+        # Check if the number of log files exceeds the limit
+        if len(log_files) > MAX_LOG_FILES:
+            files_to_delete = log_files[: len(log_files) // 2]
+            for file in files_to_delete:
+                file.unlink(missing_ok=True)
+
+    # The profiles of a run are saved in a directory named after it
+    log_dirs = sorted(
+        (p for p in LOG_DIR.iterdir() if p.is_dir()), key=os.path.getmtime
+    )
+    if len(log_dirs) > MAX_LOG_FILES:
+        for directory in log_dirs[: len(log_dirs) // 2]:
+            shutil.rmtree(directory, ignore_errors=True)
+
 
-    # Check if the number of log files exceeds the limit
-    if len(log_files) > MAX_LOG_FILES:
-        files_to_delete = log_files[: len(log_files) // 2]
-        for file in files_to_delete:
-            file.unlink()
+class _LazyFileHandler(RotatingFileHandler):
+    """
+    Rotating file handler which only creates `LOG_DIR`, deletes the old logs and opens its file
+    when the first record is emitted, so that importing the logger touches no file.
+    """
+
+    def __init__(self, filename: Path, **kwargs):
+        super().__init__(filename, delay=True, **kwargs)
+
+    def _open(self):
+        LOG_DIR.mkdir(exist_ok=True)
+        # Delete old logs if there are more than `MAX_LOG_FILES` log files
+        _delete_old_logs()
+        return super()._open()
 
 
 def _setup_logger(name: str, level: int = logging.INFO):
@@ -38,17 +64,14 @@ def _setup_logger(name: str, level: int = logging.INFO):
     # Full path to log file
     log_file_path = LOG_DIR / log_filename
 
-    # Delete old logs if there are more than `MAX_LOG_FILES` log files
-    _delete_old_logs()
-
     # Formatter
     formatter = logging.Formatter(
         "%(asctime)s - %(name)s - %(levelname)s - %(message)s",
         datefmt="%Y-%m-%d %H:%M:%S",
     )
 
-    # File handler with rotation
-    file_handler = RotatingFileHandler(
+    # File handler with rotation, opened on the first record
+    file_handler = _LazyFileHandler(
         log_file_path, maxBytes=5 * 1024 * 1024, backupCount=5
     )
     file_handler.setFormatter(formatter)
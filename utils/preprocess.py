@@ -1,312 +1,710 @@
 import gc
+import os
 import json
+import shutil
+import tempfile
+import numpy as np
 import pandas as pd
+import scipy.sparse as sp
 from tqdm import tqdm
-from typing import Final, List
-from itertools import chain, combinations
-from collections import defaultdict
+from typing import (
+    Any,
+    Dict,
+    Final,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+)
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from .citation import save_citations
+from .columnar import append_columnar, load_columnar, save_columnar, saves_columnar
+from .csr import CSRIndex, save_csr
+from .disambiguation import disambiguate_names
+from .loader import (
+    PAPER_NODE_DTYPES,
+    PAPER_EDGE_DTYPES,
+    PAPER_INDEX_DTYPES,
+    AUTHOR_NODE_DTYPES,
+    AUTHOR_EDGE_DTYPES,
+)
 from .logger import logger
+from .readers import get_reader, iter_file_records
+from .titles import append_titles, save_titles
 from .wrapper import timer
 
+# Column dtypes of the parsed records, every batch is cast to them before concatenation
+RECORD_DTYPES: Final = {
+    "id": "string",
+    "title": "string",
+    "authors": "string",
+    "year": "Int16",
+    "venue": "string",
+    "references": "string",
+}
+BATCH_SIZE: Final = 100_000
+# Number of author rows built at a time by the low-memory path of `_save_author_chunk`
+AUTHOR_CHUNK_SIZE: Final = 200_000
+# Estimated memory in GiB of a parse process: the interpreter, pandas and one batch of records,
+# the parsed batches being spooled to disk
+PARSE_WORKER_MEMORY: Final = 0.5
+# Files smaller than this are parsed in the main process
+MIN_SHARD_SIZE: Final = 64 * 1024**2
+
+
+def _flush_buffer(buffer: Dict[str, List[Any]]) -> pd.DataFrame:
+    """
+    Convert the column buffer into a typed DataFrame batch and empty the buffer.
+    """
+    batch = pd.DataFrame(buffer).astype(RECORD_DTYPES)
+    for values in buffer.values():
+        values.clear()
+    return batch
+
 
-def _group_records(lines: List[str]) -> List[List[str]]:
+def _iter_batches(
+    records: Iterable[Dict[str, Any]], batch_size: int = BATCH_SIZE
+) -> Iterator[pd.DataFrame]:
     """
-    Groups lines into records, ensuring each group corresponds to a complete paper object.
+    Feed records into per-column buffers, yielding a typed DataFrame every `batch_size` records.
     """
-    records = []
-    current_record = []
+    buffer = {column: [] for column in RECORD_DTYPES}
 
-    for line in tqdm(lines, desc="Grouping records..."):
-        if line.strip() == "":
-            continue
-        if line.startswith("#*") and current_record:
-            # Start of a new record, save the current one
-            records.append(current_record)
-            current_record = []
-        current_record.append(line)
+    for record in records:
+        for column, values in buffer.items():
+            values.append(record[column])
+        if len(buffer["id"]) >= batch_size:
+            yield _flush_buffer(buffer)
 
-    # Add the last record
-    if current_record:
-        records.append(current_record)
+    if buffer["id"]:
+        yield _flush_buffer(buffer)
 
-    del current_record
-    gc.collect()
 
-    return records
-
-
-def _process_records_to_dataframe(records: List[List[str]]) -> pd.DataFrame:
-    """
-    Process records to extract paper objects and convert them to a DataFrame.
-    """
-    data = []
-    with tqdm(total=len(records), desc="Creating dataframes...") as pbar:
-        for record in records:
-            vertex_dict = {}
-            for line in record:
-                line = line.strip()
-                if line.startswith("#*"):
-                    vertex_dict["title"] = line[2:]
-                elif line.startswith("#@"):
-                    vertex_dict["authors"] = line[2:]
-                elif line.startswith("#t"):
-                    vertex_dict["year"] = int(line[2:]) if line[2:] else ""
-                elif line.startswith("#c"):
-                    vertex_dict["venue"] = line[2:]
-                elif line.startswith("#index"):
-                    vertex_dict["index"] = line[6:]
-                elif line.startswith("#%"):
-                    if "references" not in vertex_dict:
-                        vertex_dict["references"] = []
-                    vertex_dict["references"].append(line[2:])
-
-            # Handle missing fields
-            for str_name in ["title", "year", "venue", "authors"]:
-                if str_name not in vertex_dict:
-                    vertex_dict[str_name] = ""
-            for lst_name in ["references"]:
-                if lst_name not in vertex_dict:
-                    vertex_dict[lst_name] = []
-
-            # Append to data
-            data.append(
-                {
-                    "id": vertex_dict["index"],
-                    "title": vertex_dict["title"],
-                    "authors": vertex_dict["authors"].replace(", ", "#"),
-                    "year": vertex_dict["year"],
-                    "venue": vertex_dict["venue"],
-                    "references": "#".join(vertex_dict["references"]),
-                }
-            )
+def _concat_batches(batches: List[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Concatenate typed batches in order, returning an empty typed DataFrame if there is none.
+
+    The batches are consumed one column at a time, each column being dropped from the batches once
+    concatenated, so the peak is the DataFrame plus one of its columns instead of twice its size.
+    The list is emptied.
+    """
+    if not batches:
+        return pd.DataFrame(columns=list(RECORD_DTYPES)).astype(RECORD_DTYPES)
+    columns = {}
+    for column in RECORD_DTYPES:
+        columns[column] = pd.concat(
+            [batch.pop(column) for batch in batches], ignore_index=True
+        )
+    batches.clear()
+    return pd.DataFrame(columns, copy=False)
+
+
+def _find_shard_offsets(
+    data_path: Path, num_shards: int, record_start: bytes = b"#*"
+) -> List[Tuple[int, int]]:
+    """
+    Split the file into `num_shards` byte ranges, each starting at a line beginning with
+    `record_start` so that no record is cut in two. Empty ranges are dropped.
+    """
+    size = os.path.getsize(data_path)
+    bounds = [0]
 
-            pbar.update(1)
+    with open(data_path, "rb") as f:
+        for shard in range(1, num_shards):
+            f.seek(max(size * shard // num_shards, bounds[-1]))
+            # Skip the (possibly partial) line under the cursor
+            f.readline()
+            while True:
+                offset = f.tell()
+                line = f.readline()
+                if not line or line.startswith(record_start):
+                    break
+            bounds.append(offset)
 
-    return pd.DataFrame(data)
+    bounds.append(size)
 
+    return [(start, end) for start, end in zip(bounds, bounds[1:]) if end > start]
 
-def _get_dataframe(data_path: Path) -> pd.DataFrame:
+
+def _parse_shard(
+    data_path: Path,
+    start: int,
+    end: int,
+    spool: Path,
+    batch_size: int = BATCH_SIZE,
+    data_format: str = "auto",
+) -> List[Path]:
     """
-    Get dataframe from the dataset in given `data_path`.
+    Parse the records within a byte range of the dataset, executed in a worker process.
+    Every typed batch is saved under `spool` as a columnar table once parsed, so the worker only
+    holds one batch at a time. Return the paths of the batches in order.
     """
-    with open(data_path, "r", encoding="utf-8") as f:
-        lines = f.readlines()
-    # Group lines into records
-    records = _group_records(lines)
+    records = iter_file_records(data_path, data_format, start, end)
+    paths = []
+    for batch in _iter_batches(records, batch_size):
+        paths.append(spool / f"{len(paths):06d}")
+        save_columnar(batch, paths[-1])
+    return paths
+
 
-    # Process all records into a single DataFrame
-    combined_data = _process_records_to_dataframe(records)
+def _iter_dataframes(
+    data_path: Path,
+    batch_size: int = BATCH_SIZE,
+    num_workers: Optional[int] = None,
+    data_format: str = "auto",
+    spool_dir: Optional[Path] = None,
+) -> Iterator[pd.DataFrame]:
+    """
+    Stream the dataset in given `data_path` as typed batches of at most `batch_size` records,
+    in the order of the file.
 
-    del lines
-    del records
+    The file is streamed record by record with the reader of `data_format` (see `utils.readers`),
+    and only one batch of raw records is buffered as Python objects at a time.
+
+    Files larger than `MIN_SHARD_SIZE` are split into byte ranges aligned to the start of records
+    and parsed by `num_workers` processes, unless the format can only be read sequentially.
+    The workers save their batches to a temporary directory in `spool_dir` (see `_parse_shard`),
+    which are read back and deleted in file order as soon as their shard is parsed, so every process
+    holds one batch at a time, and the batches add up to exactly the serial ones.
+    """
+    reader = get_reader(data_path, data_format)
+    num_workers = num_workers or os.cpu_count() or 1
+    num_shards = min(num_workers, os.path.getsize(data_path) // MIN_SHARD_SIZE)
+    if reader.record_start is None:
+        num_shards = 1
+
+    if num_shards <= 1:
+        records = tqdm(
+            iter_file_records(data_path, data_format),
+            desc="Parsing records...",
+            unit=" papers",
+        )
+        yield from _iter_batches(records, batch_size)
+        return
+
+    shards = _find_shard_offsets(data_path, num_shards, reader.record_start)
+    logger.info(f"Parsing {len(shards)} shards with {num_workers} processes...")
+    with tempfile.TemporaryDirectory(
+        prefix=".parse-", dir=spool_dir
+    ) as spool, ProcessPoolExecutor(max_workers=num_workers) as executor:
+        futures = [
+            executor.submit(
+                _parse_shard,
+                data_path,
+                start,
+                end,
+                Path(spool) / f"{shard:04d}",
+                batch_size,
+                data_format,
+            )
+            for shard, (start, end) in enumerate(shards)
+        ]
+        for future in tqdm(futures, desc="Parsing shards..."):
+            for path in future.result():
+                # Copy the memory-mapped columns before the batch is deleted
+                batch = load_columnar(path).copy()
+                shutil.rmtree(path)
+                yield batch
+
+
+def _get_dataframe(
+    data_path: Path,
+    batch_size: int = BATCH_SIZE,
+    num_workers: Optional[int] = None,
+    data_format: str = "auto",
+) -> pd.DataFrame:
+    """
+    Get dataframe from the dataset in given `data_path`, see `_iter_dataframes`.
+
+    The typed batches are concatenated column by column (see `_concat_batches`), so the peak memory
+    grows with the dataset: the typed DataFrame, plus one of its columns. It is meant for the
+    snapshots of the incremental ingestion, `save_records_to_csv` streams the batches instead.
+    """
+    batches = list(_iter_dataframes(data_path, batch_size, num_workers, data_format))
+    combined_data = _concat_batches(batches)
     gc.collect()
 
     return combined_data
 
 
-@timer
-def _save_author_chunk(df: pd.DataFrame, author_node: Path, author_edge: Path):
-    logger.info("Start saving information of the authors...")
-    author_node.parent.mkdir(parents=True, exist_ok=True)
+def _save_table(df: pd.DataFrame, path: Path, dtypes: Dict[str, str]) -> None:
+    """
+    Save a table as a csv file, or as a columnar directory if `path` has no suffix.
+    The columnar tables are cast to the loader `dtypes` first, so they are memory-mapped as is.
+    """
+    if saves_columnar(path):
+        save_columnar(df.astype(dtypes), path)
+    else:
+        df.to_csv(path, index=False)
+
+
+def _append_table(
+    df: pd.DataFrame, path: Path, dtypes: Dict[str, str], append: bool
+) -> None:
+    """
+    Save a table like `_save_table`, or append its rows to the table saved so far if `append`.
+    """
+    if not append:
+        _save_table(df, path, dtypes)
+    elif saves_columnar(path):
+        append_columnar(df.astype(dtypes), path)
+    else:
+        df.to_csv(path, index=False, mode="a", header=False)
+
+
+def _save_table_chunks(
+    chunks: Iterable[pd.DataFrame], path: Path, dtypes: Dict[str, str]
+) -> None:
+    """
+    Save a table given as consecutive row chunks, like `_save_table` with their concatenation.
+    The chunks are appended one at a time, see `_append_table`, so only one chunk is in memory.
+    """
+    for i, chunk in enumerate(chunks):
+        _append_table(chunk, path, dtypes, append=i > 0)
+
 
-    # Assign unique IDs to authors
-    df["authors"] = df["authors"].str.split("#")
-    authors = set(chain.from_iterable(df["authors"]))
-    author_to_id = {
-        author: idx
-        for idx, author in tqdm(
-            enumerate(sorted(authors), start=1),
-            desc="Building author index...",
-            total=len(authors),
+def _resolve_references(
+    references: pd.Series, index: pd.Series, ids: pd.Series
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Resolve the `#`-joined original references of each paper to interned IDs, where `index` and `ids`
+    are the aligned original indices and IDs of the known papers. References to papers outside of
+    them are dropped.
+
+    Return a CSR index `(indptr, indices)`, the references of the i-th paper being
+    `indices[indptr[i]:indptr[i + 1]]`.
+    """
+    exploded = references.reset_index(drop=True).str.split("#").explode()
+    exploded = exploded[exploded.notna() & (exploded != "")]
+    codes = pd.Index(index).get_indexer(exploded)
+    dangling = codes < 0
+    if dangling.any():
+        logger.warning(
+            f"Drop {dangling.sum()} references to papers outside of the dataset."
         )
-    }
-    id_to_author = {v: k for k, v in author_to_id.items()}
-    df["authors"] = df["authors"].apply(
-        lambda x: [author_to_id[author] for author in x]
+
+    rows = exploded.index.to_numpy()[~dangling]
+    indices = ids.to_numpy()[codes[~dangling]].astype(np.int32)
+    indptr = np.zeros(len(references) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=len(references)), out=indptr[1:])
+
+    return indptr, indices
+
+
+class _Records(NamedTuple):
+    """
+    The papers of the dataset as kept by `save_records_to_csv`, the paper at position `i` having
+    the dense ID `i + 1`:
+    - `authors`: the codes of the author names of each paper in `author_names`, in the listed
+      order, a paper without authors listing the empty name.
+    - `year`: the year of each paper, missing if unknown.
+    - `venues`: the code of the venue of each paper in `venue_names`, the empty name if unknown.
+    - `references`: the dense IDs of the references of each paper, the ones to papers outside of
+      the dataset being dropped.
+    The names are in the order of their first appearance.
+    """
+
+    authors: CSRIndex
+    author_names: np.ndarray
+    year: pd.Series
+    venues: np.ndarray
+    venue_names: np.ndarray
+    references: CSRIndex
+
+
+def _intern(values: pd.Series, codes: Dict[str, int]) -> np.ndarray:
+    """
+    The codes of `values` in `codes`, the new values getting the next codes in order of appearance.
+    """
+    value_codes, uniques = pd.factorize(values)
+    mapping = np.fromiter(
+        (codes.setdefault(value, len(codes)) for value in uniques),
+        dtype=np.int32,
+        count=len(uniques),
     )
+    return mapping[value_codes]
 
-    # Create a co-author mapping and paper list for each author
-    lists = {
-        author_id: {"co-authors": set(), "papers": set()}
-        for author_id in author_to_id.values()
-    }
-    # Edge dictionary to store weights
-    edges = defaultdict(int)
 
-    for authors, paper_id in tqdm(
-        zip(df["authors"], df["id"]), desc="Creating author infos...", total=len(df)
-    ):
-        for author_id in authors:
-            lists[author_id]["papers"].add(paper_id)
-            lists[author_id]["co-authors"].update(set(authors) - {author_id})
-
-        for author1, author2 in combinations(authors, 2):
-            edge = tuple(sorted((author1, author2)))
-            edges[edge] += 1
-
-    # Convert author info to a DataFrame
-    authors_list = []
-    for author_id, data in tqdm(
-        lists.items(), desc="Converting infos to dataframe...", total=len(lists.items())
+def _to_csr(counts: List[np.ndarray], values: List[np.ndarray]) -> CSRIndex:
+    """
+    Concatenate the per-batch row lengths and values into a CSR index.
+    """
+    counts = np.concatenate(counts) if counts else np.zeros(0, dtype=np.int64)
+    indptr = np.zeros(len(counts) + 1, dtype=np.int64)
+    np.cumsum(counts, out=indptr[1:])
+    values = np.concatenate(values) if values else np.zeros(0, dtype=np.int32)
+    return CSRIndex(indptr, values)
+
+
+@timer
+def _stream_records(
+    data_path: Path,
+    paper_index: Path,
+    paper_map: Path,
+    batch_size: int = BATCH_SIZE,
+    num_workers: Optional[int] = None,
+    data_format: str = "auto",
+) -> _Records:
+    """
+    Stream the typed batches of the dataset (see `_iter_dataframes`) and intern the papers into
+    dense int32 IDs starting from 1 in the order of the dataset.
+
+    The table of 'id: original index' and the titles are saved to `paper_index` and `paper_map`
+    batch by batch, and the rest of each batch is interned into the codes of `_Records`. Only the
+    distinct original indices, author names and venues are kept as strings, so the memory does not
+    grow with the titles nor with the `#`-joined lists, and no DataFrame of all papers is built.
+    """
+    logger.info("Start building the index of paper...")
+    paper_index.parent.mkdir(parents=True, exist_ok=True)
+    save_titles([], paper_map)
+
+    index_codes: Dict[str, int] = {}
+    author_codes: Dict[str, int] = {}
+    venue_codes: Dict[str, int] = {}
+    papers, years, venues = [], [], []
+    author_counts, authors, reference_counts, references = [], [], [], []
+    num_papers = 0
+    for batch in _iter_dataframes(
+        data_path, batch_size, num_workers, data_format, paper_index.parent
     ):
-        co_authors_list = list(map(str, sorted(data["co-authors"])))
-        authors_list.append(
-            {
-                "id": author_id,
-                "name": id_to_author[author_id],
-                "co_authors": "#".join(co_authors_list),
-                "papers": "#".join(data["papers"]),
-                "num_co_authors": len(co_authors_list),
-                "num_papers": len(data["papers"]),
-            }
+        batch = batch.reset_index(drop=True)
+        ids = np.arange(num_papers + 1, num_papers + len(batch) + 1, dtype=np.int32)
+        _append_table(
+            pd.DataFrame({"id": ids, "index": batch["id"]}),
+            paper_index,
+            PAPER_INDEX_DTYPES,
+            append=num_papers > 0,
         )
+        append_titles(batch["title"], paper_map)
+        num_papers += len(batch)
 
-    # Save the author lists
-    authors_df = pd.DataFrame(authors_list)
-    authors_df.to_csv(author_node, index=False)
+        papers.append(_intern(batch["id"], index_codes))
+        years.append(batch["year"])
+        venues.append(_intern(batch["venue"].fillna(""), venue_codes))
 
-    # Save the author edges
-    edges_list = [
-        {"src": source, "dst": target, "w": weight}
-        for (source, target), weight in edges.items()
+        names = batch["authors"].fillna("").str.split("#")
+        author_counts.append(names.str.len().to_numpy(dtype=np.int64))
+        authors.append(_intern(names.explode(), author_codes))
+
+        cited = batch["references"].str.split("#").explode()
+        cited = cited[cited.notna() & (cited != "")]
+        reference_counts.append(
+            np.bincount(cited.index.to_numpy(), minlength=len(batch))
+        )
+        references.append(_intern(cited, index_codes))
+
+    if num_papers == 0:
+        _save_table(
+            pd.DataFrame(columns=list(PAPER_INDEX_DTYPES)).astype(PAPER_INDEX_DTYPES),
+            paper_index,
+            PAPER_INDEX_DTYPES,
+        )
+    logger.info(f"Successfully save the mapping of 'id: index' to {paper_index}!")
+
+    # Resolve the references to the interned IDs, 0 being a paper outside of the dataset
+    paper_ids = np.zeros(len(index_codes), dtype=np.int32)
+    if papers:
+        paper_ids[np.concatenate(papers)] = np.arange(1, num_papers + 1, dtype=np.int32)
+    del index_codes, papers
+    references = _to_csr(reference_counts, [paper_ids[codes] for codes in references])
+    rows, cited = references.explode()
+    dangling = cited == 0
+    if dangling.any():
+        logger.warning(
+            f"Drop {dangling.sum()} references to papers outside of the dataset."
+        )
+    indptr = np.zeros(num_papers + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows[~dangling], minlength=num_papers), out=indptr[1:])
+
+    return _Records(
+        authors=_to_csr(author_counts, authors),
+        author_names=np.array(list(author_codes), dtype=object),
+        year=(
+            pd.concat(years, ignore_index=True)
+            if years
+            else pd.Series([], dtype=RECORD_DTYPES["year"])
+        ),
+        venues=np.concatenate(venues) if venues else np.zeros(0, dtype=np.int32),
+        venue_names=np.array(list(venue_codes), dtype=object),
+        references=CSRIndex(indptr, cited[~dangling]),
+    )
+
+
+def _disambiguate(records: _Records) -> Dict[str, str]:
+    """
+    The aliases of the name variants of the same author, see `utils.disambiguation`.
+    """
+    # The codes of the non-empty names, which keep their order of first appearance
+    names = records.author_names
+    nonempty = names != ""
+    codes = np.cumsum(nonempty) - 1
+    papers, occurrences = records.authors.explode()
+    known = nonempty[occurrences]
+
+    venues = records.venues.copy()
+    venues[(records.venue_names == "")[venues]] = -1
+
+    return disambiguate_names(
+        pd.Index(names[nonempty]),
+        codes[occurrences[known]],
+        papers[known],
+        venues,
+        len(records.venue_names),
+    )
+
+
+def _rename_authors(
+    authors: CSRIndex, names: np.ndarray, aliases: Dict[str, str]
+) -> CSRIndex:
+    """
+    Rename the author codes of each paper with the 'name: canonical name' `aliases`, keeping the
+    first occurrence of an author listed twice after the renaming, like `apply_author_mapping`.
+    """
+    if not aliases:
+        return authors
+
+    index = pd.Index(names)
+    rename = np.arange(len(names), dtype=np.int32)
+    rename[index.get_indexer(list(aliases))] = index.get_indexer(list(aliases.values()))
+    rows, codes = authors.explode()
+    codes = rename[codes]
+    first = ~pd.DataFrame({"row": rows, "code": codes}).duplicated().to_numpy()
+
+    indptr = np.zeros(authors.num_rows + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows[first], minlength=authors.num_rows), out=indptr[1:])
+    return CSRIndex(indptr, codes[first])
+
+
+def _sort_authors(authors: CSRIndex, names: np.ndarray) -> Tuple[CSRIndex, np.ndarray]:
+    """
+    Assign dense IDs from 1 to the authors listed by the papers, sorted by name.
+    Return the author IDs of each paper and the names of the IDs.
+    """
+    listed = np.unique(authors.indices)
+    order = listed[np.argsort(names[listed], kind="stable")]
+    ids = np.zeros(len(names), dtype=np.int32)
+    ids[order] = np.arange(1, len(order) + 1, dtype=np.int32)
+    return CSRIndex(authors.indptr, ids[authors.indices]), names[order]
+
+
+def _join_rows(indptr: np.ndarray, values: np.ndarray, desc: str) -> List[str]:
+    """
+    Join the values of every CSR row with `#`.
+    """
+    values = values.astype(str)
+    return [
+        "#".join(values[start:end])
+        for start, end in tqdm(
+            zip(indptr[:-1], indptr[1:]), desc=desc, total=len(indptr) - 1
+        )
     ]
-    edges_df = pd.DataFrame(edges_list)
-    edges_df.to_csv(author_edge, index=False)
+
+
+def _join_chunk(indptr: np.ndarray, values: np.ndarray, desc: str) -> List[str]:
+    """
+    Join the values of the CSR rows of a chunk, `indptr` being the slice of the chunk.
+    """
+    return _join_rows(indptr - indptr[0], values[indptr[0] : indptr[-1]], desc)
+
+
+@timer
+def _save_author_chunk(
+    authors: CSRIndex,
+    names: np.ndarray,
+    author_node: Path,
+    author_edge: Path,
+    max_authors_per_paper: Optional[int] = None,
+    chunk_size: Optional[int] = None,
+):
+    """
+    Save the author node and edge tables, given the author IDs of each paper and the names of the
+    IDs, see `_sort_authors`. The rows of the author nodes, with their `#`-joined co-authors and
+    papers, are built `chunk_size` authors at a time if set instead of all at once.
+    """
+    logger.info("Start saving information of the authors...")
+    author_node.parent.mkdir(parents=True, exist_ok=True)
+    num_authors, num_papers = len(names), authors.num_rows
+
+    # Build the sparse author x paper incidence matrix
+    papers, ids = authors.explode()
+    incidence = sp.csr_matrix(
+        (np.ones(len(ids), dtype=np.int32), (ids - 1, papers)),
+        shape=(num_authors, num_papers),
+    )
+    incidence.sum_duplicates()
+    incidence.data[:] = 1
+
+    # Hyper-authored papers would add a clique of co-author edges, leave them out
+    coauthorship = incidence
+    if max_authors_per_paper is not None:
+        hyper = np.asarray(incidence.sum(axis=0)).ravel() > max_authors_per_paper
+        logger.info(
+            f"Skip co-author edges of {hyper.sum()} papers with more than {max_authors_per_paper} authors."
+        )
+        coauthorship = incidence[:, ~hyper]
+
+    # Co-author weights are the number of shared papers, without the diagonal
+    co_authors = (coauthorship @ coauthorship.T).tocsr()
+    co_authors.setdiag(0)
+    co_authors.eliminate_zeros()
+    co_authors.sort_indices()
+
+    # Convert author info to DataFrame chunks, the joined lists being the largest part
+    co_author_ids = co_authors.indices + 1
+    paper_ids = incidence.indices + 1
+    chunk_size = chunk_size or max(num_authors, 1)
+
+    def author_chunks() -> Iterator[pd.DataFrame]:
+        for start in range(0, max(num_authors, 1), chunk_size):
+            end = min(start + chunk_size, num_authors)
+            co_author_ptr = co_authors.indptr[start : end + 1]
+            paper_ptr = incidence.indptr[start : end + 1]
+            yield pd.DataFrame(
+                {
+                    "id": np.arange(start + 1, end + 1, dtype=np.int32),
+                    "name": names[start:end],
+                    "co_authors": _join_chunk(
+                        co_author_ptr, co_author_ids, "Joining co-authors..."
+                    ),
+                    "papers": _join_chunk(paper_ptr, paper_ids, "Joining papers..."),
+                    "num_co_authors": np.diff(co_author_ptr),
+                    "num_papers": np.diff(paper_ptr),
+                }
+            )
+
+    # Save the author lists
+    _save_table_chunks(author_chunks(), author_node, AUTHOR_NODE_DTYPES)
+
+    # Save the author edges, each pair once with `src < dst`
+    edges = sp.triu(co_authors, k=1).tocoo()
+    edges_df = pd.DataFrame(
+        {"src": edges.row + 1, "dst": edges.col + 1, "w": edges.data}
+    ).sort_values(["src", "dst"], ignore_index=True)
+    _save_table(edges_df, author_edge, AUTHOR_EDGE_DTYPES)
 
     logger.info(
-        f"There are total {len(authors_df)} nodes and {len(edges_df)} edges in \033[34mauthors\033[0m."
+        f"There are total {num_authors} nodes and {len(edges_df)} edges in \033[34mauthors\033[0m."
     )
     logger.info(
         f"Successfully save the information of authors to {author_node} and {author_edge}!"
     )
 
+    del incidence
+    del co_authors
     del edges_df
-    del edges_list
     gc.collect()
 
 
 @timer
-def _build_venue_index(df: pd.DataFrame, venue_map: Path):
+def _build_venue_index(
+    venues: np.ndarray, names: np.ndarray, venue_map: Path
+) -> np.ndarray:
+    """
+    Assign IDs from 1 to the venues sorted by name, given the venue codes of the papers and the
+    names of the codes. Return the venue ID of each paper.
+    """
     logger.info("Start building the index of venue...")
     venue_map.parent.mkdir(parents=True, exist_ok=True)
 
-    venues = set(df["venue"].unique())
-    venue_to_id = {venue: idx for idx, venue in enumerate(sorted(venues), start=1)}
-    id_to_venue = {v: k for k, v in venue_to_id.items()}
-    df["venue"] = df["venue"].map(venue_to_id)
+    order = np.argsort(names, kind="stable")
+    ids = np.zeros(len(names), dtype=np.int64)
+    ids[order] = np.arange(1, len(names) + 1)
+    id_to_venue = dict(enumerate(names[order].tolist(), start=1))
 
     with open(venue_map, "w") as f:
         json.dump(id_to_venue, f, indent=4)
 
     logger.info(f"Successfully save the mapping of 'id: venue' to {venue_map}!")
 
+    return ids[venues]
+
 
 @timer
 def _save_paper_chunk(
-    df: pd.DataFrame,
-    paper_map: Path,
+    authors: CSRIndex,
+    year: pd.Series,
+    venues: np.ndarray,
+    references: CSRIndex,
     citation: Path,
     paper_node: Path,
     paper_edge: Path,
+    paper_refs: Path,
+    batch_size: int = BATCH_SIZE,
 ):
+    """
+    Save the paper node and edge tables, the references and the yearly citations of the authors,
+    given the author IDs, year, venue ID and references of each paper. The rows of the paper
+    nodes, with their `#`-joined authors, are built `batch_size` papers at a time.
+    """
     logger.info("Start saving information of the papers...")
     paper_node.parent.mkdir(parents=True, exist_ok=True)
+    num_papers = references.num_rows
+    ids = np.arange(1, num_papers + 1, dtype=np.int32)
 
-    # Split the references
-    df["ref_list"] = df["references"].str.split("#")
-    df["ref_list"] = df["ref_list"].apply(
-        lambda x: x if isinstance(x, list) and x != [""] else []
-    )
-
-    # Out degree, number of references
-    df["out_d"] = df["ref_list"].apply(len)
-
-    # Save the mapping of id: (title, start, end)
-    start = 1
-
-    def calculate_range(row):
-        nonlocal start
-        row_start = start
-        row_end = start + row["out_d"]
-        start = row_end
-        return {"title": row["title"], "start": row_start, "end": row_end}
-
-    tqdm.pandas(desc="Building paper mapping...", total=len(df))
-    df["paper_mapping"] = df.progress_apply(calculate_range, axis=1)
-
-    # Extract title and store start/end in original df
-    df["title"] = df["paper_mapping"].apply(lambda x: x["title"])
-    df["start"] = df["paper_mapping"].apply(lambda x: x["start"])
-    df["end"] = df["paper_mapping"].apply(lambda x: x["end"])
-
-    # Save the mapping of id: title
-    map_dict = df.set_index("id")["title"].to_dict()
+    # Out degree, number of references, and the 1-based range of them in the edge list
+    indptr, indices, _ = references
+    out_d = np.diff(indptr)
 
-    # Save the mapping to JSON file
-    with open(paper_map, "w") as f:
-        json.dump(map_dict, f, indent=4)
+    # Save the CSR index of references, `start - 1:end - 1` of a paper in `indices`
+    save_csr(paper_refs, indptr, indices)
 
-    # In degree, number of being citated
-    in_degree = defaultdict(int)
-    edge_list = []
+    # In degree, number of being citated, the IDs are dense from 1
+    in_d = np.bincount(indices, minlength=num_papers + 1)[1:]
 
-    for ref_list, paper_id in tqdm(
-        zip(df["ref_list"], df["id"]),
-        desc="Computing paper citations...",
-        total=len(df),
-    ):
-        for reference in ref_list:
-            edge_list.append((paper_id, reference))
-            in_degree[reference] += 1
-
-    df["in_d"] = df["id"].map(in_degree).fillna(0).astype(int)
-
-    # Save the yearly citation for each author
-    author_year_citation = (
-        df[df["in_d"] != 0][["authors", "year", "in_d"]]
-        .explode("authors")
-        .groupby(["authors", "year"], sort=False)
-        .agg(total_citations=("in_d", "sum"))
-        .reset_index()
+    # Save the yearly citation for each author as a sparse author x year matrix
+    papers, author_ids = authors.explode()
+    cited = in_d[papers] != 0
+    save_citations(
+        pd.DataFrame(
+            {
+                "authors": author_ids[cited],
+                "year": year.array[papers[cited]],
+                "in_d": in_d[papers[cited]],
+            }
+        ),
+        citation,
     )
-    author_citation_dict = {}
-    for author, group in tqdm(
-        author_year_citation.groupby("authors"),
-        total=len(author_year_citation.groupby("authors")),
-        desc="Processing author citations...",
-    ):
-        yearly_citations = group.set_index("year")["total_citations"].to_dict()
-        author_citation_dict[author] = {
-            year: int(yearly_citations.get(year, 0))
-            for year in range(group["year"].min(), group["year"].max() + 1)
-        }
-
-    with open(citation, "w") as f:
-        json.dump(author_citation_dict, f, indent=4)
 
     # Save the paper node
-    df.drop(columns=["title", "references", "ref_list", "paper_mapping"], inplace=True)
-    df["authors"] = df["authors"].apply(
-        lambda x: "" if x == [1] else "#".join(map(str, x))
-    )
-    df["isolate"] = (df["in_d"] == 0) & (df["out_d"] == 0)
-    df.to_csv(paper_node, index=False)
+    def paper_chunks() -> Iterator[pd.DataFrame]:
+        for start in range(0, max(num_papers, 1), batch_size):
+            end = min(start + batch_size, num_papers)
+            author_ptr = authors.indptr[start : end + 1]
+            joined = _join_chunk(author_ptr, authors.indices, "Joining authors...")
+            # Author 1 is the empty name of the papers without authors
+            sole = np.flatnonzero(np.diff(author_ptr) == 1)
+            for i in sole[authors.indices[author_ptr[sole]] == 1]:
+                joined[i] = ""
+            yield pd.DataFrame(
+                {
+                    "id": ids[start:end],
+                    "authors": joined,
+                    "year": year.array[start:end],
+                    "venue": venues[start:end],
+                    "out_d": out_d[start:end],
+                    "start": indptr[start:end] + 1,
+                    "end": indptr[start + 1 : end + 1] + 1,
+                    "in_d": in_d[start:end],
+                    "isolate": (in_d[start:end] == 0) & (out_d[start:end] == 0),
+                }
+            )
+
+    _save_table_chunks(paper_chunks(), paper_node, PAPER_NODE_DTYPES)
 
     # Save the edges of references in papers
-    edge_list = [{"src": source, "dst": target} for (source, target) in edge_list]
-    edges_df = pd.DataFrame(edge_list)
-    edges_df.to_csv(paper_edge, index=False)
+    edges_df = pd.DataFrame({"src": np.repeat(ids, out_d), "dst": indices})
+    _save_table(edges_df, paper_edge, PAPER_EDGE_DTYPES)
 
     logger.info(
-        f"There are total {len(df)} nodes and {len(edges_df)} edges in \033[34mpaper\033[0m."
+        f"There are total {num_papers} nodes and {len(edges_df)} edges in \033[34mpaper\033[0m."
     )
     logger.info(
-        f"Successfully save the information of papers to {paper_map}, {paper_node} and {paper_edge}!"
+        f"Successfully save the information of papers to {citation}, {paper_node}, {paper_edge} and {paper_refs}!"
     )
 
-    del in_degree
-    del edge_list
     del edges_df
     gc.collect()
 
@@ -321,17 +719,74 @@ def save_records_to_csv(
     citation: Path,
     paper_node: Path,
     paper_edge: Path,
+    paper_index: Path,
+    paper_refs: Path,
+    batch_size: int = BATCH_SIZE,
+    num_workers: Optional[int] = None,
+    max_authors_per_paper: Optional[int] = None,
+    data_format: str = "auto",
+    author_alias: Optional[Path] = None,
+    disambiguate: bool = False,
+    chunk_size: Optional[int] = None,
 ) -> None:
     """
     Load and preprocess the dataset, then save as csv files in a single process.
     The csv files include node and edge infos of paper and author, respectively.
+    A node or edge path without suffix is saved as a columnar directory instead.
+
+    The records are streamed from `data_path` `batch_size` papers at a time (see `_stream_records`),
+    the table of 'id: original index' and the titles being saved batch by batch, and only the codes
+    of the authors, venues and references of every paper are kept, never a DataFrame of all papers.
+    Large files are parsed in parallel by `num_workers` processes, defaulting to all cores.
+
+    Papers are interned into dense int32 IDs starting from 1 in the order of the dataset,
+    the table of 'id: original index' is saved to `paper_index`. The references are also saved as
+    a CSR index to `paper_refs`, see `utils.loader.load_paper_refs`.
+
+    Papers with more than `max_authors_per_paper` authors add no co-author edges, no cap if `None`.
+
+    `data_format` is the format of the dataset, the v9 line-tag format (`v9`), the JSON-lines
+    of v10 (`jsonl`) or the JSON array of v11+ (`json`), detected from the file if `auto`.
+
+    If `disambiguate`, the name variants of the same author are merged before the authors are
+    interned, see `utils.disambiguation`. The mapping of 'name: canonical name' is saved to
+    `author_alias`, so that the incremental ingestion renames the new papers the same way.
+
+    The rows of the paper nodes are saved `batch_size` papers at a time. If `chunk_size` is set,
+    the rows of the author nodes are built and saved `chunk_size` authors at a time as well,
+    see `AUTHOR_CHUNK_SIZE`, instead of all at once.
     """
-    # Process all records into a single DataFrame
-    df = _get_dataframe(data_path)
+    records = _stream_records(
+        data_path, paper_index, paper_map, batch_size, num_workers, data_format
+    )
 
-    _save_author_chunk(df, author_node, author_edge)
-    _build_venue_index(df, venue_map)
-    _save_paper_chunk(df, paper_map, citation, paper_node, paper_edge)
+    authors = records.authors
+    if disambiguate:
+        aliases = _disambiguate(records)
+        authors = _rename_authors(authors, records.author_names, aliases)
+        if author_alias is not None:
+            author_alias.parent.mkdir(parents=True, exist_ok=True)
+            with open(author_alias, "w") as f:
+                json.dump(aliases, f, indent=4)
+    elif author_alias is not None and author_alias.exists():
+        # The aliases of a previous run do not apply to the current authors
+        author_alias.unlink()
+    authors, names = _sort_authors(authors, records.author_names)
+    _save_author_chunk(
+        authors, names, author_node, author_edge, max_authors_per_paper, chunk_size
+    )
+    venues = _build_venue_index(records.venues, records.venue_names, venue_map)
+    _save_paper_chunk(
+        authors,
+        records.year,
+        venues,
+        records.references,
+        citation,
+        paper_node,
+        paper_edge,
+        paper_refs,
+        batch_size,
+    )
 
     gc.collect()
 
@@ -0,0 +1,221 @@
+import io
+import json
+import re
+from pathlib import Path
+from typing import Any, Callable, Dict, Final, Iterator, List, NamedTuple, Optional
+
+# Size of the chunks read by the streaming JSON array reader
+CHUNK_SIZE: Final = 1024**2
+# Mongo-style `NumberInt(2017)` wrappers of the AMiner v13 dump, which are not valid JSON
+_NUMBER_INT: Final = re.compile(r"NumberInt\((-?\d+)\)")
+
+
+class Reader(NamedTuple):
+    """
+    A record reader of a dataset format.
+
+    - iter_records: Lazily parse an opened text file into records, see `_finalize_record`.
+    - record_start: Prefix of the lines a record may start with, used to split the file into
+      shards parsed in parallel. `None` if the format can only be read sequentially.
+    """
+
+    iter_records: Callable[[io.TextIOBase], Iterator[Dict[str, Any]]]
+    record_start: Optional[bytes]
+
+
+def _finalize_record(record: Dict[str, Any], references: List[str]) -> Dict[str, Any]:
+    """
+    Fill the missing fields of a record and join its references with `#`, the authors are already
+    `#`-joined by the format reader.
+    """
+    return {
+        "id": record["id"],
+        "title": record.get("title", ""),
+        "authors": record.get("authors", ""),
+        "year": record.get("year"),
+        "venue": record.get("venue", ""),
+        "references": "#".join(references),
+    }
+
+
+def _iter_v9_records(lines: Iterator[str]) -> Iterator[Dict[str, Any]]:
+    """
+    Lazily group the lines of the v9 line-tag format into records, yielding one paper object at a time.
+    """
+    record = {}
+    references = []
+
+    for line in lines:
+        line = line.strip()
+        if line == "":
+            continue
+        if line.startswith("#*") and record:
+            # Start of a new record, emit the current one
+            yield _finalize_record(record, references)
+            record, references = {}, []
+
+        if line.startswith("#*"):
+            record["title"] = line[2:]
+        elif line.startswith("#@"):
+            # The v9 format separates the authors with `, `
+            record["authors"] = line[2:].replace(", ", "#")
+        elif line.startswith("#t"):
+            record["year"] = int(line[2:]) if line[2:] else None
+        elif line.startswith("#c"):
+            record["venue"] = line[2:]
+        elif line.startswith("#index"):
+            record["id"] = line[6:]
+        elif line.startswith("#%"):
+            references.append(line[2:])
+
+    # Emit the last record
+    if record:
+        yield _finalize_record(record, references)
+
+
+def _name(value: Any) -> str:
+    """
+    Name of an author or a venue, which is either a string or an object since v11.
+    """
+    if isinstance(value, dict):
+        value = value.get("name") or value.get("raw") or ""
+    return "" if value is None else str(value)
+
+
+def _convert_json_record(obj: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Convert a paper object of the JSON releases (v10+) into a record of the v9 fields.
+    """
+    year = obj.get("year")
+    record = {
+        "id": str(obj.get("id", obj.get("_id", ""))),
+        "title": obj.get("title") or "",
+        "authors": "#".join(_name(author) for author in obj.get("authors") or []),
+        "year": int(year) if year not in (None, "", 0) else None,
+        "venue": _name(obj.get("venue")),
+    }
+    return _finalize_record(record, [str(ref) for ref in obj.get("references") or []])
+
+
+def _iter_jsonl_records(lines: Iterator[str]) -> Iterator[Dict[str, Any]]:
+    """
+    Lazily parse the JSON-lines format (v10), one paper object per line.
+    """
+    for line in lines:
+        line = line.strip()
+        if line:
+            yield _convert_json_record(json.loads(line))
+
+
+def _iter_json_records(
+    f: io.TextIOBase, chunk_size: int = CHUNK_SIZE
+) -> Iterator[Dict[str, Any]]:
+    """
+    Lazily parse a JSON array of paper objects (v11+) without loading the whole array.
+
+    The file is read `chunk_size` characters at a time and the objects are decoded one by one
+    from the buffer, so the buffer only holds the current chunk and the object being decoded.
+    """
+    decoder = json.JSONDecoder()
+    buffer, pos, eof = "", 0, False
+
+    while True:
+        # Skip the separators between the objects
+        while pos < len(buffer) and buffer[pos] in "[,] \t\r\n":
+            pos += 1
+        if pos == len(buffer):
+            if eof:
+                return
+            buffer, pos = _NUMBER_INT.sub(r"\1", f.read(chunk_size)), 0
+            eof = buffer == ""
+            continue
+
+        try:
+            obj, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            # The object is cut by the end of the chunk, read the next one
+            chunk = f.read(chunk_size)
+            if chunk == "":
+                raise
+            buffer = _NUMBER_INT.sub(r"\1", buffer[pos:] + chunk)
+            pos = 0
+            continue
+
+        yield _convert_json_record(obj)
+        pos = end
+
+
+READERS: Final = {
+    "v9": Reader(_iter_v9_records, b"#*"),
+    "jsonl": Reader(_iter_jsonl_records, b""),
+    "json": Reader(_iter_json_records, None),
+}
+
+
+def detect_format(data_path: Path) -> str:
+    """
+    Detect the format of a dataset from its suffix and its first character, since the v10
+    release is JSON-lines although named `*.json`.
+    """
+    data_path = Path(data_path)
+    if data_path.suffix in (".jsonl", ".ndjson"):
+        return "jsonl"
+    if data_path.suffix != ".json":
+        return "v9"
+
+    with open(data_path, "r", encoding="utf-8") as f:
+        while (char := f.read(1)).isspace():
+            pass
+    return "json" if char == "[" else "jsonl"
+
+
+def get_reader(data_path: Path, data_format: str = "auto") -> Reader:
+    """
+    Get the record reader of a dataset, `data_format` is one of `READERS` or `auto`.
+    """
+    if data_format == "auto":
+        data_format = detect_format(data_path)
+    if data_format not in READERS:
+        raise ValueError(
+            f"Unknown dataset format {data_format}, expected one of {list(READERS)} or auto."
+        )
+    return READERS[data_format]
+
+
+def iter_lines(
+    data_path: Path, start: int = 0, end: Optional[int] = None
+) -> Iterator[str]:
+    """
+    Yield the decoded lines of `data_path` within the byte range [start, end), to the end of the
+    file if `end` is `None`. The lines are split on `\n` only, unlike the universal newlines of a
+    text file which also split on a lone `\r`, so that a range parses the same as the whole file.
+    """
+    with open(data_path, "rb") as f:
+        f.seek(start)
+        offset = start
+        while end is None or offset < end:
+            line = f.readline()
+            if not line:
+                break
+            offset += len(line)
+            yield line.decode("utf-8")
+
+
+def iter_file_records(
+    data_path: Path,
+    data_format: str = "auto",
+    start: int = 0,
+    end: Optional[int] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Lazily parse the records of a dataset, or of the byte range [start, end) of it aligned to the
+    start of records, see `Reader.record_start`. The line formats are read with `iter_lines`,
+    whether the file is parsed whole or in shards, so both give the same records.
+    The formats which can only be read sequentially are read whole, without newline translation.
+    """
+    reader = get_reader(data_path, data_format)
+    if reader.record_start is None:
+        with open(data_path, "r", encoding="utf-8", newline="") as f:
+            yield from reader.iter_records(f)
+        return
+    yield from reader.iter_records(iter_lines(data_path, start, end))
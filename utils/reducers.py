@@ -0,0 +1,131 @@
+import numpy as np
+import pandas as pd
+from typing import Final, Iterable, Iterator, List, Optional, Sequence, Union
+
+# Rows per batch when an in-memory DataFrame is split by `iter_batches`
+BATCH_ROWS: Final = 1_000_000
+
+
+def iter_batches(
+    data: Union[pd.DataFrame, Iterable[pd.DataFrame]], batch_size: int = BATCH_ROWS
+) -> Iterator[pd.DataFrame]:
+    """
+    Yield the batches of either an in-memory DataFrame, sliced `batch_size` rows at a time,
+    or of an iterable of batches such as `utils.loader.iter_paper_node`, as they are.
+    """
+    if isinstance(data, pd.DataFrame):
+        for start in range(0, len(data), batch_size):
+            yield data.iloc[start : start + batch_size]
+    else:
+        yield from data
+
+
+class DegreeCount:
+    """
+    Count the degree of every node ID over batches of edges, i.e. the occurrences of each ID
+    in the `columns` of the batches, weighted by the `weight` column if given.
+
+    Example usage:
+    >>> degree = DegreeCount(["src", "dst"])
+    >>> reduce_batches(iter_paper_edge("./data/paper/edge.csv"), degree)
+    >>> degree.result()[paper_id]
+    """
+
+    def __init__(
+        self, columns: Sequence[str] = ("src", "dst"), weight: Optional[str] = None
+    ):
+        self.columns = list(columns)
+        self.weight = weight
+        self.counts = np.zeros(0, dtype=np.float64 if weight else np.int64)
+
+    def update(self, batch: pd.DataFrame) -> None:
+        weights = None if self.weight is None else batch[self.weight].to_numpy()
+        for column in self.columns:
+            counts = np.bincount(
+                batch[column].to_numpy(dtype=np.int64), weights=weights
+            )
+            if len(counts) > len(self.counts):
+                self.counts = np.pad(self.counts, (0, len(counts) - len(self.counts)))
+            self.counts[: len(counts)] += counts.astype(self.counts.dtype)
+
+    def result(self) -> np.ndarray:
+        """
+        Degrees indexed by node ID, 0 for the IDs without edges.
+        """
+        return self.counts
+
+
+class TopK:
+    """
+    Keep the `k` rows with the largest `column` over batches, per value of `group` if given,
+    the first seen row winning ties like `DataFrame.nlargest`.
+    """
+
+    def __init__(self, k: int, column: str, group: Optional[str] = None):
+        self.k = k
+        self.column = column
+        self.group = group
+        self.top: Optional[pd.DataFrame] = None
+
+    def update(self, batch: pd.DataFrame) -> None:
+        candidates = batch if self.top is None else pd.concat([self.top, batch])
+        if self.group is None:
+            self.top = candidates.nlargest(self.k, self.column)
+        else:
+            self.top = (
+                candidates.sort_values(self.column, ascending=False, kind="stable")
+                .groupby(self.group, sort=False)
+                .head(self.k)
+            )
+
+    def result(self) -> pd.DataFrame:
+        return self.top if self.top is not None else pd.DataFrame()
+
+
+class GroupBySum:
+    """
+    Sum the `columns` of batches grouped by `by`, e.g. the citations of papers by community,
+    along with the number of rows of every group as `count`.
+    """
+
+    def __init__(self, by: Union[str, List[str]], columns: Sequence[str] = ()):
+        self.by = by
+        self.columns = list(columns)
+        self.sums: Optional[pd.DataFrame] = None
+        # Number of non-missing values of every column, for `mean`
+        self.counts: Optional[pd.DataFrame] = None
+
+    def update(self, batch: pd.DataFrame) -> None:
+        grouped = batch.groupby(self.by)
+        sums = grouped[self.columns].sum().assign(count=grouped.size())
+        counts = grouped[self.columns].count()
+        if self.sums is None:
+            self.sums, self.counts = sums, counts
+        else:
+            self.sums = self.sums.add(sums, fill_value=0)
+            self.counts = self.counts.add(counts, fill_value=0)
+
+    def result(self) -> pd.DataFrame:
+        """
+        The sums and counts indexed by group, in the order of the groups.
+        """
+        if self.sums is None:
+            return pd.DataFrame(columns=self.columns + ["count"])
+        return self.sums.astype({"count": "int64"}).sort_index()
+
+    def mean(self) -> pd.DataFrame:
+        """
+        The means of the `columns` by group, skipping the missing values like `DataFrame.mean`.
+        """
+        if self.sums is None:
+            return pd.DataFrame(columns=self.columns)
+        return (self.sums[self.columns] / self.counts).sort_index()
+
+
+def reduce_batches(batches: Iterable[pd.DataFrame], *reducers) -> None:
+    """
+    Feed every batch to all `reducers` in a single pass, so that the batches are read only once.
+    """
+    for batch in batches:
+        for reducer in reducers:
+            reducer.update(batch)
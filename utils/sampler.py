@@ -0,0 +1,258 @@
+import json
+import numpy as np
+import scipy.sparse as sp
+from collections import deque
+from pathlib import Path
+from typing import Any, Dict, Final, Iterator, Optional
+from tqdm import tqdm
+from .csr import CSRIndex
+from .loader import load_paper_index, load_paper_refs
+from .logger import logger
+from .readers import detect_format, iter_file_records
+from .wrapper import timer
+
+# Probability of burning one more neighbor in `forest_fire_sample`, the forward burning
+# probability suggested by Leskovec and Faloutsos (2006), "Sampling from large graphs"
+BURN_PROBABILITY: Final = 0.7
+
+
+def _undirected_adjacency(refs: CSRIndex) -> sp.csr_matrix:
+    """
+    Adjacency of the citation graph without directions, vertex `i` being the paper `i + 1`.
+    """
+    num_papers = refs.num_rows
+    src, dst = refs.explode()
+    adjacency = sp.csr_matrix(
+        (np.ones(len(src), dtype=bool), (src, np.asarray(dst, dtype=np.int64) - 1)),
+        shape=(num_papers, num_papers),
+    )
+    adjacency = (adjacency + adjacency.T).tocsr()
+    adjacency.setdiag(0)
+    adjacency.eliminate_zeros()
+    return adjacency
+
+
+def forest_fire_sample(
+    adjacency: sp.csr_matrix,
+    size: int,
+    seed: int = 42,
+    burn_probability: float = BURN_PROBABILITY,
+) -> np.ndarray:
+    """
+    Sample `size` vertices with the forest fire model: starting from a random vertex, every burning
+    vertex sets fire to a geometric number of its unburnt neighbors, with mean `p / (1 - p)`, which
+    burn in turn. When the fire dies out, it restarts from a new random vertex.
+
+    The sample keeps the local structure of the graph, i.e. its degree distribution and its
+    communities, better than a uniform sample of vertices. Return the sorted sampled vertices.
+    """
+    rng = np.random.default_rng(seed)
+    num_vertices = adjacency.shape[0]
+    size = min(size, num_vertices)
+    burnt = np.zeros(num_vertices, dtype=bool)
+    count = 0
+
+    with tqdm(total=size, desc="Sampling papers...", unit=" papers") as progress:
+        # Restart from the unvisited vertices in a random order
+        for start in rng.permutation(num_vertices).tolist():
+            if count >= size:
+                break
+            if burnt[start]:
+                continue
+            burnt[start] = True
+            count += 1
+            progress.update()
+            fire = deque([start])
+            while fire and count < size:
+                vertex = fire.popleft()
+                neighbors = adjacency.indices[
+                    adjacency.indptr[vertex] : adjacency.indptr[vertex + 1]
+                ]
+                neighbors = neighbors[~burnt[neighbors]]
+                num_burnt = min(
+                    rng.geometric(1 - burn_probability) - 1,
+                    len(neighbors),
+                    size - count,
+                )
+                if num_burnt <= 0:
+                    continue
+                spread = rng.choice(neighbors, num_burnt, replace=False)
+                burnt[spread] = True
+                count += num_burnt
+                progress.update(num_burnt)
+                fire.extend(spread.tolist())
+
+    return np.flatnonzero(burnt)
+
+
+def snowball_sample(
+    adjacency: sp.csr_matrix,
+    size: int,
+    seed: int = 42,
+    max_neighbors: Optional[int] = None,
+) -> np.ndarray:
+    """
+    Sample `size` vertices with a snowball, i.e. a breadth-first search from a random vertex which
+    takes at most `max_neighbors` random unvisited neighbors of each vertex, all of them if `None`.
+    When the search is exhausted, it restarts from a new random vertex.
+
+    The sample keeps whole neighborhoods, so it is denser than the original graph.
+    Return the sorted sampled vertices.
+    """
+    rng = np.random.default_rng(seed)
+    num_vertices = adjacency.shape[0]
+    size = min(size, num_vertices)
+    visited = np.zeros(num_vertices, dtype=bool)
+    count = 0
+
+    with tqdm(total=size, desc="Sampling papers...", unit=" papers") as progress:
+        # Restart from the unvisited vertices in a random order
+        for start in rng.permutation(num_vertices).tolist():
+            if count >= size:
+                break
+            if visited[start]:
+                continue
+            visited[start] = True
+            count += 1
+            progress.update()
+            queue = deque([start])
+            while queue and count < size:
+                vertex = queue.popleft()
+                neighbors = adjacency.indices[
+                    adjacency.indptr[vertex] : adjacency.indptr[vertex + 1]
+                ]
+                neighbors = neighbors[~visited[neighbors]]
+                limit = min(max_neighbors or len(neighbors), size - count)
+                if len(neighbors) > limit:
+                    neighbors = rng.choice(neighbors, limit, replace=False)
+                visited[neighbors] = True
+                count += len(neighbors)
+                progress.update(len(neighbors))
+                queue.extend(neighbors.tolist())
+
+    return np.flatnonzero(visited)
+
+
+SAMPLERS: Final = {
+    "forest_fire": forest_fire_sample,
+    "snowball": snowball_sample,
+}
+
+
+def _format_v9(record: Dict[str, Any]) -> str:
+    lines = [
+        f"#*{record['title']}",
+        f"#@{record['authors'].replace('#', ', ')}",
+        f"#t{'' if record['year'] is None else record['year']}",
+        f"#c{record['venue']}",
+        f"#index{record['id']}",
+    ]
+    lines += [f"#%{ref}" for ref in record["references"].split("#") if ref]
+    return "\n".join(lines) + "\n\n"
+
+
+def _format_json(record: Dict[str, Any]) -> str:
+    return json.dumps(
+        {
+            "id": record["id"],
+            "title": record["title"],
+            "authors": [author for author in record["authors"].split("#") if author],
+            "year": record["year"],
+            "venue": record["venue"],
+            "references": [ref for ref in record["references"].split("#") if ref],
+        },
+        ensure_ascii=False,
+    )
+
+
+def _write_records(
+    records: Iterator[Dict[str, Any]], output_path: Path, data_format: str
+) -> int:
+    """
+    Write records in the format of the dataset, the v9 line-tag format, JSON-lines or a JSON array.
+    Return the number of records.
+    """
+    count = 0
+    with open(output_path, "w", encoding="utf-8") as f:
+        if data_format == "json":
+            f.write("[\n")
+        for record in records:
+            if data_format == "v9":
+                f.write(_format_v9(record))
+            elif data_format == "jsonl":
+                f.write(_format_json(record) + "\n")
+            else:
+                f.write(("" if count == 0 else ",\n") + _format_json(record))
+            count += 1
+        if data_format == "json":
+            f.write("\n]\n")
+    return count
+
+
+@timer
+def sample_dataset(
+    data_path: Path,
+    paper_index: Path,
+    paper_refs: Path,
+    output_path: Path,
+    fraction: float,
+    method: str = "forest_fire",
+    seed: int = 42,
+    data_format: str = "auto",
+) -> int:
+    """
+    Cut a subset of `fraction` of the papers of a preprocessed dataset, sampled on its citation graph
+    (see `SAMPLERS`), and write their records from `data_path` to `output_path` in the same format.
+
+    The references to papers outside of the sample are dropped, so the citation graph of the subset
+    is the subgraph induced by the sample. Preprocessing the subset yields the matching authors and
+    co-author edges. The sample only depends on the preprocessed dataset and `seed`.
+
+    Parameters:
+        - data_path (Path): Dataset the tables were preprocessed from.
+        - paper_index (Path): Table of 'id: original index' of the papers.
+        - paper_refs (Path): CSR index of the references of the papers.
+        - output_path (Path): File of the subset, e.g. `dblp.v9/dblp.txt` in a new data directory.
+        - fraction (float): Fraction of the papers to keep, in (0, 1].
+        - method (str): Sampling method, `forest_fire` or `snowball`.
+        - seed (int): Seed of the sampler.
+        - data_format (str): Format of the dataset, detected from the file if `auto`.
+
+    Return the number of written records.
+    """
+    if not 0 < fraction <= 1:
+        raise ValueError(f"The fraction must be in (0, 1], got {fraction}.")
+    if method not in SAMPLERS:
+        raise ValueError(
+            f"Unknown sampling method {method}, expected one of {list(SAMPLERS)}."
+        )
+
+    # Sample the papers on the undirected citation graph
+    adjacency = _undirected_adjacency(load_paper_refs(paper_refs))
+    size = max(1, int(round(fraction * adjacency.shape[0])))
+    vertices = SAMPLERS[method](adjacency, size, seed)
+    logger.info(
+        f"Sample {len(vertices)} of {adjacency.shape[0]} papers with {method}, "
+        f"keeping {adjacency[vertices][:, vertices].nnz // 2} of {adjacency.nnz // 2} citations."
+    )
+
+    # Original indices of the sampled papers, vertex `i` being the paper `i + 1`
+    index = load_paper_index(paper_index).set_index("id")["index"]
+    sampled = set(index.loc[vertices + 1].astype(str))
+
+    def subset() -> Iterator[Dict[str, Any]]:
+        for record in iter_file_records(data_path, data_format):
+            if record["id"] in sampled:
+                references = record["references"].split("#")
+                record["references"] = "#".join(
+                    ref for ref in references if ref in sampled
+                )
+                yield record
+
+    if data_format == "auto":
+        data_format = detect_format(data_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    count = _write_records(subset(), output_path, data_format)
+    logger.info(f"Successfully save {count} sampled records to {output_path}!")
+
+    return count
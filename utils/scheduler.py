@@ -0,0 +1,316 @@
+import gc
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import (
+    Any,
+    Callable,
+    Final,
+    Dict,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+)
+from .cache import StageCache
+from .graph import clear_igraph_cache
+from .artifacts import registry
+from .logger import logger
+from .wrapper import profile
+
+# Estimated memory in GiB of a process of the pool even when idle: the interpreter and the modules
+WORKER_MEMORY: Final = 0.25
+
+
+class Stage(NamedTuple):
+    """
+    A node of the pipeline DAG, run as `func(*args)` in a worker process.
+
+    - deps: Names of the stages to complete first. The ones which are not scheduled are assumed
+      to be completed, so that a subset of the pipeline can run on its own.
+    - cores: Cores used by the stage, e.g. all of them for a stage with its own process pool.
+    - memory, memory_per_input: Estimated peak memory of the stage in GiB, `memory` plus
+      `memory_per_input` GiB per GiB of its inputs, see `estimate_memory`.
+    - worker_memory: Estimated memory in GiB of each process of the own process pool of a stage,
+      one per core, on top of its peak. Such a stage takes the number of processes of its pool as
+      its last argument once fitted into a memory budget, see `fit_workers`.
+    - inputs, params, outputs: Fingerprint and artifacts of the stage for the `StageCache`,
+      the stage is never skipped without `outputs`.
+    """
+
+    name: str
+    func: Callable
+    args: Tuple = ()
+    deps: Tuple[str, ...] = ()
+    cores: int = 1
+    memory: float = 0.0
+    memory_per_input: float = 0.0
+    worker_memory: float = 0.0
+    inputs: Tuple[Path, ...] = ()
+    params: Optional[Dict[str, Any]] = None
+    outputs: Tuple[Path, ...] = ()
+
+
+class Timing(NamedTuple):
+    """
+    Wall-clock interval of a stage relative to the start of the pipeline, and its status,
+    one of `done`, `skipped`, `failed` or `cancelled` (a dependency failed).
+    """
+
+    start: float
+    end: float
+    status: str
+
+
+def total_memory() -> float:
+    """
+    Physical memory of the machine in GiB, infinite if it cannot be determined.
+    """
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") / 1024**3
+    except (AttributeError, ValueError, OSError):
+        return float("inf")
+
+
+def input_size(paths: Sequence[Path]) -> float:
+    """
+    Total size in GiB of the given files and directories, the missing ones being ignored.
+    """
+    size = 0
+    for path in map(Path, paths):
+        if path.is_dir():
+            size += sum(p.stat().st_size for p in path.rglob("*") if p.is_file())
+        elif path.exists():
+            size += path.stat().st_size
+    return size / 1024**3
+
+
+def estimate_memory(stage: Stage) -> float:
+    """
+    Estimated peak memory of a stage in GiB from the size of its inputs, so it is only accurate
+    once the inputs are written, i.e. when its dependencies are completed.
+    """
+    if not stage.memory_per_input:
+        return stage.memory
+    return stage.memory + stage.memory_per_input * input_size(stage.inputs)
+
+
+def fit_workers(stage: Stage, memory_budget: float) -> Stage:
+    """
+    Fit the process pool of a stage with `worker_memory` into `memory_budget` GiB: as many processes
+    as the budget leaves room for on top of its estimated peak (see `estimate_memory`), at most its
+    `cores` and at least one. The number of processes is appended to the arguments of the stage
+    and becomes its `cores`. The other stages are returned as is.
+    """
+    if not stage.worker_memory:
+        return stage
+
+    peak = estimate_memory(stage)
+    num_workers = max(
+        1, min(stage.cores, int((memory_budget - peak) / stage.worker_memory))
+    )
+    logger.info(
+        f"Run stage {stage.name} with {num_workers} processes of about {stage.worker_memory:.2f} GiB, "
+        f"it needs about {peak:.2f} GiB besides them of the {memory_budget:.2f} GiB budget."
+    )
+    return stage._replace(args=stage.args + (num_workers,), cores=num_workers)
+
+
+def _run_stage(name: str, func: Callable, args: Tuple) -> Any:
+    """
+    Run a stage in a worker process, its resource usage being appended to the run report.
+    The igraph Graphs and the artifacts it loaded are released afterwards, so the worker only
+    holds its `WORKER_MEMORY` between the stages.
+    """
+    try:
+        with profile(name, kind="stage"):
+            return func(*args)
+    finally:
+        clear_igraph_cache()
+        registry.clear()
+        gc.collect()
+
+
+def _topological_order(stages: Dict[str, Stage]) -> List[str]:
+    """
+    Order the stages so that every stage comes after its dependencies, keeping the order of
+    declaration otherwise. Raise a `ValueError` on a dependency cycle.
+    """
+    order, state = [], {}
+
+    def visit(name: str, path: Tuple[str, ...]) -> None:
+        if state.get(name) == "done":
+            return
+        if state.get(name) == "visiting":
+            raise ValueError(f"Dependency cycle between stages: {' -> '.join(path)}")
+        state[name] = "visiting"
+        for dep in stages[name].deps:
+            if dep in stages:
+                visit(dep, path + (dep,))
+        state[name] = "done"
+        order.append(name)
+
+    for name in stages:
+        visit(name, (name,))
+    return order
+
+
+def critical_path(
+    stages: Sequence[Stage], timings: Dict[str, Timing]
+) -> List[Tuple[str, float]]:
+    """
+    The chain of stages which determined the wall time of the run: starting from the stage that
+    finished last, follow the dependency that finished last, i.e. the one it waited for.
+
+    Return the `(name, duration)` of the stages of the path in order.
+    """
+    deps = {stage.name: [d for d in stage.deps if d in timings] for stage in stages}
+    if not timings:
+        return []
+
+    path = []
+    name = max(timings, key=lambda n: timings[n].end)
+    while name is not None:
+        path.append((name, timings[name].end - timings[name].start))
+        name = max(deps[name], key=lambda n: timings[n].end, default=None)
+    return path[::-1]
+
+
+def run_pipeline(
+    stages: Sequence[Stage],
+    max_cores: Optional[int] = None,
+    memory_budget: Optional[float] = None,
+    cache: Optional[StageCache] = None,
+) -> Dict[str, Timing]:
+    """
+    Run the stages of a pipeline on a process pool as soon as their dependencies are completed,
+    so that the independent stages overlap.
+
+    A ready stage starts if the cores and the memory of the running stages leave room for its
+    `cores` and its memory estimated from its inputs (see `estimate_memory`), the first ready
+    stages in declaration order going first, so the memory budget caps the number of concurrent
+    stages. A stage which alone exceeds the limits runs when no other stage is running. The stages
+    deferred for the memory budget are logged.
+
+    The pool has one process per core, but its processes take at most half of the memory budget,
+    each counted as `WORKER_MEMORY`, and the stages share the rest. A failed stage is logged,
+    and the stages depending on it are cancelled while the others go on. The critical path is
+    reported at the end.
+
+    Parameters:
+        - stages: Stages of the pipeline, their functions and arguments must be picklable.
+        - max_cores: Number of cores shared by the stages, all of them by default.
+        - memory_budget: Memory shared by the stages in GiB, the physical memory by default.
+        - cache: Cache of the stages, the fresh ones are skipped and the completed ones recorded.
+
+    Return the `Timing` of every stage by name.
+    """
+    by_name = {stage.name: stage for stage in stages}
+    pending = _topological_order(by_name)
+    max_cores = max_cores or os.cpu_count() or 1
+    memory_budget = memory_budget or total_memory()
+    num_workers = max(1, int(min(max_cores, memory_budget / 2 / WORKER_MEMORY)))
+    logger.info(
+        f"Run {len(by_name)} stages on {max_cores} cores with {num_workers} processes, "
+        f"with a memory budget of {memory_budget:.2f} GiB."
+    )
+    memory_budget -= num_workers * WORKER_MEMORY
+
+    timings: Dict[str, Timing] = {}
+    running: Dict[Future, Tuple[str, Optional[str]]] = {}
+    used_cores, used_memory = 0, 0.0
+    # Estimated once a stage is ready, when its inputs exist
+    memory: Dict[str, float] = {}
+    deferred = set()
+    origin = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=num_workers) as executor:
+        while pending or running:
+            for name in list(pending):
+                stage = by_name[name]
+                deps = [timings.get(d) for d in stage.deps if d in by_name]
+                if any(
+                    t is not None and t.status in ("failed", "cancelled") for t in deps
+                ):
+                    now = time.perf_counter() - origin
+                    timings[name] = Timing(now, now, "cancelled")
+                    pending.remove(name)
+                    logger.error(
+                        f"Cancel stage {name}, one of its dependencies failed."
+                    )
+                    continue
+                if any(t is None or t.status == "running" for t in deps):
+                    continue
+
+                key = None
+                if cache is not None and stage.outputs:
+                    key = cache.fingerprint(stage.inputs, stage.params or {})
+                    if cache.is_fresh(name, key, stage.outputs):
+                        now = time.perf_counter() - origin
+                        timings[name] = Timing(now, now, "skipped")
+                        pending.remove(name)
+                        logger.info(f"Skip stage {name}, its outputs are up to date.")
+                        continue
+
+                cores = min(stage.cores, max_cores)
+                if name not in memory:
+                    # The processes of its own pool on top of its peak
+                    memory[name] = estimate_memory(stage) + cores * stage.worker_memory
+                if running and used_memory + memory[name] > memory_budget:
+                    if name not in deferred:
+                        deferred.add(name)
+                        logger.info(
+                            f"Defer stage {name}, it needs about {memory[name]:.2f} GiB while "
+                            f"{used_memory:.2f} of the {memory_budget:.2f} GiB budget are in use."
+                        )
+                    continue
+                if running and used_cores + cores > max_cores:
+                    continue
+                if memory[name] > memory_budget:
+                    logger.warning(
+                        f"Run stage {name} alone, it needs about {memory[name]:.2f} GiB "
+                        f"which exceeds the {memory_budget:.2f} GiB budget."
+                    )
+
+                if key is not None:
+                    # Drop the record first, an interrupted stage must not look completed
+                    cache.invalidate(name)
+                future = executor.submit(_run_stage, name, stage.func, stage.args)
+                running[future] = (name, key)
+                timings[name] = Timing(time.perf_counter() - origin, 0.0, "running")
+                used_cores += cores
+                used_memory += memory[name]
+                pending.remove(name)
+
+            if not running:
+                # Some stages were skipped or cancelled, their dependents may be ready now
+                continue
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, key = running.pop(future)
+                stage = by_name[name]
+                used_cores -= min(stage.cores, max_cores)
+                used_memory -= memory[name]
+                try:
+                    future.result()
+                    status = "done"
+                    if key is not None:
+                        cache.record(name, key, stage.outputs)
+                except Exception as e:
+                    status = "failed"
+                    logger.error(f"Error during stage {name}: {e}")
+                timings[name] = Timing(
+                    timings[name].start, time.perf_counter() - origin, status
+                )
+
+    wall = time.perf_counter() - origin
+    path = critical_path(stages, timings)
+    logger.info(
+        f"Critical path ({sum(d for _, d in path):.2f}s of {wall:.2f}s wall time): "
+        + " -> ".join(f"{name} ({duration:.2f}s)" for name, duration in path)
+    )
+
+    return timings
@@ -23,6 +23,3 @@ def set_global_seed(seed: int):
 
     # Ensure reproducibility for Python's os module (for random file shuffling, etc.)
     os.environ["PYTHONHASHSEED"] = str(seed)
-
-
-set_global_seed(42)
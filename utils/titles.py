@@ -0,0 +1,103 @@
+import numpy as np
+from pathlib import Path
+from typing import Final, Iterable, List, Optional
+from .csr import append_npy
+
+DATA_FILE: Final = "data.bin"
+OFFSETS_FILE: Final = "offsets.npy"
+
+
+def _encode(titles: Iterable[str]):
+    encoded = [
+        ("" if title is None else str(title)).encode("utf-8") for title in titles
+    ]
+    lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded))
+    return b"".join(encoded), lengths
+
+
+def save_titles(titles: Iterable[str], path: Path) -> None:
+    """
+    Save the titles of papers `1..N` (in this order) as an utf-8 blob `data.bin`
+    plus an int64 offset table `offsets.npy`, the title of paper `id` being
+    `data[offsets[id - 1]:offsets[id]]`.
+    """
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+
+    blob, lengths = _encode(titles)
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+
+    with open(path / DATA_FILE, "wb") as f:
+        f.write(blob)
+    np.save(path / OFFSETS_FILE, offsets)
+
+
+def append_titles(titles: Iterable[str], path: Path) -> None:
+    """
+    Append the titles of the next papers to a store saved by `save_titles`,
+    both the blob and the offset table are appended in place, see `utils.csr.append_npy`.
+    """
+    path = Path(path)
+    end = int(np.load(path / OFFSETS_FILE, mmap_mode="r")[-1])
+
+    blob, lengths = _encode(titles)
+    with open(path / DATA_FILE, "ab") as f:
+        f.write(blob)
+    append_npy(path / OFFSETS_FILE, end + np.cumsum(lengths))
+
+
+class TitleStore:
+    """
+    Lazy id -> title lookup over a store saved by `save_titles`.
+
+    Nothing is read before the first lookup, then the blob and the offsets are
+    memory-mapped, so only the pages holding the requested titles are read.
+
+    Example usage:
+    >>> titles = TitleStore("./data/paper/title")
+    >>> titles[6]
+    'On the Multiple-Query Optimization Problem.'
+    >>> titles.lookup([1, 4, 6])
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._data: Optional[np.ndarray] = None
+        self._offsets: Optional[np.ndarray] = None
+
+    def _open(self) -> None:
+        if self._offsets is None:
+            self._offsets = np.load(self.path / OFFSETS_FILE, mmap_mode="r")
+            if (self.path / DATA_FILE).stat().st_size > 0:
+                self._data = np.memmap(self.path / DATA_FILE, dtype=np.uint8, mode="r")
+            else:
+                self._data = np.zeros(0, dtype=np.uint8)
+
+    def __len__(self) -> int:
+        self._open()
+        return len(self._offsets) - 1
+
+    def __getitem__(self, paper_id: int) -> str:
+        title = self.get(paper_id)
+        if title is None:
+            raise KeyError(paper_id)
+        return title
+
+    def get(self, paper_id: int, default: Optional[str] = None) -> Optional[str]:
+        self._open()
+        if not 1 <= paper_id < len(self._offsets):
+            return default
+        start, end = self._offsets[paper_id - 1], self._offsets[paper_id]
+        return self._data[start:end].tobytes().decode("utf-8")
+
+    def lookup(self, paper_ids: Iterable[int]) -> List[Optional[str]]:
+        """
+        Batched lookup, the IDs are read in sorted order so the blob is scanned sequentially.
+        Unknown IDs give `None`.
+        """
+        paper_ids = np.asarray(list(paper_ids), dtype=np.int64)
+        titles: List[Optional[str]] = [None] * len(paper_ids)
+        for idx in np.argsort(paper_ids, kind="stable"):
+            titles[idx] = self.get(int(paper_ids[idx]))
+        return titles
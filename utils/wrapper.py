@@ -1,13 +1,326 @@
+import cProfile
 import functools
+import json
+import os
+import sys
+import threading
 import time
-from .logger import logger
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Final, Iterator, List, Optional, Tuple
+from .logger import LOG_DIR, logger
+
+# Environment variables shared with the worker processes, so that all processes of a run append
+# to the same report (set by `start_report`), the number of top tracemalloc allocation sites to
+# record (0 to disable), and the profiler of the outermost profiled blocks, `sampling` or `cprofile`
+# (empty to disable)
+REPORT_ENV: Final = "SOCIALNETWORK_REPORT"
+TRACEMALLOC_ENV: Final = "SOCIALNETWORK_TRACEMALLOC"
+PROFILE_ENV: Final = "SOCIALNETWORK_PROFILE"
+PROFILERS: Final = ("sampling", "cprofile")
+# Seconds between two samples of the stack by `StackSampler`
+SAMPLING_INTERVAL: Final = 0.005
+MIB: Final = 1024**2
+
+# Profiles being measured in this process, the innermost last
+_active: List[Dict[str, Any]] = []
+
+
+def start_report(log_dir: Path = LOG_DIR) -> Path:
+    """
+    Start the run report of the resource usage, one JSON record per line, named after the time of
+    the run under `log_dir`, unless a parent process already started it. Return its path.
+    """
+    if not os.environ.get(REPORT_ENV):
+        os.environ[REPORT_ENV] = str(
+            Path(log_dir) / f"{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.jsonl"
+        )
+    return Path(os.environ[REPORT_ENV])
+
+
+def report_path() -> Optional[Path]:
+    """
+    Path of the run report, `None` if no report was started, see `start_report`.
+    """
+    path = os.environ.get(REPORT_ENV)
+    return Path(path) if path else None
+
+
+def profile_dir() -> Path:
+    """
+    Directory of the profiles of the run, next to the log and the report.
+    """
+    return start_report().with_suffix("")
+
+
+def _read_memory() -> Tuple[Optional[int], Optional[int]]:
+    """
+    Current and peak resident set size of the process in bytes, from `/proc/self/status` on Linux
+    or `getrusage` elsewhere, where the current one is unknown.
+    """
+    try:
+        with open("/proc/self/status", "r") as f:
+            status = dict(line.split(":", 1) for line in f if ":" in line)
+        return (
+            int(status["VmRSS"].split()[0]) * 1024,
+            int(status["VmHWM"].split()[0]) * 1024,
+        )
+    except (OSError, KeyError, ValueError):
+        pass
+    try:
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Kilobytes on Linux, bytes on macOS
+        return None, peak if sys.platform == "darwin" else peak * 1024
+    except ImportError:
+        return None, None
+
+
+def _reset_peak() -> bool:
+    """
+    Reset the peak resident set size of the process to the current one, so that the peak of a
+    profile is its own. Only supported on Linux, the peak is the one of the process otherwise.
+    """
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _top_allocations(
+    start: tracemalloc.Snapshot, end: tracemalloc.Snapshot, limit: int
+) -> List[Dict[str, Any]]:
+    """
+    The `limit` source lines whose allocations grew the most between two snapshots.
+    """
+    filters = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    stats = end.filter_traces(filters).compare_to(
+        start.filter_traces(filters), "lineno"
+    )
+    return [
+        {
+            "site": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+            "size_diff": stat.size_diff,
+            "count_diff": stat.count_diff,
+        }
+        for stat in stats[:limit]
+    ]
+
+
+class StackSampler:
+    """
+    A sampling profiler: a daemon thread reads the stack of the profiled thread every `interval`
+    seconds and counts the distinct stacks, so the overhead does not depend on the number of
+    function calls, unlike `cProfile`. The time spent in a C extension holding the GIL is counted
+    on the sample taken after it.
+
+    The counts are saved in the collapsed stack format, one `caller;...;callee count` line per stack,
+    which `flamegraph.pl` or speedscope render as a flame graph.
+    """
+
+    def __init__(self, interval: float = SAMPLING_INTERVAL):
+        self.interval = interval
+        self.thread_id = threading.get_ident()
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(
+                    f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})"
+                )
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def save(self, path: Path) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+def _start_profiler(mode: str):
+    """
+    Start the profiler `mode` of `PROFILERS` on the current thread, `None` if another profiler
+    is already active, e.g. when the script runs under `python -m cProfile`.
+    """
+    if mode == "sampling":
+        profiler = StackSampler()
+        profiler.start()
+        return profiler
+    if mode == "cprofile":
+        # Before Python 3.12 a new profiler silently replaces the active one instead of raising
+        if sys.getprofile() is not None:
+            return None
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            return None
+        return profiler
+    raise ValueError(f"Unknown profiler {mode}, expected one of {PROFILERS}.")
+
+
+def _save_profile(profiler, name: str) -> Path:
+    """
+    Stop a profiler and save its profile to `profile_dir()`: the collapsed stacks of the sampling
+    profiler in `<name>.<pid>.folded`, the `pstats` file of cProfile in `<name>.<pid>.prof`.
+    """
+    directory = profile_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    stem = f"{name.replace('/', '-')}.{os.getpid()}"
+    if isinstance(profiler, StackSampler):
+        profiler.stop()
+        path = directory / f"{stem}.folded"
+        profiler.save(path)
+    else:
+        profiler.disable()
+        path = directory / f"{stem}.prof"
+        profiler.dump_stats(path)
+    return path
+
+
+def _write_report(path: Path, record: Dict[str, Any]) -> None:
+    """
+    Append a record to the run report, in a single write so that the lines of concurrent processes
+    are not interleaved.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    line = (json.dumps(record) + "\n").encode("utf-8")
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, line)
+    finally:
+        os.close(fd)
+
+
+@contextmanager
+def profile(name: str, kind: str = "function") -> Iterator[Dict[str, Any]]:
+    """
+    Measure the resources used by a block: wall and CPU time (of the process and of its terminated
+    child processes, e.g. a process pool), resident set size at the start and the end, its delta and
+    its peak.
+
+    Only the blocks of `kind="stage"` reset the peak of the process, so that their peak is their
+    own, and are appended to the run report if one was started (see `start_report`). The other
+    blocks, e.g. the `@timer` functions, are only measured, their peak being the one of the process
+    since the start of the current stage. If the `SOCIALNETWORK_TRACEMALLOC` environment variable
+    is a positive number, the top source lines by allocated memory within a stage are recorded as
+    well, which slows the stage down.
+    If `SOCIALNETWORK_PROFILE` is one of `PROFILERS`, the outermost block of the process, e.g. a
+    stage in a worker, runs under that profiler and its profile is saved to `profile_dir()`.
+    The environment is inherited by the worker processes, so a stage run in a worker is reported
+    in the same file. Nested stages are reported each, the peak of the outer one including them.
+
+    Yield the record, filled when the block exits.
+
+    Example usage:
+    >>> with profile("stage community/louvain", kind="stage"):
+    >>>     louvain_ig(graph, path)
+    """
+    stage = kind == "stage"
+    top = int(os.environ.get(TRACEMALLOC_ENV, "0") or 0) if stage else 0
+    # Only the outermost block of a process is profiled, the profilers do not nest
+    mode = os.environ.get(PROFILE_ENV, "")
+    profiler = _start_profiler(mode) if mode and not _active else None
+    own_peak = False
+    if stage:
+        if _active:
+            # The peak of the outer profile until now, before it is reset for this one
+            _active[-1]["peak_rss"] = max(
+                _active[-1]["peak_rss"] or 0, _read_memory()[1] or 0
+            )
+        own_peak = _reset_peak()
+    rss_start, _ = _read_memory()
+
+    started_tracing = False
+    snapshot = None
+    if top > 0:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            started_tracing = True
+        snapshot = tracemalloc.take_snapshot()
+
+    record = {
+        "name": name,
+        "kind": kind,
+        "pid": os.getpid(),
+        "start": time.time(),
+        "peak_rss": None,
+    }
+    _active.append(record)
+    children = os.times()
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    status = "failed"
+    try:
+        yield record
+        status = "done"
+    finally:
+        wall, cpu = time.perf_counter() - wall_start, time.process_time() - cpu_start
+        now = os.times()
+        rss_end, peak = _read_memory()
+        _active.pop()
+        peak = max(record["peak_rss"] or 0, peak or 0) or None
+        record.update(
+            {
+                "status": status,
+                "wall": wall,
+                "cpu": cpu,
+                "cpu_children": (now.children_user - children.children_user)
+                + (now.children_system - children.children_system),
+                "rss_start": rss_start,
+                "rss_end": rss_end,
+                "rss_delta": (
+                    rss_end - rss_start if None not in (rss_start, rss_end) else None
+                ),
+                "peak_rss": peak,
+                "peak_scope": "block" if own_peak else "process",
+            }
+        )
+        if profiler is not None:
+            record["profile"] = str(_save_profile(profiler, name))
+        if snapshot is not None:
+            record["top_allocations"] = _top_allocations(
+                snapshot, tracemalloc.take_snapshot(), top
+            )
+            if started_tracing:
+                tracemalloc.stop()
+        if _active and peak is not None:
+            _active[-1]["peak_rss"] = max(_active[-1]["peak_rss"] or 0, peak)
+
+        path = report_path()
+        if stage and path is not None:
+            try:
+                _write_report(path, record)
+            except OSError as e:
+                logger.warning(f"Failed to write the run report {path}: {e}")
 
 
 def timer(func):
     """
-    A decorator that measures and logs the execution time of a function.
+    A decorator that measures and logs the execution time and the resource usage of a function.
 
-    The execution time is logged in minutes and seconds using the `logger` module.
+    The execution time is logged in minutes and seconds using the `logger` module, along with
+    the CPU time and the peak resident set size measured by `profile`, also when the function runs
+    in a worker process.
     The decorator ensures that the function's metadata (e.g., name, docstring) is
     preserved using `functools.wraps`.
 
@@ -24,7 +337,8 @@ def timer(func):
     >>>      pass
 
     Notes:
-        - This decorator uses `time.time()` to calculate the execution time.
+        - This decorator uses `time.perf_counter()` and `time.process_time()` to calculate
+          the wall and CPU time.
         - It logs the execution time using a `logger` object, so ensure that
           a logger is properly configured in your application.
     """
@@ -32,20 +346,24 @@ def timer(func):
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
 
-        start_time = time.time()
-        result = func(*args, **kwargs)
-        end_time = time.time()
-        execution_time = end_time - start_time
+        with profile(f"{func.__module__}.{func.__qualname__}") as record:
+            result = func(*args, **kwargs)
 
         # Log the function name and execution time in minutes and seconds
+        execution_time = record["wall"]
         minutes, seconds = divmod(execution_time, 60)
+        usage = f"cpu {record['cpu']:.2f}s"
+        if record["peak_rss"] is not None:
+            usage += f", peak rss {record['peak_rss'] / MIB:.1f} MiB"
+        if record["rss_delta"] is not None:
+            usage += f" ({record['rss_delta'] / MIB:+.1f} MiB)"
         if int(minutes) > 0:
             logger.info(
-                f"Function '{func.__name__}' executed in {int(minutes)} minute(s) and {seconds:.2f} second(s)"
+                f"Function '{func.__name__}' executed in {int(minutes)} minute(s) and {seconds:.2f} second(s), {usage}"
             )
         else:
             logger.info(
-                f"Function '{func.__name__}' executed in {seconds:.2f} second(s)"
+                f"Function '{func.__name__}' executed in {seconds:.2f} second(s), {usage}"
             )
         logger.info("-" * 85)
         return result